@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+from collections.abc import Set as AbstractSet
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+# Above this many members a bitset is decoded by unpacking it as bytes.
+SPARSE_DECODE_LIMIT = 64
+
+
+class RestaurantIdRegistry:
+    """Dense mapping between restaurant ids and bit positions.
+
+    Positions are handed out in order of first appearance and never reused, so
+    a bitset encoded against the registry stays valid as the catalog grows.
+    The registry is append-only, which lets readers use it while a writer
+    registers new ids.
+    """
+
+    def __init__(self) -> None:
+        self.ids: List[str] = []
+        self.positions: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def position(self, restaurant_id: str) -> int:
+        position = self.positions.get(restaurant_id)
+        if position is None:
+            # Append before publishing the position so a concurrent reader
+            # never finds a position without its id.
+            position = len(self.ids)
+            self.ids.append(restaurant_id)
+            self.positions[restaurant_id] = position
+        return position
+
+    def lookup(self, restaurant_id: str) -> Optional[int]:
+        return self.positions.get(restaurant_id)
+
+    def encode(self, restaurant_ids: Iterable[str]) -> int:
+        bits = 0
+        for restaurant_id in restaurant_ids:
+            bits |= 1 << self.position(restaurant_id)
+        return bits
+
+    def decode(self, bits: int) -> List[str]:
+        if bits.bit_count() > SPARSE_DECODE_LIMIT:
+            return [self.ids[position] for position in np.flatnonzero(unpack(bits, bits.bit_length()))]
+        # Peeling off the lowest set bit beats unpacking for sparse sets.
+        ids = []
+        while bits:
+            lowest = bits & -bits
+            ids.append(self.ids[lowest.bit_length() - 1])
+            bits ^= lowest
+        return ids
+
+    @classmethod
+    def from_ids(cls, ids: Iterable[str]) -> "RestaurantIdRegistry":
+        registry = cls()
+        registry.ids = list(ids)
+        registry.positions = {restaurant_id: position for position, restaurant_id in enumerate(registry.ids)}
+        return registry
+
+
+class RestaurantSet(AbstractSet):
+    """Read-only set of restaurant ids stored as one bitset integer."""
+
+    __slots__ = ("bits", "registry")
+
+    def __init__(self, bits: int, registry: RestaurantIdRegistry) -> None:
+        self.bits = bits
+        self.registry = registry
+
+    @classmethod
+    def _from_iterable(cls, iterable: Iterable[str]) -> set:
+        # Results of ``-``, ``&`` and friends are plain sets.
+        return set(iterable)
+
+    def __contains__(self, restaurant_id: object) -> bool:
+        if not isinstance(restaurant_id, str):
+            return False
+        position = self.registry.lookup(restaurant_id)
+        return position is not None and (self.bits >> position) & 1 == 1
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.registry.decode(self.bits))
+
+    def __len__(self) -> int:
+        return self.bits.bit_count()
+
+    def __repr__(self) -> str:
+        return f"RestaurantSet({sorted(self)!r})"
+
+
+def unpack(bits: int, length: int) -> np.ndarray:
+    """Boolean array of the first ``length`` bits of ``bits``."""
+    byte_count = (length + 7) // 8
+    raw = np.frombuffer(bits.to_bytes(byte_count, "little"), dtype=np.uint8)
+    return np.unpackbits(raw, bitorder="little")[:length].astype(bool)
+
+
+def membership_matrix(sets: Sequence[AbstractSet], restaurant_ids: Sequence[str]) -> np.ndarray:
+    """Row per set, column per restaurant id: whether the set holds the id.
+
+    Bitset rows are unpacked once and indexed by position instead of testing
+    each id separately; any other set falls back to membership tests.
+    """
+    matrix = np.zeros((len(sets), len(restaurant_ids)), dtype=bool)
+    positions_by_registry: Dict[int, np.ndarray] = {}
+    for row, values in enumerate(sets):
+        if not isinstance(values, RestaurantSet):
+            matrix[row] = [restaurant_id in values for restaurant_id in restaurant_ids]
+            continue
+        registry = values.registry
+        positions = positions_by_registry.get(id(registry))
+        if positions is None:
+            positions = np.array(
+                [registry.positions.get(restaurant_id, -1) for restaurant_id in restaurant_ids],
+                dtype=np.int64,
+            )
+            positions_by_registry[id(registry)] = positions
+        known = positions >= 0
+        unpacked = unpack(values.bits, len(registry))
+        matrix[row, known] = unpacked[positions[known]]
+    return matrix
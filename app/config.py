@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class Settings:
+    """Deployment settings, read from ``TOGETHERDINE_*`` environment variables."""
+
+    repository_backend: str = "memory"
+    sqlite_path: str = "togetherdine.db"
+    data_dir: str = "data"
+    snapshot_every: int = 10_000
+    wal_fsync: bool = False
+    scoring_workers: int = 2
+    scoring_timeout: float = 30.0
+    scoring_offload_cells: int = 200_000
+    job_workers: int = 2
+    job_queue_size: int = 64
+    encoded_cache_size: int = 10_000
+    event_queue_size: int = 256
+    vote_majority: float = 0.5
+    vote_quorum: float = 1.0
+    ics_max_bytes: int = 64 * 1024 * 1024
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        return cls(
+            repository_backend=os.environ.get("TOGETHERDINE_REPOSITORY", cls.repository_backend),
+            sqlite_path=os.environ.get("TOGETHERDINE_SQLITE_PATH", cls.sqlite_path),
+            data_dir=os.environ.get("TOGETHERDINE_DATA_DIR", cls.data_dir),
+            snapshot_every=int(os.environ.get("TOGETHERDINE_SNAPSHOT_EVERY", cls.snapshot_every)),
+            wal_fsync=os.environ.get("TOGETHERDINE_WAL_FSYNC", "") in ("1", "true", "yes"),
+            scoring_workers=int(os.environ.get("TOGETHERDINE_SCORING_WORKERS", cls.scoring_workers)),
+            scoring_timeout=float(os.environ.get("TOGETHERDINE_SCORING_TIMEOUT", cls.scoring_timeout)),
+            scoring_offload_cells=int(
+                os.environ.get("TOGETHERDINE_SCORING_OFFLOAD_CELLS", cls.scoring_offload_cells)
+            ),
+            job_workers=int(os.environ.get("TOGETHERDINE_JOB_WORKERS", cls.job_workers)),
+            job_queue_size=int(os.environ.get("TOGETHERDINE_JOB_QUEUE_SIZE", cls.job_queue_size)),
+            encoded_cache_size=int(os.environ.get("TOGETHERDINE_ENCODED_CACHE_SIZE", cls.encoded_cache_size)),
+            event_queue_size=int(os.environ.get("TOGETHERDINE_EVENT_QUEUE_SIZE", cls.event_queue_size)),
+            vote_majority=float(os.environ.get("TOGETHERDINE_VOTE_MAJORITY", cls.vote_majority)),
+            vote_quorum=float(os.environ.get("TOGETHERDINE_VOTE_QUORUM", cls.vote_quorum)),
+            ics_max_bytes=int(os.environ.get("TOGETHERDINE_ICS_MAX_BYTES", cls.ics_max_bytes)),
+        )
+
+
+settings = Settings.from_env()
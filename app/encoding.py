@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import math
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from json.encoder import encode_basestring_ascii
+from typing import Callable, Iterable, Optional, Tuple, TypeVar
+
+from .models import Invitation, InvitationOption, Restaurant, User
+
+Entity = TypeVar("Entity", Restaurant, User, Invitation)
+
+
+def _string(value: str) -> str:
+    return encode_basestring_ascii(value)
+
+
+def _strings(values: Iterable[str]) -> str:
+    return "[" + ",".join(map(encode_basestring_ascii, values)) + "]"
+
+
+def _float(value: Optional[float]) -> str:
+    # Same spelling as ``json.dumps``, which Pydantic uses for these fields.
+    if value is None:
+        return "null"
+    value = float(value)
+    if math.isfinite(value):
+        return float.__repr__(value)
+    if value != value:
+        return "NaN"
+    return "Infinity" if value > 0 else "-Infinity"
+
+
+def _datetime(value: datetime) -> str:
+    return '"' + value.isoformat() + '"'
+
+
+def _optional_string(value: Optional[str]) -> str:
+    return "null" if value is None else encode_basestring_ascii(value)
+
+
+def _option(option: Optional[InvitationOption]) -> str:
+    if option is None:
+        return "null"
+    return (
+        f'{{"restaurant_id":{_string(option.restaurant_id)},'
+        f'"slot_start":{_datetime(option.slot_start)},'
+        f'"slot_end":{_datetime(option.slot_end)},'
+        f'"participants":{_strings(option.participants)},'
+        f'"intersection_ratio":{_float(option.intersection_ratio)},'
+        f'"availability_ratio":{_float(option.availability_ratio)},'
+        f'"convenience_score":{_float(option.convenience_score)},'
+        f'"total_score":{_float(option.total_score)}}}'
+    )
+
+
+def encode_restaurant(restaurant: Restaurant) -> bytes:
+    """``RestaurantRead`` JSON for ``restaurant``."""
+    return (
+        f'{{"id":{_string(restaurant.id)},"name":{_string(restaurant.name)},'
+        f'"tags":{_strings(restaurant.tags)},"rating":{_float(restaurant.rating)},'
+        f'"latitude":{_float(restaurant.latitude)},"longitude":{_float(restaurant.longitude)}}}'
+    ).encode()
+
+
+def encode_user(user: User) -> bytes:
+    """``UserRead`` JSON for ``user``."""
+    return (
+        f'{{"id":{_string(user.id)},"name":{_string(user.name)},'
+        f'"wishlist":{_strings(sorted(user.wishlist))},"visited":{_strings(sorted(user.visited))},'
+        f'"latitude":{_float(user.latitude)},"longitude":{_float(user.longitude)}}}'
+    ).encode()
+
+
+def encode_invitation(invitation: Invitation) -> bytes:
+    """``InvitationRead`` JSON for ``invitation``."""
+    slots = ",".join(f"[{_datetime(start)},{_datetime(end)}]" for start, end in invitation.candidate_slots)
+    return (
+        f'{{"id":{_string(invitation.id)},"organizer_id":{_string(invitation.organizer_id)},'
+        f'"participant_ids":{_strings(invitation.participant_ids)},'
+        f'"candidate_restaurant_ids":{_strings(invitation.candidate_restaurant_ids)},'
+        f'"candidate_slots":[{slots}],'
+        f'"top_options":[{",".join(map(_option, invitation.top_options))}],'
+        f'"confirmed_option":{_option(invitation.confirmed_option)},'
+        f'"calendar_link":{_optional_string(invitation.calendar_link)},'
+        f'"reservation_link":{_optional_string(invitation.reservation_link)}}}'
+    ).encode()
+
+
+def encode_array(documents: Iterable[bytes]) -> bytes:
+    return b"[" + b",".join(documents) + b"]"
+
+
+class EncodedCache:
+    """Encoded JSON of recently served entities, least recently used evicted first.
+
+    Stored entities are replaced rather than mutated, so an entry is only
+    reused while the repository still hands out the very object it was
+    encoded from; any write produces a new object and a miss.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple[type, str], Tuple[object, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def encode(self, entity: Entity, encode: Callable[[Entity], bytes]) -> bytes:
+        if self.capacity <= 0:
+            return encode(entity)
+        key = (type(entity), entity.id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] is entity:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+        encoded = encode(entity)
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = (entity, encoded)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+        return encoded
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
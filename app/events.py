@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import asyncio
+import itertools
+import threading
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, Optional, Set
+
+from .models import Invitation, Vote
+
+OPTIONS_CHANGED = "options"
+CONFIRMED = "confirmed"
+VOTE_RECORDED = "vote"
+# Sent in place of events a slow subscriber missed; it should refetch its invitations.
+RESYNC = "resync"
+
+
+@dataclass(frozen=True, slots=True)
+class InvitationEvent:
+    """One change to an invitation; ``invitation`` is its state after the change.
+
+    A ``RESYNC`` event has no invitation and counts the events it replaces
+    in ``dropped``.
+    """
+
+    event_id: int
+    kind: str
+    invitation: Optional[Invitation]
+    vote: Optional[Vote] = None
+    dropped: int = 0
+
+
+class Subscription:
+    """A subscriber's bounded queue, filled from any thread and drained on its loop.
+
+    When the subscriber falls ``capacity`` events behind, everything queued
+    is replaced by one ``RESYNC`` event, so it learns that it missed events,
+    possibly about other invitations, instead of silently losing them.
+    """
+
+    def __init__(self, invitation_id: Optional[str], capacity: int) -> None:
+        self.invitation_id = invitation_id
+        self.dropped = 0
+        self._loop = asyncio.get_running_loop()
+        self._queue: "asyncio.Queue[InvitationEvent]" = asyncio.Queue(maxsize=max(capacity, 2))
+
+    async def get(self) -> InvitationEvent:
+        return await self._queue.get()
+
+    def offer(self, event: InvitationEvent) -> bool:
+        """Hand ``event`` to the subscriber's loop; False once that loop is gone."""
+        try:
+            self._loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            return False
+        return True
+
+    def _put(self, event: InvitationEvent) -> None:
+        if self._queue.full():
+            missed = 0
+            last_id = event.event_id
+            while not self._queue.empty():
+                dropped = self._queue.get_nowait()
+                if dropped.kind == RESYNC:
+                    # Already counted when it replaced its own events.
+                    missed += dropped.dropped
+                else:
+                    missed += 1
+                    self.dropped += 1
+                last_id = dropped.event_id
+            self._queue.put_nowait(InvitationEvent(last_id, RESYNC, None, dropped=missed))
+        self._queue.put_nowait(event)
+
+
+class EventBus:
+    """In-process fan-out of invitation events.
+
+    Subscribers follow one invitation or, with ``invitation_id=None``, all
+    of them. ``publish`` never blocks on a subscriber.
+    """
+
+    def __init__(self, queue_size: int) -> None:
+        self.queue_size = queue_size
+        self._subscribers: Dict[Optional[str], Set[Subscription]] = defaultdict(set)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def subscribe(self, invitation_id: Optional[str] = None) -> Subscription:
+        """Subscribe from a running event loop; events are delivered on it."""
+        subscription = Subscription(invitation_id, self.queue_size)
+        with self._lock:
+            self._subscribers[invitation_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.invitation_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.invitation_id]
+
+    def publish(self, kind: str, invitation: Invitation, vote: Optional[Vote] = None) -> None:
+        with self._lock:
+            subscribers = [*self._subscribers.get(None, ()), *self._subscribers.get(invitation.id, ())]
+            if not subscribers:
+                return
+            event = InvitationEvent(next(self._ids), kind, invitation, vote)
+        for subscription in subscribers:
+            if not subscription.offer(event):
+                self.unsubscribe(subscription)
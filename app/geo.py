@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+from math import asin, cos, degrees, floor, radians, sin, sqrt
+from statistics import median
+from typing import Dict, Iterable, List, Sequence, Set, Tuple
+
+import numpy as np
+
+from .shared import SharedDict
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance in kilometres between two lat/lon points."""
+    phi1, phi2 = radians(lat1), radians(lat2)
+    half_dphi = (phi2 - phi1) / 2
+    half_dlambda = radians(lon2 - lon1) / 2
+    a = sin(half_dphi) ** 2 + cos(phi1) * cos(phi2) * sin(half_dlambda) ** 2
+    return 2 * EARTH_RADIUS_KM * asin(min(1.0, sqrt(a)))
+
+
+def haversine_matrix(
+    latitudes_a: Sequence[float],
+    longitudes_a: Sequence[float],
+    latitudes_b: Sequence[float],
+    longitudes_b: Sequence[float],
+) -> np.ndarray:
+    """Distances in kilometres between every point of ``a`` and every point of ``b``.
+
+    Returns an ``len(a) × len(b)`` matrix computed with one set of array
+    operations, so scoring can measure a whole group against many restaurants.
+    """
+    phi_a = np.radians(np.asarray(latitudes_a, dtype=np.float64))[:, np.newaxis]
+    phi_b = np.radians(np.asarray(latitudes_b, dtype=np.float64))[np.newaxis, :]
+    lambda_a = np.radians(np.asarray(longitudes_a, dtype=np.float64))[:, np.newaxis]
+    lambda_b = np.radians(np.asarray(longitudes_b, dtype=np.float64))[np.newaxis, :]
+    a = np.sin((phi_b - phi_a) / 2) ** 2 + np.cos(phi_a) * np.cos(phi_b) * np.sin((lambda_b - lambda_a) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(1.0, np.sqrt(a)))
+
+
+def median_point(points: Iterable[Tuple[float, float]]) -> Tuple[float, float]:
+    """Component-wise median of ``(latitude, longitude)`` points."""
+    latitudes, longitudes = zip(*points)
+    return median(latitudes), median(longitudes)
+
+
+def bounding_box(latitude: float, radius_km: float) -> Tuple[float, float, float]:
+    """Latitude range and longitude half-width, in degrees, covering a radius.
+
+    A path of length r moves at most r / R radians in latitude, and at most
+    r / (R cos φ) in longitude while |φ| stays inside that band. A half-width
+    of 180 or more means every longitude is reachable.
+    """
+    latitude_span = degrees(radius_km / EARTH_RADIUS_KM)
+    lowest = max(latitude - latitude_span, -90.0)
+    highest = min(latitude + latitude_span, 90.0)
+    band_edge = radians(max(abs(lowest), abs(highest)))
+    return lowest, highest, degrees(radius_km / (EARTH_RADIUS_KM * cos(band_edge)))
+
+
+class GridIndex:
+    """Bucket points into fixed-size lat/lon cells for radius queries.
+
+    A query only looks at the cells its radius can reach and then filters the
+    candidates by exact haversine distance.
+    """
+
+    def __init__(self, cell_degrees: float = 0.1) -> None:
+        self.cell_degrees = cell_degrees
+        self.longitude_cells = int(round(360 / cell_degrees))
+        self.cells: SharedDict[Tuple[int, int], Dict[str, Tuple[float, float]]] = SharedDict()
+        self.keys: SharedDict[str, Tuple[int, int]] = SharedDict()
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def _latitude_cell(self, latitude: float) -> int:
+        return floor((latitude + 90) / self.cell_degrees)
+
+    def _longitude_cell(self, longitude: float) -> int:
+        return floor((longitude + 180) / self.cell_degrees) % self.longitude_cells
+
+    def copy(self) -> "GridIndex":
+        """An independent index sharing the (never mutated) cell dicts."""
+        clone = GridIndex(self.cell_degrees)
+        clone.cells = self.cells.copy()
+        clone.keys = self.keys.copy()
+        return clone
+
+    def add(self, item_id: str, latitude: float, longitude: float) -> None:
+        self.remove(item_id)
+        key = (self._latitude_cell(latitude), self._longitude_cell(longitude))
+        # Cells are replaced rather than updated so copies stay independent.
+        self.cells[key] = {**self.cells.get(key, {}), item_id: (latitude, longitude)}
+        self.keys[item_id] = key
+
+    def remove(self, item_id: str) -> None:
+        key = self.keys.pop(item_id, None)
+        if key is None:
+            return
+        cell = {other_id: point for other_id, point in self.cells[key].items() if other_id != item_id}
+        if cell:
+            self.cells[key] = cell
+        else:
+            del self.cells[key]
+
+    def within(self, latitude: float, longitude: float, radius_km: float) -> List[Tuple[str, float]]:
+        """``(item_id, distance_km)`` pairs within ``radius_km``, nearest first."""
+        matches = []
+        for key in self._cells_around(latitude, longitude, radius_km):
+            for item_id, (item_latitude, item_longitude) in self.cells.get(key, {}).items():
+                distance = haversine_km(latitude, longitude, item_latitude, item_longitude)
+                if distance <= radius_km:
+                    matches.append((item_id, distance))
+        matches.sort(key=lambda match: (match[1], match[0]))
+        return matches
+
+    def _cells_around(self, latitude: float, longitude: float, radius_km: float) -> Set[Tuple[int, int]]:
+        lowest, highest, longitude_span = bounding_box(latitude, radius_km)
+        latitude_cells = range(self._latitude_cell(lowest), self._latitude_cell(highest) + 1)
+        if longitude_span >= 180:
+            return {key for key in self.cells if key[0] in latitude_cells}
+        first = floor((longitude - longitude_span + 180) / self.cell_degrees)
+        last = floor((longitude + longitude_span + 180) / self.cell_degrees)
+        longitude_keys = {cell % self.longitude_cells for cell in range(first, last + 1)}
+        return {(lat_cell, lon_cell) for lat_cell in latitude_cells for lon_cell in longitude_keys}
@@ -0,0 +1,273 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone, tzinfo
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from .intervals import from_epoch, to_epoch
+
+DAY = 86_400.0
+WEEKDAYS = {"MO": 0, "TU": 1, "WE": 2, "TH": 3, "FR": 4, "SA": 5, "SU": 6}
+
+# Properties of a VEVENT that decide when it blocks the calendar.
+_EVENT_PROPERTIES = frozenset({"DTSTART", "DTEND", "DURATION", "RRULE", "EXDATE", "TRANSP", "STATUS"})
+
+Window = Tuple[float, float]
+
+
+class FreeBusyParser:
+    """Incremental iCalendar reader that turns busy time into free windows.
+
+    Text is fed in chunks as it arrives, so only the current line and the
+    busy blocks inside the horizon are held, never the whole file. Busy time
+    comes from opaque, non-cancelled VEVENTs and from BUSY periods of
+    VFREEBUSY exports. Daily and weekly RRULEs (INTERVAL, COUNT, UNTIL, BYDAY,
+    EXDATE) are expanded inside the horizon only; other recurrences count
+    their first occurrence. Times are compared as UTC; floating times are
+    taken as UTC, like naive datetimes elsewhere in the app.
+    """
+
+    def __init__(self, horizon_start: datetime, horizon_end: datetime) -> None:
+        if horizon_end <= horizon_start:
+            raise ValueError("horizon_end must be after horizon_start")
+        self.naive = horizon_start.tzinfo is None and horizon_end.tzinfo is None
+        self.start = to_epoch(horizon_start)
+        self.end = to_epoch(horizon_end)
+        self.busy: List[Window] = []
+        # Calendar dates a day either side of the horizon: no time zone moves
+        # an event further, so one-off events outside them skip time parsing.
+        self._first_day = (from_epoch(self.start, True) - timedelta(days=1)).strftime("%Y%m%d")
+        self._last_day = (from_epoch(self.end, True) + timedelta(days=1)).strftime("%Y%m%d")
+        self._partial = ""
+        self._line: Optional[str] = None
+        self._event: Optional[Dict[str, List[Tuple[str, str]]]] = None
+
+    def feed(self, text: str) -> None:
+        lines = (self._partial + text).split("\n")
+        self._partial = lines.pop()
+        current = self._line
+        for line in lines:
+            if line[-1:] == "\r":
+                line = line[:-1]
+            if line[:1] in (" ", "\t"):
+                # A folded continuation of the previous content line.
+                if current is not None:
+                    current += line[1:]
+                continue
+            if current is not None:
+                self._logical(current)
+            current = line
+        self._line = current
+
+    def close(self) -> None:
+        if self._partial:
+            self.feed("\n")
+        if self._line is not None:
+            self._logical(self._line)
+            self._line = None
+
+    def free_windows(self, min_length: timedelta = timedelta(0)) -> List[Tuple[datetime, datetime]]:
+        """The horizon minus every busy block, as sorted non-overlapping windows."""
+        return [self._datetimes(window) for window in self._free(min_length.total_seconds())]
+
+    def busy_windows(self, min_free: timedelta = timedelta(0)) -> List[Tuple[datetime, datetime]]:
+        """The rest of the horizon: merged busy blocks and free gaps shorter than ``min_free``."""
+        windows = []
+        cursor = self.start
+        for start, end in self._free(min_free.total_seconds()):
+            if start > cursor:
+                windows.append((cursor, start))
+            cursor = end
+        if self.end > cursor:
+            windows.append((cursor, self.end))
+        return [self._datetimes(window) for window in windows]
+
+    def _free(self, shortest: float) -> List[Window]:
+        windows = []
+        cursor = self.start
+        for start, end in sorted(self.busy):
+            if start > cursor and start - cursor >= shortest:
+                windows.append((cursor, start))
+            cursor = max(cursor, end)
+        if self.end > cursor and self.end - cursor >= shortest:
+            windows.append((cursor, self.end))
+        return windows
+
+    def _datetimes(self, window: Window) -> Tuple[datetime, datetime]:
+        return from_epoch(window[0], self.naive), from_epoch(window[1], self.naive)
+
+    # Lines -----------------------------------------------------------------
+    def _logical(self, line: str) -> None:
+        head, _, value = line.partition(":")
+        name, _, parameters = head.partition(";")
+        name = name.upper()
+        if name == "BEGIN":
+            if value.strip().upper() == "VEVENT":
+                self._event = {}
+        elif name == "END":
+            if value.strip().upper() == "VEVENT" and self._event is not None:
+                self._finish_event(self._event)
+                self._event = None
+        elif self._event is not None:
+            if name in _EVENT_PROPERTIES:
+                self._event.setdefault(name, []).append((parameters, value.strip()))
+        elif name == "FREEBUSY":
+            self._free_busy(parameters, value)
+
+    # Components ------------------------------------------------------------
+    def _finish_event(self, event: Dict[str, List[Tuple[str, str]]]) -> None:
+        if "DTSTART" not in event:
+            return
+        if _value(event, "TRANSP").upper() == "TRANSPARENT" or _value(event, "STATUS").upper() == "CANCELLED":
+            return
+        if "RRULE" not in event:
+            if event["DTSTART"][0][1][:8] > self._last_day:
+                return
+            if "DTEND" in event and event["DTEND"][0][1][:8] < self._first_day:
+                return
+        start, zone, all_day = _parse_time(*event["DTSTART"][0])
+        if "DTEND" in event:
+            end, end_zone, _ = _parse_time(*event["DTEND"][0])
+            length = _epoch(end, end_zone) - _epoch(start, zone)
+        elif "DURATION" in event:
+            length = _parse_duration(event["DURATION"][0][1])
+        else:
+            length = DAY if all_day else 0.0
+        if length <= 0:
+            return
+        rule = _parse_rule(_value(event, "RRULE"))
+        if rule is None:
+            self._add(_epoch(start, zone), length)
+            return
+        excluded = {
+            _epoch(*_parse_time(parameters, moment)[:2])
+            for parameters, values in event.get("EXDATE", ())
+            for moment in values.split(",")
+        }
+        for occurrence in self._occurrences(start, zone, length, rule):
+            if occurrence not in excluded:
+                self._add(occurrence, length)
+
+    def _occurrences(self, start: datetime, zone: Optional[tzinfo], length: float, rule: Dict[str, str]):
+        """Epoch starts of a daily or weekly rule's occurrences up to the horizon end."""
+        frequency = rule.get("FREQ")
+        step_days = {"DAILY": 1, "WEEKLY": 7}.get(frequency)
+        if step_days is None or set(rule) - {"FREQ", "INTERVAL", "COUNT", "UNTIL", "BYDAY", "WKST"}:
+            yield _epoch(start, zone)
+            return
+        step = timedelta(days=step_days * max(int(rule.get("INTERVAL", "1")), 1))
+        count = int(rule["COUNT"]) if "COUNT" in rule else None
+        until = _epoch(*_parse_time("", rule["UNTIL"])[:2]) if "UNTIL" in rule else None
+        offsets = [timedelta(0)]
+        anchor = start
+        if frequency == "WEEKLY" and "BYDAY" in rule:
+            anchor = start - timedelta(days=start.weekday())
+            offsets = sorted(timedelta(days=WEEKDAYS[day[-2:]]) for day in rule["BYDAY"].split(",") if day[-2:] in WEEKDAYS)
+        periods = 0
+        if count is None:
+            # Without COUNT nothing before the horizon matters, so jump close to it.
+            behind = self.start - length - _epoch(anchor, zone)
+            periods = max(int(behind // step.total_seconds()) - 1, 0)
+        seen = 0
+        while True:
+            period_start = anchor + step * periods
+            for offset in offsets:
+                moment = period_start + offset
+                if moment < start:
+                    continue
+                occurrence = _epoch(moment, zone)
+                if (until is not None and occurrence > until) or occurrence >= self.end:
+                    return
+                seen += 1
+                if count is not None and seen > count:
+                    return
+                yield occurrence
+            periods += 1
+
+    def _free_busy(self, parameters: str, value: str) -> None:
+        kind = _parameter(parameters, "FBTYPE") or "BUSY"
+        if kind.upper() == "FREE":
+            return
+        for period in value.split(","):
+            first, _, second = period.strip().partition("/")
+            if not second:
+                continue
+            start = _epoch(*_parse_time("", first)[:2])
+            if second[:1] in ("P", "+", "-"):
+                length = _parse_duration(second)
+            else:
+                length = _epoch(*_parse_time("", second)[:2]) - start
+            if length > 0:
+                self._add(start, length)
+
+    def _add(self, start: float, length: float) -> None:
+        end = start + length
+        if end > self.start and start < self.end:
+            self.busy.append((max(start, self.start), min(end, self.end)))
+
+
+def _value(event: Dict[str, List[Tuple[str, str]]], name: str) -> str:
+    values = event.get(name)
+    return values[0][1] if values else ""
+
+
+def _parameter(parameters: str, name: str) -> Optional[str]:
+    for parameter in parameters.split(";"):
+        key, _, value = parameter.partition("=")
+        if key.upper() == name:
+            return value.strip('"')
+    return None
+
+
+def _parse_time(parameters: str, value: str) -> Tuple[datetime, Optional[tzinfo], bool]:
+    """Wall-clock time, its zone (None for floating) and whether it is a whole day."""
+    value = value.strip()
+    if len(value) == 8:
+        return datetime(int(value[:4]), int(value[4:6]), int(value[6:8])), None, True
+    moment = datetime(
+        int(value[:4]), int(value[4:6]), int(value[6:8]), int(value[9:11]), int(value[11:13]), int(value[13:15])
+    )
+    if value.endswith("Z"):
+        return moment, timezone.utc, False
+    zone_name = _parameter(parameters, "TZID")
+    return moment, _zone(zone_name) if zone_name else None, False
+
+
+@lru_cache(maxsize=64)
+def _zone(name: str) -> Optional[tzinfo]:
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        return None
+
+
+def _epoch(moment: datetime, zone: Optional[tzinfo]) -> float:
+    return to_epoch(moment if zone is None else moment.replace(tzinfo=zone))
+
+
+def _parse_duration(value: str) -> float:
+    """Seconds in an RFC 5545 duration such as ``PT1H30M`` or ``-P1W``."""
+    value = value.strip()
+    sign = -1.0 if value.startswith("-") else 1.0
+    value = value.lstrip("+-")[1:]
+    seconds = 0.0
+    number = ""
+    units = {"W": 7 * DAY, "D": DAY, "H": 3600.0, "M": 60.0, "S": 1.0}
+    for character in value:
+        if character.isdigit():
+            number += character
+        elif character in units:
+            seconds += int(number or 0) * units[character]
+            number = ""
+    return sign * seconds
+
+
+def _parse_rule(value: str) -> Optional[Dict[str, str]]:
+    if not value:
+        return None
+    rule = {}
+    for part in value.split(";"):
+        key, _, setting = part.partition("=")
+        rule[key.upper()] = setting.upper()
+    return rule
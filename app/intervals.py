@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Iterator, List, Tuple
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def to_epoch(moment: datetime) -> float:
+    """Seconds since the Unix epoch; naive datetimes are read as UTC."""
+    if moment.tzinfo is None:
+        return (moment - EPOCH).total_seconds()
+    return moment.timestamp()
+
+
+def from_epoch(seconds: float, naive: bool) -> datetime:
+    moment = EPOCH + timedelta(seconds=seconds)
+    return moment if naive else moment.replace(tzinfo=timezone.utc)
+
+
+class IntervalIndex:
+    """Sorted, non-overlapping availability windows of a single user.
+
+    Overlapping windows are merged on construction so a slot is covered
+    exactly when the window starting at or before it reaches its end, which a
+    single bisect finds. Windows that only touch stay apart: as with separate
+    availabilities, a slot spanning both is not covered. Window bounds are packed into two arrays of
+    epoch seconds (8 bytes each) instead of ``datetime`` objects; iteration
+    turns them back into naive datetimes, or UTC ones if any window was
+    timezone-aware.
+    """
+
+    __slots__ = ("starts", "ends", "naive")
+
+    def __init__(self, windows: Iterable[Tuple[datetime, datetime]] = ()) -> None:
+        self.starts = array("d")
+        self.ends = array("d")
+        self.naive = True
+        bounds = []
+        for start, end in windows:
+            if start.tzinfo is not None or end.tzinfo is not None:
+                self.naive = False
+            bounds.append((to_epoch(start), to_epoch(end)))
+        bounds.sort()
+        for start, end in bounds:
+            if self.ends and start < self.ends[-1]:
+                if end > self.ends[-1]:
+                    self.ends[-1] = end
+                continue
+            self.starts.append(start)
+            self.ends.append(end)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def __iter__(self) -> Iterator[Tuple[datetime, datetime]]:
+        for start, end in zip(self.starts, self.ends):
+            yield from_epoch(start, self.naive), from_epoch(end, self.naive)
+
+    def covers(self, start: datetime, end: datetime) -> bool:
+        return self.covers_epoch(to_epoch(start), to_epoch(end))
+
+    def covers_epoch(self, start: float, end: float) -> bool:
+        position = bisect_right(self.starts, start) - 1
+        return position >= 0 and self.ends[position] >= end
+
+    def with_window(self, start: datetime, end: datetime) -> "IntervalIndex":
+        """A copy with ``start``–``end`` merged in; adding a covered window changes nothing.
+
+        Only the windows the new one overlaps are replaced, so the cost is two
+        bisects and one array splice rather than a rebuild.
+        """
+        low, high = to_epoch(start), to_epoch(end)
+        first = bisect_right(self.ends, low)
+        last = bisect_left(self.starts, high)
+        if first < last:
+            low, high = min(low, self.starts[first]), max(high, self.ends[last - 1])
+        naive = self.naive and start.tzinfo is None and end.tzinfo is None
+        return self._spliced(first, last, [(low, high)], naive)
+
+    def without_window(self, start: datetime, end: datetime) -> "IntervalIndex":
+        """A copy with ``start``–``end`` cut out; removing a free gap changes nothing."""
+        low, high = to_epoch(start), to_epoch(end)
+        first = bisect_right(self.ends, low)
+        last = bisect_left(self.starts, high)
+        remaining = []
+        if first < last:
+            if self.starts[first] < low:
+                remaining.append((self.starts[first], low))
+            if self.ends[last - 1] > high:
+                remaining.append((high, self.ends[last - 1]))
+        return self._spliced(first, last, remaining, self.naive)
+
+    def _spliced(self, first: int, last: int, windows: List[Tuple[float, float]], naive: bool) -> "IntervalIndex":
+        index = IntervalIndex()
+        index.starts = self.starts[:first] + array("d", [start for start, _ in windows]) + self.starts[last:]
+        index.ends = self.ends[:first] + array("d", [end for _, end in windows]) + self.ends[last:]
+        index.naive = naive
+        return index
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import queue
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field, replace
+from typing import Any, Callable, List, Optional
+from uuid import uuid4
+
+from .models import InvitationOption
+
+# Finished jobs kept around so late progress requests still get the result.
+FINISHED_JOBS_KEPT = 1000
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class JobQueueFull(Exception):
+    """Raised when the background queue cannot take another job."""
+
+
+@dataclass(frozen=True, slots=True)
+class JobProgress:
+    """One immutable state of a job; ``version`` grows with every update."""
+
+    version: int = 0
+    status: str = QUEUED
+    evaluated: int = 0
+    total: int = 0
+    top_options: List[InvitationOption] = field(default_factory=list)
+    error: Optional[str] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (DONE, FAILED)
+
+
+class InvitationJob:
+    """A background invitation build and its latest published progress.
+
+    Progress is replaced rather than mutated, so readers always see one
+    consistent state without locking.
+    """
+
+    __slots__ = ("job_id", "invitation_id", "progress", "_lock")
+
+    def __init__(self, invitation_id: str) -> None:
+        self.job_id = uuid4().hex
+        self.invitation_id = invitation_id
+        self.progress = JobProgress()
+        self._lock = threading.Lock()
+
+    def publish(self, **changes: Any) -> None:
+        with self._lock:
+            self.progress = replace(self.progress, version=self.progress.version + 1, **changes)
+
+
+class JobQueue:
+    """Bounded queue of invitation jobs drained by a few worker threads.
+
+    ``submit`` fails fast with ``JobQueueFull`` instead of letting a backlog
+    grow without limit. Workers start on the first submission.
+    """
+
+    def __init__(self, workers: int, capacity: int) -> None:
+        self.workers = workers
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue(maxsize=capacity)
+        self._jobs: "OrderedDict[str, InvitationJob]" = OrderedDict()
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+
+    def submit(self, invitation_id: str, work: Callable[[InvitationJob], None]) -> InvitationJob:
+        """Queue ``work(job)`` for ``invitation_id`` and return the job."""
+        job = InvitationJob(invitation_id)
+        with self._lock:
+            current = self._jobs.get(invitation_id)
+            if current is not None and not current.progress.finished:
+                raise ValueError(f"Invitation {invitation_id} is already being built")
+            try:
+                self._queue.put_nowait((job, work))
+            except queue.Full:
+                raise JobQueueFull("Too many invitations are being built; retry later") from None
+            self._jobs[invitation_id] = job
+            self._jobs.move_to_end(invitation_id)
+            self._forget_finished()
+            if not self._threads:
+                self._start()
+        return job
+
+    def get(self, invitation_id: str) -> Optional[InvitationJob]:
+        return self._jobs.get(invitation_id)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            threads, self._threads = self._threads, []
+        for _ in threads:
+            self._queue.put(None)
+        for thread in threads:
+            thread.join(timeout=1.0)
+
+    def _start(self) -> None:
+        for number in range(max(self.workers, 1)):
+            thread = threading.Thread(target=self._drain, name=f"invitation-jobs-{number}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _drain(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            job, work = item
+            job.publish(status=RUNNING)
+            try:
+                work(job)
+            except Exception as exc:
+                job.publish(status=FAILED, error=str(exc))
+
+    def _forget_finished(self) -> None:
+        excess = len(self._jobs) - FINISHED_JOBS_KEPT
+        for invitation_id in list(self._jobs):
+            if excess <= 0:
+                return
+            if self._jobs[invitation_id].progress.finished:
+                del self._jobs[invitation_id]
+                excess -= 1
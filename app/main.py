@@ -1,28 +1,63 @@
 from __future__ import annotations
 
+import asyncio
+import codecs
+import hashlib
+import json
+from contextlib import asynccontextmanager
+from dataclasses import asdict
+from datetime import datetime, timedelta
+from itertools import islice
 from textwrap import dedent
-from typing import List, Optional
+from typing import AsyncIterator, Callable, Iterable, Iterator, List, Optional, TypeVar, Union
 
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import HTMLResponse
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
 
 from . import services
-from .models import Availability, Invitation, InvitationOption, Restaurant, User
+from .config import settings
+from .encoding import EncodedCache, encode_array, encode_invitation, encode_restaurant, encode_user
+from .events import RESYNC, InvitationEvent, Subscription
+from .ical import FreeBusyParser
+from .jobs import DONE, InvitationJob, JobQueueFull
+from .models import Availability, AvailabilityRule, Invitation, InvitationOption, Restaurant, User
+from .pagination import Page, decode_cursor, encode_cursor
 from .repository import repository
 from .schemas import (
     AvailabilityCreate,
+    AvailabilityPatch,
     AvailabilityRead,
+    AvailabilityRuleCreate,
+    AvailabilityRuleRead,
+    InvitationBatchCreate,
+    InvitationBatchItemRead,
     InvitationCreate,
+    InvitationJobRead,
     InvitationOptionRead,
+    InvitationProgressRead,
     InvitationRead,
+    NearbyRestaurantRead,
     RestaurantCreate,
     RestaurantRead,
+    SelectionStatsRead,
+    SlotAvailabilityRead,
     UserCreate,
     UserRead,
     VoteCreate,
+    VoteRead,
+    VoteTallyRead,
 )
 
-app = FastAPI(title="TogetherDine API", version="0.1.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    yield
+    services.invitation_jobs.shutdown()
+    services.scoring_pool.shutdown()
+
+
+app = FastAPI(title="TogetherDine API", version="0.1.0", lifespan=lifespan)
 
 
 UI_HTML = dedent(
@@ -151,7 +186,10 @@ UI_HTML = dedent(
               <input name=\"inv-participants\" placeholder=\"alice, bob\" required />
             </label>
             <label>Candidate restaurant IDs (comma separated)
-              <input name=\"inv-restaurants\" placeholder=\"rest-1, rest-2\" required />
+              <input name=\"inv-restaurants\" placeholder=\"rest-1, rest-2\" />
+            </label>
+            <label>Recommend top N from wishlists
+              <input name=\"inv-recommend\" type=\"number\" min=\"1\" placeholder=\"optional\" />
             </label>
             <label>Top options limit
               <input name=\"inv-limit\" type=\"number\" min=\"1\" max=\"10\" value=\"3\" />
@@ -177,17 +215,18 @@ UI_HTML = dedent(
         </section>
 
         <section>
-          <h2>Confirm Invitation</h2>
+          <h2>Vote or Confirm</h2>
           <form id=\"confirm-form\">
             <label>Invitation ID
               <input name=\"confirm-invitation\" placeholder=\"inv-1\" required />
             </label>
-            <label>User ID (voter)
+            <label>User ID (voter, or organizer to confirm)
               <input name=\"confirm-user\" placeholder=\"alice\" required />
             </label>
             <label>Option index
               <input name=\"confirm-index\" type=\"number\" min=\"0\" value=\"0\" required />
             </label>
+            <button type=\"button\" id=\"vote-option\" class=\"secondary\">Vote</button>
             <button type=\"submit\" class=\"primary\">Confirm Option</button>
           </form>
         </section>
@@ -276,10 +315,32 @@ UI_HTML = dedent(
             snapshot.textContent = formatted;
           }
 
+          const invitations = new Map();
+
+          function renderInvitations() {
+            const target = document.getElementById('invitations-output');
+            target.textContent = JSON.stringify([...invitations.values()], null, 2) || '[]';
+          }
+
           async function refreshInvitations() {
             const data = await apiRequest('/invitations');
-            const target = document.getElementById('invitations-output');
-            target.textContent = JSON.stringify(data, null, 2) || '[]';
+            invitations.clear();
+            data.forEach(invitation => invitations.set(invitation.id, invitation));
+            renderInvitations();
+          }
+
+          function followInvitations() {
+            // Each event carries one changed invitation; patch it in place.
+            const source = new EventSource('/events');
+            const update = (event) => {
+              const invitation = JSON.parse(event.data);
+              invitations.set(invitation.id, invitation);
+              renderInvitations();
+            };
+            source.addEventListener('options', update);
+            source.addEventListener('confirmed', update);
+            // Events were dropped while this tab fell behind; reload the list.
+            source.addEventListener('resync', () => refreshInvitations().catch((error) => showMessage('error', error.message)));
           }
 
           async function refreshAll() {
@@ -358,19 +419,8 @@ UI_HTML = dedent(
               return;
             }
             try {
-              let existing = [];
-              const response = await fetch(`/users/${encodeURIComponent(userId)}/availabilities`);
-              if (response.ok) {
-                existing = await response.json();
-              } else if (response.status === 404) {
-                existing = [];
-              } else {
-                const detail = await response.json().catch(() => ({}));
-                const messageText = detail.detail || 'Could not fetch existing availability.';
-                throw new Error(messageText);
-              }
-              const payload = [...existing, { slot_start: start, slot_end: end }];
-              await apiRequest(`/users/${encodeURIComponent(userId)}/availabilities`, { method: 'PUT', body: payload });
+              const payload = { add: [{ slot_start: start, slot_end: end }] };
+              await apiRequest(`/users/${encodeURIComponent(userId)}/availabilities`, { method: 'PATCH', body: payload });
               showMessage('success', 'Availability updated.');
               event.target.reset();
             } catch (error) {
@@ -438,22 +488,24 @@ UI_HTML = dedent(
               candidate_slots: slotState.map(slot => [slot.start, slot.end]),
               top_limit: limit,
             };
+            const recommendValue = data.get('inv-recommend');
+            if (recommendValue) {
+              payload.recommend_top_n = Number(recommendValue);
+            }
             try {
               await apiRequest('/invitations', { method: 'POST', body: payload });
               showMessage('success', 'Invitation generated.');
               event.target.reset();
               slotState.length = 0;
               renderSlots();
-              await refreshInvitations();
             } catch (error) {
               showMessage('error', `Invitation error: ${error.message}`);
             }
           });
 
-          document.getElementById('confirm-form').addEventListener('submit', async (event) => {
-            event.preventDefault();
+          async function submitChoice(action) {
             clearMessage();
-            const data = new FormData(event.target);
+            const data = new FormData(document.getElementById('confirm-form'));
             const invitationId = data.get('confirm-invitation');
             const optionIndex = Number(data.get('confirm-index'));
             if (Number.isNaN(optionIndex) || optionIndex < 0) {
@@ -464,20 +516,34 @@ UI_HTML = dedent(
               user_id: data.get('confirm-user'),
               option_index: optionIndex,
             };
+            const path = `/invitations/${encodeURIComponent(invitationId)}/${action}`;
             try {
-              await apiRequest(`/invitations/${encodeURIComponent(invitationId)}/confirm`, { method: 'POST', body: payload });
-              showMessage('success', 'Invitation confirmed.');
-              await refreshInvitations();
+              await apiRequest(path, { method: 'POST', body: payload });
+              if (action === 'votes') {
+                const tally = await apiRequest(`/invitations/${encodeURIComponent(invitationId)}/tally`);
+                const status = tally.confirmed_option ? 'Vote recorded; invitation confirmed.' : 'Vote recorded.';
+                showMessage('success', `${status} Votes per option: ${tally.option_votes.join(', ')}`);
+              } else {
+                showMessage('success', 'Invitation confirmed.');
+              }
             } catch (error) {
-              showMessage('error', `Confirm error: ${error.message}`);
+              showMessage('error', `${action === 'votes' ? 'Vote' : 'Confirm'} error: ${error.message}`);
             }
+          }
+
+          document.getElementById('confirm-form').addEventListener('submit', (event) => {
+            event.preventDefault();
+            submitChoice('confirm');
           });
 
+          document.getElementById('vote-option').addEventListener('click', () => submitChoice('votes'));
+
           document.getElementById('refresh-data').addEventListener('click', () => {
             refreshAll();
           });
 
           refreshAll().catch(error => showMessage('error', error.message));
+          followInvitations();
         });
       </script>
     </body>
@@ -504,17 +570,137 @@ def favicon() -> dict[str, str]:
     return {"message": "No favicon configured"}
 
 
+# Listing ------------------------------------------------------------------
+# Page size once a client pages with a cursor but names no limit.
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+# Without limit or cursor a listing is returned whole, as before paging existed.
+UNPAGED = 2**62
+
+Item = TypeVar("Item")
+
+# Encoded JSON of served entities, reused until the entity is replaced.
+encoded_cache = EncodedCache(settings.encoded_cache_size)
+
+
+def list_page(
+    request: Request,
+    collection: str,
+    read: Callable[..., Page[Item]],
+    encode: Callable[[Item], bytes],
+    limit: Optional[int],
+    cursor: Optional[str],
+    **filters: object,
+) -> Response:
+    """One page of ``collection`` as JSON, or 304 if the client's copy is current.
+
+    The ETag is the collection's write counter plus a digest of the
+    normalized query, so an unchanged collection is answered without
+    reading or encoding anything and no two pages share a tag. A request
+    with neither ``limit`` nor ``cursor`` gets the whole listing.
+    """
+    if limit is None:
+        limit = UNPAGED if cursor is None else DEFAULT_PAGE_SIZE
+    try:
+        after = None if cursor is None else decode_cursor(cursor)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    query = json.dumps(
+        [limit, after, {name: value for name, value in sorted(filters.items()) if value is not None}],
+        separators=(",", ":"),
+    )
+    query_digest = hashlib.blake2b(query.encode(), digest_size=8).hexdigest()
+    with repository.reading():
+        etag = version_etag(collection, repository.collection_version(collection), query_digest)
+        if not_modified(request, etag):
+            return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+        try:
+            page = read(limit, after=after, **filters)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+    response = Response(
+        encode_array(encoded_cache.encode(item, encode) for item in page.items), media_type="application/json"
+    )
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+    if page.next_after is not None:
+        response.headers["X-Next-Cursor"] = encode_cursor(page.next_after)
+    return response
+
+
+def version_etag(*parts: object) -> str:
+    return '"' + "-".join(map(str, (repository.version_epoch, *parts))) + '"'
+
+
+def not_modified(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if header is None:
+        return False
+    if header.strip() == "*":
+        return True
+    # Weak comparison, as RFC 9110 asks for If-None-Match.
+    return etag in (candidate.strip().removeprefix("W/") for candidate in header.split(","))
+
+
+# Lines buffered into each chunk of an NDJSON export.
+EXPORT_BATCH = 64
+
+
+def export_lines(items: Iterator[Item], encode: Callable[[Item], bytes]) -> Iterator[bytes]:
+    """NDJSON lines for ``items``, encoded only as the client reads them."""
+    for batch in iter(lambda: list(islice(items, EXPORT_BATCH)), []):
+        yield b"".join(encoded_cache.encode(item, encode) + b"\n" for item in batch)
+
+
+def export_response(items: Iterable[Item], encode: Callable[[Item], bytes]) -> StreamingResponse:
+    return StreamingResponse(export_lines(iter(items), encode), media_type="application/x-ndjson")
+
+
 # Restaurant endpoints -----------------------------------------------------
 @app.post("/restaurants", response_model=RestaurantRead)
 def create_restaurant(payload: RestaurantCreate) -> RestaurantRead:
     restaurant = Restaurant(**payload.dict())
-    repository.add_restaurant(restaurant)
+    services.save_restaurant(restaurant)
     return RestaurantRead(**payload.dict())
 
 
 @app.get("/restaurants", response_model=List[RestaurantRead])
-def list_restaurants() -> List[RestaurantRead]:
-    return [RestaurantRead(**restaurant.__dict__) for restaurant in repository.list_restaurants()]
+def list_restaurants(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    tag: Optional[str] = None,
+    min_rating: Optional[float] = None,
+) -> Response:
+    return list_page(
+        request,
+        "restaurants",
+        repository.page_restaurants,
+        encode_restaurant,
+        limit,
+        cursor,
+        tag=tag,
+        min_rating=min_rating,
+    )
+
+
+@app.get("/export/restaurants", response_class=StreamingResponse)
+def export_restaurants() -> StreamingResponse:
+    return export_response(repository.scan_restaurants(), encode_restaurant)
+
+
+@app.get("/restaurants/nearby", response_model=List[NearbyRestaurantRead])
+def nearby_restaurants(
+    participant_ids: List[str] = Query(...),
+    radius_km: float = Query(..., gt=0),
+) -> List[NearbyRestaurantRead]:
+    with repository.reading():
+        try:
+            users = services.get_users(participant_ids)
+        except ValueError as exc:
+            raise HTTPException(status_code=404, detail=str(exc)) from exc
+        nearby = services.nearby_restaurants(users, radius_km)
+    return [NearbyRestaurantRead(**asdict(restaurant), distance_km=distance) for restaurant, distance in nearby]
 
 
 # User endpoints -----------------------------------------------------------
@@ -528,13 +714,23 @@ def create_user(payload: UserCreate) -> UserRead:
         latitude=payload.latitude,
         longitude=payload.longitude,
     )
-    repository.add_user(user)
+    services.save_user(user)
     return serialize_user(user)
 
 
 @app.get("/users", response_model=List[UserRead])
-def list_users() -> List[UserRead]:
-    return [serialize_user(user) for user in repository.list_users()]
+def list_users(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    name_prefix: Optional[str] = None,
+) -> Response:
+    return list_page(request, "users", repository.page_users, encode_user, limit, cursor, name_prefix=name_prefix)
+
+
+@app.get("/export/users", response_class=StreamingResponse)
+def export_users() -> StreamingResponse:
+    return export_response(repository.scan_users(), encode_user)
 
 
 def serialize_user(user: User) -> UserRead:
@@ -557,48 +753,421 @@ def set_availabilities(user_id: str, payload: List[AvailabilityCreate]) -> List[
         Availability(user_id=user_id, slot_start=item.slot_start, slot_end=item.slot_end)
         for item in payload
     ]
-    repository.set_availabilities(user_id, availabilities)
-    return [AvailabilityRead(**item.__dict__) for item in availabilities]
+    services.save_availabilities(user_id, availabilities)
+    return [AvailabilityRead(slot_start=item.slot_start, slot_end=item.slot_end) for item in availabilities]
+
+
+@app.patch("/users/{user_id}/availabilities", response_model=List[AvailabilityRead])
+def patch_availabilities(user_id: str, payload: AvailabilityPatch) -> List[AvailabilityRead]:
+    """Add and remove windows in one atomic, idempotent update; returns the result."""
+    if not repository.get_user(user_id):
+        raise HTTPException(status_code=404, detail="User not found")
+    try:
+        index = services.update_availability(
+            user_id,
+            add=[(item.slot_start, item.slot_end) for item in payload.add],
+            remove=[(item.slot_start, item.slot_end) for item in payload.remove],
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return [AvailabilityRead(slot_start=start, slot_end=end) for start, end in index]
+
+
+@app.post("/users/{user_id}/availabilities/ics", response_model=List[AvailabilityRead])
+async def import_calendar(
+    user_id: str,
+    request: Request,
+    horizon_start: datetime,
+    horizon_end: datetime,
+    min_free_minutes: int = Query(0, ge=0),
+) -> List[AvailabilityRead]:
+    """Replace the availability inside the horizon with the free time of an uploaded calendar.
+
+    The body is an iCalendar file (events or a VFREEBUSY export), parsed
+    as it streams in. Availability outside the horizon is kept.
+    """
+    if not await run_in_threadpool(repository.get_user, user_id):
+        raise HTTPException(status_code=404, detail="User not found")
+    try:
+        parser = FreeBusyParser(horizon_start, horizon_end)
+    except (TypeError, ValueError) as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    received = 0
+    try:
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > settings.ics_max_bytes:
+                raise HTTPException(status_code=413, detail="Calendar too large")
+            # Parsing is CPU-bound; keep it off the event loop.
+            await asyncio.to_thread(parser.feed, decoder.decode(chunk))
+        await asyncio.to_thread(finish_calendar, parser, decoder.decode(b"", final=True))
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=f"Invalid calendar: {exc}") from exc
+    min_free = timedelta(minutes=min_free_minutes)
+    index = await run_in_threadpool(
+        lambda: services.import_free_busy(user_id, parser.free_windows(min_free), parser.busy_windows(min_free))
+    )
+    return [AvailabilityRead(slot_start=start, slot_end=end) for start, end in index]
+
+
+def finish_calendar(parser: FreeBusyParser, tail: str) -> None:
+    parser.feed(tail)
+    parser.close()
 
 
 @app.get("/users/{user_id}/availabilities", response_model=List[AvailabilityRead])
-def get_availabilities(user_id: str) -> List[AvailabilityRead]:
+def get_availabilities(
+    user_id: str, request: Request, response: Response
+) -> Union[List[AvailabilityRead], Response]:
+    with repository.reading():
+        if not repository.get_user(user_id):
+            raise HTTPException(status_code=404, detail="User not found")
+        etag = version_etag("availabilities", repository.entity_version("availabilities", user_id))
+        if not_modified(request, etag):
+            return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+        availabilities = repository.get_availabilities(user_id)
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+    return [AvailabilityRead(slot_start=item.slot_start, slot_end=item.slot_end) for item in availabilities]
+
+
+@app.put("/users/{user_id}/availability-rules/{rule_id}", response_model=AvailabilityRuleRead)
+def put_availability_rule(user_id: str, rule_id: str, payload: AvailabilityRuleCreate) -> AvailabilityRuleRead:
+    """Create or replace a recurring window; occurrences are checked per slot, never stored."""
     if not repository.get_user(user_id):
         raise HTTPException(status_code=404, detail="User not found")
-    availabilities = repository.get_availabilities(user_id)
-    return [AvailabilityRead(**item.__dict__) for item in availabilities]
+    rule = AvailabilityRule(id=rule_id, user_id=user_id, **payload.dict())
+    try:
+        services.save_availability_rule(rule)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return serialize_availability_rule(rule)
+
+
+@app.get("/users/{user_id}/availability-rules", response_model=List[AvailabilityRuleRead])
+def list_availability_rules(user_id: str) -> List[AvailabilityRuleRead]:
+    with repository.reading():
+        if not repository.get_user(user_id):
+            raise HTTPException(status_code=404, detail="User not found")
+        rules = repository.get_availability_rules(user_id)
+    return [serialize_availability_rule(rule) for rule in rules]
+
+
+@app.delete("/users/{user_id}/availability-rules/{rule_id}", status_code=204)
+def delete_availability_rule(user_id: str, rule_id: str) -> Response:
+    if not services.delete_availability_rule(user_id, rule_id):
+        raise HTTPException(status_code=404, detail="Availability rule not found")
+    return Response(status_code=204)
+
+
+def serialize_availability_rule(rule: AvailabilityRule) -> AvailabilityRuleRead:
+    return AvailabilityRuleRead(
+        id=rule.id,
+        frequency=rule.frequency,
+        start_time=rule.start_time,
+        end_time=rule.end_time,
+        starts_on=rule.starts_on,
+        ends_on=rule.ends_on,
+        weekdays=rule.weekdays,
+        exceptions=rule.exceptions,
+    )
 
 
 # Invitation endpoints -----------------------------------------------------
-@app.post("/invitations", response_model=InvitationRead)
-def create_invitation(payload: InvitationCreate) -> InvitationRead:
+# Seconds between checks for new progress while streaming a job.
+PROGRESS_POLL_INTERVAL = 0.05
+
+
+@app.post(
+    "/invitations",
+    response_model=InvitationRead,
+    responses={202: {"model": InvitationJobRead, "description": "Queued for background building"}},
+)
+async def create_invitation(payload: InvitationCreate) -> Union[InvitationRead, JSONResponse]:
+    if payload.background:
+        return queue_invitation(payload)
     try:
-        candidate_slots = [(slot[0], slot[1]) for slot in payload.candidate_slots]
-        invitation = Invitation(
-            id=payload.id,
-            organizer_id=payload.organizer_id,
-            participant_ids=payload.participant_ids,
-            candidate_restaurant_ids=payload.candidate_restaurant_ids,
-            candidate_slots=candidate_slots,
-        )
-        invitation = services.build_invitation(invitation, limit=payload.top_limit)
-        return serialize_invitation(invitation)
+        invitation = await run_in_threadpool(resolve_invitation, payload)
+        invitation = await services.build_invitation_async(invitation, limit=payload.top_limit)
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
+    except TimeoutError as exc:
+        raise HTTPException(status_code=504, detail="Scoring the invitation timed out") from exc
+    return serialize_invitation(invitation)
+
+
+@app.post("/invitations:batch", response_model=List[InvitationBatchItemRead])
+async def create_invitations(payload: InvitationBatchCreate) -> List[InvitationBatchItemRead]:
+    """Build many invitations in one call, reporting success or failure per item."""
+    items = payload.invitations
+    resolved = await run_in_threadpool(resolve_invitations, items)
+    pending = [index for index, item in enumerate(resolved) if isinstance(item, Invitation)]
+    built = await services.build_invitations_async(
+        [resolved[index] for index in pending],
+        [items[index].top_limit for index in pending],
+    )
+    for index, outcome in zip(pending, built):
+        resolved[index] = outcome
+    results = []
+    for index, (item, outcome) in enumerate(zip(items, resolved)):
+        if isinstance(outcome, Invitation):
+            results.append(InvitationBatchItemRead(index=index, id=item.id, invitation=serialize_invitation(outcome)))
+        elif isinstance(outcome, TimeoutError):
+            results.append(InvitationBatchItemRead(index=index, id=item.id, error="Scoring the invitation timed out"))
+        else:
+            results.append(InvitationBatchItemRead(index=index, id=item.id, error=str(outcome)))
+    return results
+
+
+def resolve_invitations(items: List[InvitationCreate]) -> List[Union[Invitation, Exception]]:
+    resolved: List[Union[Invitation, Exception]] = []
+    seen = set()
+    with repository.reading():
+        for item in items:
+            if item.id in seen:
+                resolved.append(ValueError(f"Duplicate invitation id {item.id} in batch"))
+                continue
+            seen.add(item.id)
+            try:
+                resolved.append(resolve_invitation(item))
+            except ValueError as exc:
+                resolved.append(exc)
+    return resolved
+
+
+def queue_invitation(payload: InvitationCreate) -> JSONResponse:
+    def work(job: InvitationJob) -> None:
+        services.run_invitation_job(job, resolve_invitation(payload), limit=payload.top_limit)
+
+    try:
+        job = services.invitation_jobs.submit(payload.id, work)
+    except JobQueueFull as exc:
+        raise HTTPException(status_code=503, detail=str(exc)) from exc
+    except ValueError as exc:
+        raise HTTPException(status_code=409, detail=str(exc)) from exc
+    body = InvitationJobRead(
+        job_id=job.job_id,
+        invitation_id=job.invitation_id,
+        status=job.progress.status,
+        progress_url=app.url_path_for("invitation_progress", invitation_id=job.invitation_id),
+    )
+    return JSONResponse(status_code=202, content=body.dict())
+
+
+@app.get("/invitations/{invitation_id}/progress", response_class=StreamingResponse)
+async def invitation_progress(invitation_id: str) -> StreamingResponse:
+    """Stream NDJSON progress lines, one per improvement, until the job finishes."""
+    job = services.invitation_jobs.get(invitation_id)
+    if job is None:
+        invitation = await run_in_threadpool(repository.get_invitation, invitation_id)
+        if not invitation:
+            raise HTTPException(status_code=404, detail="Invitation not found")
+        finished = InvitationProgressRead(
+            invitation_id=invitation.id,
+            status=DONE,
+            evaluated=0,
+            total=len(invitation.candidate_restaurant_ids) * len(invitation.candidate_slots),
+            top_options=[serialize_option(option) for option in invitation.top_options],
+        )
+        return StreamingResponse(iter([finished.json() + "\n"]), media_type="application/x-ndjson")
+    return StreamingResponse(stream_progress(job), media_type="application/x-ndjson")
+
+
+async def stream_progress(job: InvitationJob) -> AsyncIterator[str]:
+    version = -1
+    while True:
+        progress = job.progress
+        if progress.version != version:
+            version = progress.version
+            line = InvitationProgressRead(
+                job_id=job.job_id,
+                invitation_id=job.invitation_id,
+                status=progress.status,
+                evaluated=progress.evaluated,
+                total=progress.total,
+                top_options=[serialize_option(option) for option in progress.top_options],
+                error=progress.error,
+            )
+            yield line.json() + "\n"
+            if progress.finished:
+                return
+        await asyncio.sleep(PROGRESS_POLL_INTERVAL)
+
+
+def resolve_invitation(payload: InvitationCreate) -> Invitation:
+    """The invitation described by ``payload`` with its candidates resolved."""
+    search = payload.slot_search
+    with repository.reading():
+        candidate_slots = services.resolve_candidate_slots(
+            payload.participant_ids,
+            [(slot[0], slot[1]) for slot in payload.candidate_slots],
+            (search.window_start, search.window_end) if search else None,
+            timedelta(minutes=search.duration_minutes) if search else None,
+            search.max_slots if search else 3,
+        )
+        candidate_restaurant_ids = services.resolve_candidate_restaurants(
+            payload.participant_ids,
+            payload.candidate_restaurant_ids,
+            payload.recommend_top_n,
+            payload.recommend_unvisited_only,
+            payload.recommend_within_km,
+        )
+    return Invitation(
+        id=payload.id,
+        organizer_id=payload.organizer_id,
+        participant_ids=payload.participant_ids,
+        candidate_restaurant_ids=candidate_restaurant_ids,
+        candidate_slots=candidate_slots,
+    )
 
 
 @app.post("/invitations/{invitation_id}/confirm", response_model=InvitationRead)
 def confirm_invitation(invitation_id: str, payload: VoteCreate) -> InvitationRead:
+    """Let the organizer confirm an option without waiting for the vote."""
     try:
-        invitation = services.confirm_option(invitation_id, payload.option_index)
+        invitation = services.confirm_option(invitation_id, payload.option_index, user_id=payload.user_id)
         return serialize_invitation(invitation)
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
 
 
+@app.post("/invitations/{invitation_id}/votes", response_model=VoteRead)
+def vote_on_invitation(invitation_id: str, payload: VoteCreate) -> VoteRead:
+    """Record a participant's vote; the vote that decides the invitation confirms it."""
+    try:
+        services.record_vote(invitation_id, payload.user_id, payload.option_index)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return VoteRead(user_id=payload.user_id, option_index=payload.option_index)
+
+
+@app.get("/invitations/{invitation_id}/tally", response_model=VoteTallyRead)
+def invitation_tally(invitation_id: str) -> VoteTallyRead:
+    try:
+        invitation, option_votes, voters = services.vote_tally(invitation_id)
+    except ValueError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
+    return VoteTallyRead(
+        invitation_id=invitation.id,
+        option_votes=option_votes,
+        voters=voters,
+        participants=len(invitation.participant_ids),
+        confirmed_option=serialize_option(invitation.confirmed_option),
+    )
+
+
+# Event streams ------------------------------------------------------------
+# Seconds of silence after which an SSE comment keeps proxies from timing out.
+EVENT_KEEPALIVE_INTERVAL = 15.0
+
+
+@app.get("/events", response_class=StreamingResponse)
+async def all_invitation_events() -> StreamingResponse:
+    """Server-sent events for every invitation."""
+    return event_stream(services.invitation_events.subscribe())
+
+
+@app.get("/invitations/{invitation_id}/events", response_class=StreamingResponse)
+async def invitation_events(invitation_id: str) -> StreamingResponse:
+    """Server-sent events for one invitation: new options, votes and confirmation."""
+    known = services.invitation_jobs.get(invitation_id) or await run_in_threadpool(
+        repository.get_invitation, invitation_id
+    )
+    if not known:
+        raise HTTPException(status_code=404, detail="Invitation not found")
+    return event_stream(services.invitation_events.subscribe(invitation_id))
+
+
+def event_stream(subscription: Subscription) -> StreamingResponse:
+    return StreamingResponse(
+        stream_events(subscription),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def stream_events(subscription: Subscription) -> AsyncIterator[bytes]:
+    """SSE frames for ``subscription`` until the client goes away."""
+    try:
+        yield b": connected\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.get(), EVENT_KEEPALIVE_INTERVAL)
+            except asyncio.TimeoutError:
+                yield b": keepalive\n\n"
+                continue
+            yield encode_event(event)
+    finally:
+        services.invitation_events.unsubscribe(subscription)
+
+
+def encode_event(event: InvitationEvent) -> bytes:
+    if event.kind == RESYNC:
+        data = b'{"dropped":%d}' % event.dropped
+    elif event.vote is not None:
+        data = json.dumps(
+            {
+                "invitation_id": event.vote.invitation_id,
+                "user_id": event.vote.user_id,
+                "option_key": event.vote.option_key,
+            },
+            separators=(",", ":"),
+        ).encode()
+    else:
+        data = encoded_cache.encode(event.invitation, encode_invitation)
+    return b"id: %d\nevent: %s\ndata: %s\n\n" % (event.event_id, event.kind.encode(), data)
+
+
 @app.get("/invitations", response_model=List[InvitationRead])
-def list_invitations() -> List[InvitationRead]:
-    return [serialize_invitation(invitation) for invitation in repository.list_invitations()]
+def list_invitations(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    organizer_id: Optional[str] = None,
+    participant_id: Optional[str] = None,
+) -> Response:
+    return list_page(
+        request,
+        "invitations",
+        repository.page_invitations,
+        encode_invitation,
+        limit,
+        cursor,
+        organizer_id=organizer_id,
+        participant_id=participant_id,
+    )
+
+
+@app.get("/export/invitations", response_class=StreamingResponse)
+def export_invitations() -> StreamingResponse:
+    return export_response(repository.scan_invitations(), encode_invitation)
+
+
+# Debug endpoints ----------------------------------------------------------
+@app.get("/invitations/{invitation_id}/availability", response_model=List[SlotAvailabilityRead])
+def invitation_availability(invitation_id: str) -> List[SlotAvailabilityRead]:
+    try:
+        bitmap = services.invitation_availability(invitation_id)
+    except ValueError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
+    ratios = bitmap.ratios()
+    return [
+        SlotAvailabilityRead(
+            slot_start=slot[0],
+            slot_end=slot[1],
+            available_user_ids=bitmap.participants(index),
+            blocked_user_ids=bitmap.blocked(index),
+            availability_ratio=float(ratios[index]),
+        )
+        for index, slot in enumerate(bitmap.slots)
+    ]
+
+
+@app.get("/debug/selection-stats", response_model=SelectionStatsRead)
+def selection_stats() -> SelectionStatsRead:
+    evaluated, pruned = services.selection_stats.totals()
+    return SelectionStatsRead(evaluated=evaluated, pruned=pruned)
 
 
 def serialize_invitation(invitation: Invitation) -> InvitationRead:
@@ -1,11 +1,11 @@
 from __future__ import annotations
 
 from dataclasses import dataclass, field
-from datetime import datetime
-from typing import Dict, List, Optional, Set
+from datetime import date, datetime, time
+from typing import AbstractSet, Dict, List, Optional
 
 
-@dataclass
+@dataclass(slots=True)
 class Restaurant:
     id: str
     name: str
@@ -15,24 +15,43 @@ class Restaurant:
     longitude: float
 
 
-@dataclass
+@dataclass(slots=True)
 class User:
     id: str
     name: str
-    wishlist: Set[str] = field(default_factory=set)
-    visited: Set[str] = field(default_factory=set)
+    wishlist: AbstractSet[str] = field(default_factory=set)
+    visited: AbstractSet[str] = field(default_factory=set)
     latitude: float = 0.0
     longitude: float = 0.0
 
 
-@dataclass
+@dataclass(slots=True)
 class Availability:
     user_id: str
     slot_start: datetime
     slot_end: datetime
 
 
-@dataclass
+@dataclass(slots=True)
+class AvailabilityRule:
+    """A window repeated daily or on ``weekdays`` (0 is Monday) from ``starts_on``.
+
+    An ``end_time`` at or before ``start_time`` ends on the next day.
+    ``exceptions`` lists the dates whose occurrence is skipped.
+    """
+
+    id: str
+    user_id: str
+    frequency: str
+    start_time: time
+    end_time: time
+    starts_on: date
+    ends_on: Optional[date] = None
+    weekdays: List[int] = field(default_factory=list)
+    exceptions: List[date] = field(default_factory=list)
+
+
+@dataclass(slots=True)
 class InvitationOption:
     restaurant_id: str
     slot_start: datetime
@@ -44,7 +63,7 @@ class InvitationOption:
     total_score: float
 
 
-@dataclass
+@dataclass(slots=True)
 class Invitation:
     id: str
     organizer_id: str
@@ -57,14 +76,14 @@ class Invitation:
     reservation_link: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class CalendarEvent:
     invitation_id: str
     option: InvitationOption
     url: str
 
 
-@dataclass
+@dataclass(slots=True)
 class Vote:
     invitation_id: str
     user_id: str
@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from typing import Any, Callable, Generic, Iterator, List, Optional, Sequence, Tuple, TypeVar, Union
+
+from .shared import SortedKeys
+
+Item = TypeVar("Item")
+Key = Tuple[Any, ...]
+
+# Rows fetched per page when scanning a whole collection.
+SCAN_CHUNK = 500
+
+# Sorts after every real character, closing the range of keys with a prefix.
+PREFIX_END = "\U0010ffff"
+
+_ASCII_LOWER = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz")
+
+
+@dataclass(slots=True)
+class Page(Generic[Item]):
+    """One page of a listing and the key to continue after, if any."""
+
+    items: List[Item]
+    next_after: Optional[Key] = None
+
+
+def fold_name(name: str) -> str:
+    """Name search key; ASCII-only lowering matches SQLite's ``lower()``."""
+    return name.translate(_ASCII_LOWER)
+
+
+def encode_cursor(key: Key) -> str:
+    return base64.urlsafe_b64encode(json.dumps(list(key), separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Key:
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError("Invalid cursor") from None
+    if not isinstance(key, list) or not key:
+        raise ValueError("Invalid cursor")
+    return tuple(key)
+
+
+def id_after(after: Optional[Key]) -> Optional[str]:
+    """The id in a cursor key of an id-ordered listing."""
+    if after is None:
+        return None
+    if len(after) != 1 or not isinstance(after[0], str):
+        raise ValueError("Invalid cursor")
+    return after[0]
+
+
+def pair_after(after: Optional[Key], first: Union[type, Tuple[type, ...]]) -> Optional[Key]:
+    """A ``(first, id)`` cursor key, checked for shape."""
+    if after is None:
+        return None
+    if len(after) != 2 or not isinstance(after[0], first) or not isinstance(after[1], str):
+        raise ValueError("Invalid cursor")
+    return after
+
+
+def keys_after(
+    keys: Sequence[Any],
+    limit: int,
+    after: Any = None,
+    lowest: Any = None,
+    stop: Optional[Callable[[Any], bool]] = None,
+    keep: Optional[Callable[[Any], bool]] = None,
+) -> Tuple[List[Any], bool]:
+    """Up to ``limit`` sorted keys past ``after`` and ``lowest``, and whether more follow.
+
+    The walk ends at the first key ``stop`` accepts; keys ``keep`` rejects are
+    skipped, so ``keep`` should only narrow an already selective index.
+    """
+    if isinstance(keys, SortedKeys):
+        start = 0 if lowest is None else keys.bisect_left(lowest)
+        if after is not None:
+            start = max(start, keys.bisect_right(after))
+        remaining = keys.iter_from(start)
+    else:
+        start = 0 if lowest is None else bisect_left(keys, lowest)
+        if after is not None:
+            start = max(start, bisect_right(keys, after))
+        remaining = (keys[position] for position in range(start, len(keys)))
+    found: List[Any] = []
+    for key in remaining:
+        if stop is not None and stop(key):
+            break
+        if keep is not None and not keep(key):
+            continue
+        if len(found) == limit:
+            return found, True
+        found.append(key)
+    return found, False
+
+
+def scan_pages(read: Callable[..., Page[Item]], chunk: int = SCAN_CHUNK) -> Iterator[Item]:
+    """Every item of a paged listing, reading ``chunk`` at a time as consumed."""
+    after: Optional[Key] = None
+    while True:
+        page = read(chunk, after=after)
+        yield from page.items
+        if page.next_after is None:
+            return
+        after = page.next_after
@@ -0,0 +1,281 @@
+from __future__ import annotations
+
+import gc
+import os
+import pickle
+import struct
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Sequence, Set, Tuple
+
+from .bitset import RestaurantIdRegistry, RestaurantSet
+from .intervals import IntervalIndex
+from .models import Availability, AvailabilityRule, CalendarEvent, Invitation, Restaurant, User, Vote
+from .pagination import fold_name
+from .repository import InMemoryRepository
+from .shared import SharedDict, SharedSet, SortedKeys
+
+SNAPSHOT_MAGIC = b"TDSNAP1\n"
+RECORD_HEADER = struct.Struct(">I")
+
+
+class DurableRepository(InMemoryRepository):
+    """``InMemoryRepository`` made durable with a write-ahead log and snapshots.
+
+    Every mutation is appended to ``wal.log`` before it is published. Writes
+    inside ``batch()`` are buffered and logged together just before the
+    outermost batch publishes, so a rolled-back batch leaves no records.
+    After ``snapshot_every`` records the whole state is written to a compact
+    pickle snapshot and the log is truncated, so a restart loads the snapshot
+    and replays only the tail of the log. Snapshots wait for the outermost
+    batch to publish, so they never miss staged writes. Records carry a
+    sequence number, which makes replay safe if the process dies between
+    writing a snapshot and truncating the log; a torn final record is dropped.
+    """
+
+    def __init__(self, directory: str, snapshot_every: int = 10_000, fsync: bool = False) -> None:
+        super().__init__()
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.snapshot_path = self.directory / "snapshot.bin"
+        self.wal_path = self.directory / "wal.log"
+        self.snapshot_every = snapshot_every
+        self.fsync = fsync
+        # Share the writer lock so logging and batches lock in one order.
+        self._lock = self._write_lock
+        self._sequence = 0
+        self._records_since_snapshot = 0
+        self._pending: List[bytes] = []
+        self._snapshot_due = False
+        self._recover()
+        self._wal: BinaryIO = open(self.wal_path, "ab")
+
+    # Mutations -----------------------------------------------------------
+    def add_restaurant(self, restaurant: Restaurant) -> None:
+        self._write("add_restaurant", restaurant)
+
+    def add_user(self, user: User) -> None:
+        # Log plain id sets rather than bitsets tied to this process's registry.
+        self._write(
+            "add_user",
+            User(
+                id=user.id,
+                name=user.name,
+                wishlist=set(user.wishlist),
+                visited=set(user.visited),
+                latitude=user.latitude,
+                longitude=user.longitude,
+            ),
+        )
+
+    def set_availabilities(self, user_id: str, availabilities: Iterable[Availability]) -> None:
+        self._write("set_availabilities", user_id, list(availabilities))
+
+    def update_availability(
+        self,
+        user_id: str,
+        add: Sequence[Tuple[datetime, datetime]] = (),
+        remove: Sequence[Tuple[datetime, datetime]] = (),
+    ) -> IntervalIndex:
+        return self._write("update_availability", user_id, list(add), list(remove))
+
+    def set_availability_rule(self, rule: AvailabilityRule) -> None:
+        self._write("set_availability_rule", rule)
+
+    def delete_availability_rule(self, user_id: str, rule_id: str) -> bool:
+        return self._write("delete_availability_rule", user_id, rule_id)
+
+    def add_invitation(self, invitation: Invitation) -> None:
+        self._write("add_invitation", invitation)
+
+    def save_calendar_event(self, event: CalendarEvent) -> None:
+        self._write("save_calendar_event", event)
+
+    def record_vote(self, vote: Vote) -> Dict[str, int]:
+        return self._write("record_vote", vote)
+
+    def clear(self) -> None:
+        with self._lock:
+            super().clear()
+            self.snapshot()
+
+    # Log and snapshot ----------------------------------------------------
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        with self._lock:
+            outermost = self._batch_depth == 0
+            try:
+                with super().batch():
+                    yield
+                    if outermost:
+                        self._flush_log()
+            except BaseException:
+                if outermost:
+                    self._sequence -= len(self._pending)
+                    self._pending.clear()
+                raise
+            if outermost and (self._snapshot_due or self._records_since_snapshot >= self.snapshot_every):
+                self.snapshot()
+
+    def _write(self, method: str, *args: Any) -> Any:
+        with self.batch():
+            result = getattr(InMemoryRepository, method)(self, *args)
+            self._sequence += 1
+            self._pending.append(pickle.dumps((self._sequence, method, args), protocol=pickle.HIGHEST_PROTOCOL))
+            return result
+
+    def _flush_log(self) -> None:
+        """Append the open batch's records; runs before the batch publishes."""
+        if not self._pending:
+            return
+        self._wal.write(b"".join(RECORD_HEADER.pack(len(payload)) + payload for payload in self._pending))
+        self._wal.flush()
+        if self.fsync:
+            os.fsync(self._wal.fileno())
+        self._records_since_snapshot += len(self._pending)
+        self._pending.clear()
+
+    def snapshot(self) -> None:
+        """Write the full state to disk and start a fresh log.
+
+        Inside a batch this is deferred until the outermost batch publishes.
+        """
+        with self._lock:
+            if self._batch_depth:
+                self._snapshot_due = True
+                return
+            current = self.read_snapshot()
+            state = {
+                "sequence": self._sequence,
+                "registry": current.restaurant_registry.ids,
+                # Entities are stored in insertion order, which replay restores.
+                "restaurants": [current.restaurants[restaurant_id] for _, restaurant_id in current.restaurant_order],
+                "users": [
+                    (user.id, user.name, user.wishlist.bits, user.visited.bits, user.latitude, user.longitude)
+                    for user in (current.users[user_id] for _, user_id in current.user_order)
+                ],
+                "wishlist_index": current.wishlist_index,
+                "availabilities": current.availabilities,
+                "availability_rules": [
+                    compiled.rule for rules in current.availability_rules.values() for compiled in rules
+                ],
+                "invitations": [current.invitations[invitation_id] for _, invitation_id in current.invitation_order],
+                "calendar_events": list(current.calendar_events.values()),
+                "votes": [vote for votes in current.votes.values() for vote in votes.values()],
+            }
+            temporary_path = self.snapshot_path.with_suffix(".tmp")
+            with open(temporary_path, "wb") as handle:
+                handle.write(SNAPSHOT_MAGIC)
+                pickle.dump(state, handle, protocol=pickle.HIGHEST_PROTOCOL)
+                handle.flush()
+                os.fsync(handle.fileno())
+            os.replace(temporary_path, self.snapshot_path)
+            if hasattr(self, "_wal"):
+                self._wal.close()
+            self._wal = open(self.wal_path, "wb")
+            self._records_since_snapshot = 0
+            self._snapshot_due = False
+
+    def close(self) -> None:
+        with self._lock:
+            self._wal.close()
+
+    def _recover(self) -> None:
+        if self.snapshot_path.exists():
+            # Loading allocates millions of long-lived objects; cyclic GC
+            # passes over them would dominate the cold start.
+            gc.disable()
+            try:
+                self._load_snapshot()
+            finally:
+                gc.enable()
+        if not self.wal_path.exists():
+            return
+        valid_length = 0
+        with InMemoryRepository.batch(self):
+            for end_offset, (sequence, method, args) in _read_records(self.wal_path):
+                valid_length = end_offset
+                if sequence <= self._sequence:
+                    continue
+                getattr(InMemoryRepository, method)(self, *args)
+                self._sequence = sequence
+                self._records_since_snapshot += 1
+        if valid_length != self.wal_path.stat().st_size:
+            with open(self.wal_path, "r+b") as handle:
+                handle.truncate(valid_length)
+
+    def _load_snapshot(self) -> None:
+        with open(self.snapshot_path, "rb") as handle:
+            if handle.read(len(SNAPSHOT_MAGIC)) != SNAPSHOT_MAGIC:
+                raise ValueError(f"{self.snapshot_path} is not a TogetherDine snapshot")
+            state = pickle.load(handle)
+        # The snapshot holds the repository's own structures (bitsets, merged
+        # intervals, the wishlist index), so loading assigns them directly
+        # instead of re-running every add_* call.
+        self._sequence = state["sequence"]
+        registry = RestaurantIdRegistry.from_ids(state["registry"])
+        with InMemoryRepository.batch(self):
+            self._stage(restaurant_registry=registry)
+            for restaurant in state["restaurants"]:
+                InMemoryRepository.add_restaurant(self, restaurant)
+            users = SharedDict(
+                (
+                    user_id,
+                    User(
+                        id=user_id,
+                        name=name,
+                        wishlist=RestaurantSet(wishlist_bits, registry),
+                        visited=RestaurantSet(visited_bits, registry),
+                        latitude=latitude,
+                        longitude=longitude,
+                    ),
+                )
+                for user_id, name, wishlist_bits, visited_bits, latitude, longitude in state["users"]
+            )
+            self._stage(
+                users=users,
+                user_order=SortedKeys(enumerate(user_id for user_id, *_ in state["users"])),
+                users_by_name=SortedKeys((fold_name(user.name), user.id) for user in users.values()),
+                wishlist_index=_wishlist_index(state["wishlist_index"]),
+                availabilities=_shared(state["availabilities"]),
+            )
+            for rule in state.get("availability_rules", ()):
+                InMemoryRepository.set_availability_rule(self, rule)
+            for invitation in state["invitations"]:
+                InMemoryRepository.add_invitation(self, invitation)
+            for event in state["calendar_events"]:
+                InMemoryRepository.save_calendar_event(self, event)
+            for vote in state["votes"]:
+                InMemoryRepository.record_vote(self, vote)
+
+
+def _shared(collection: Dict[str, Any]) -> SharedDict:
+    # Snapshots written before collections were shared hold plain dicts.
+    return collection if isinstance(collection, SharedDict) else SharedDict(collection)
+
+
+def _wishlist_index(index: Dict[str, Set[str]]) -> SharedDict:
+    if isinstance(index, SharedDict):
+        return index
+    return SharedDict((restaurant_id, SharedSet(wishers)) for restaurant_id, wishers in index.items())
+
+
+def _read_records(path: Path) -> Iterator[Tuple[int, Tuple[int, str, tuple]]]:
+    """Yield ``(end_offset, record)`` pairs, stopping at a torn or corrupt tail."""
+    with open(path, "rb") as handle:
+        offset = 0
+        while True:
+            header = handle.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                return
+            (length,) = RECORD_HEADER.unpack(header)
+            payload = handle.read(length)
+            if len(payload) < length:
+                return
+            try:
+                record = pickle.loads(payload)
+            except Exception:
+                return
+            offset += RECORD_HEADER.size + length
+            yield offset, record
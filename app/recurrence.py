@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+from bisect import bisect_left
+from datetime import date, datetime, time
+from heapq import merge
+from math import floor
+from typing import Iterator, Sequence, Tuple
+
+from .intervals import EPOCH, IntervalIndex, from_epoch, to_epoch
+from .models import AvailabilityRule
+
+DAILY = "daily"
+WEEKLY = "weekly"
+FREQUENCIES = (DAILY, WEEKLY)
+
+DAY = 86_400.0
+_EPOCH_DATE = EPOCH.date()
+# 1970-01-01 was a Thursday.
+_EPOCH_WEEKDAY = 3
+
+Window = Tuple[float, float]
+
+
+def _day_number(day: date) -> int:
+    return (day - _EPOCH_DATE).days
+
+
+def _seconds(moment: time) -> float:
+    return moment.hour * 3600.0 + moment.minute * 60.0 + moment.second + moment.microsecond / 1e6
+
+
+class RecurringWindows:
+    """An ``AvailabilityRule`` reduced to arithmetic on epoch seconds.
+
+    Occurrences are never materialized: the one that could cover a slot
+    starts on the day ``(start - offset) // DAY``, so a check is a division,
+    a weekday lookup and a set probe. Naive times are read as UTC, like
+    everywhere else in the app.
+    """
+
+    __slots__ = ("rule", "offset", "length", "weekdays", "first_day", "last_day", "exceptions")
+
+    def __init__(self, rule: AvailabilityRule) -> None:
+        self.rule = rule
+        self.offset = _seconds(rule.start_time)
+        length = _seconds(rule.end_time) - self.offset
+        # Occurrences last at most a day, so the latest one to start is the only one to check.
+        self.length = length if length > 0 else length + DAY
+        days = range(7) if rule.frequency == DAILY else rule.weekdays
+        self.weekdays = tuple(weekday in days for weekday in range(7))
+        self.first_day = _day_number(rule.starts_on)
+        self.last_day = _day_number(rule.ends_on) if rule.ends_on is not None else None
+        self.exceptions = frozenset(_day_number(day) for day in rule.exceptions)
+
+    def occurs_on(self, day: int) -> bool:
+        return (
+            day >= self.first_day
+            and (self.last_day is None or day <= self.last_day)
+            and self.weekdays[(day + _EPOCH_WEEKDAY) % 7]
+            and day not in self.exceptions
+        )
+
+    def covers_epoch(self, start: float, end: float) -> bool:
+        day = floor((start - self.offset) / DAY)
+        return self.occurs_on(day) and day * DAY + self.offset + self.length >= end
+
+    def windows_epoch(self, start: float, end: float) -> Iterator[Window]:
+        """Occurrences overlapping or touching ``start``–``end``, in order."""
+        first = max(floor((start - self.offset - self.length) / DAY), self.first_day)
+        last = floor((end - self.offset) / DAY)
+        if self.last_day is not None:
+            last = min(last, self.last_day)
+        for day in range(first, last + 1):
+            if self.occurs_on(day):
+                occurrence = day * DAY + self.offset
+                if occurrence + self.length >= start:
+                    yield occurrence, occurrence + self.length
+
+
+class AvailabilityCalendar:
+    """A user's one-off windows together with their recurring rules."""
+
+    __slots__ = ("index", "rules")
+
+    def __init__(self, index: IntervalIndex, rules: Sequence[RecurringWindows] = ()) -> None:
+        self.index = index
+        self.rules = rules
+
+    def covers(self, start: datetime, end: datetime) -> bool:
+        return self.covers_epoch(to_epoch(start), to_epoch(end))
+
+    def covers_epoch(self, start: float, end: float) -> bool:
+        if self.index.covers_epoch(start, end):
+            return True
+        if not self.rules:
+            return False
+        if any(rule.covers_epoch(start, end) for rule in self.rules):
+            return True
+        # The slot may still span overlapping windows from different sources.
+        for low, high in self._merged(start, end):
+            return low <= start and high >= end
+        return False
+
+    def windows(self, start: datetime, end: datetime) -> Iterator[Tuple[datetime, datetime]]:
+        """Merged free windows overlapping ``start``–``end``, generated as consumed.
+
+        Windows come back naive or UTC-aware to match ``start`` and ``end``,
+        whatever the stored windows were.
+        """
+        naive = start.tzinfo is None and end.tzinfo is None
+        for low, high in self._merged(to_epoch(start), to_epoch(end)):
+            yield from_epoch(low, naive), from_epoch(high, naive)
+
+    def _merged(self, start: float, end: float) -> Iterator[Window]:
+        current = None
+        for low, high in merge(self._one_off(start, end), *(rule.windows_epoch(start, end) for rule in self.rules)):
+            if current is not None and low < current[1]:
+                current = (current[0], max(current[1], high))
+                continue
+            if current is not None:
+                yield current
+            current = (low, high)
+        if current is not None:
+            yield current
+
+    def _one_off(self, start: float, end: float) -> Iterator[Window]:
+        starts, ends = self.index.starts, self.index.ends
+        for position in range(bisect_left(ends, start), len(starts)):
+            if starts[position] > end:
+                return
+            yield starts[position], ends[position]
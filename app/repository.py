@@ -1,72 +1,582 @@
 from __future__ import annotations
 
-from collections import defaultdict
+import sys
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field, replace
 from datetime import datetime
-from typing import Dict, Iterable, List, Optional
+from typing import AbstractSet, Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple, Union
+from uuid import uuid4
 
-from .models import Availability, CalendarEvent, Invitation, Restaurant, User, Vote
+from .bitset import RestaurantIdRegistry, RestaurantSet
+from .config import Settings, settings
+from .geo import GridIndex
+from .intervals import IntervalIndex, to_epoch
+from .models import Availability, AvailabilityRule, CalendarEvent, Invitation, Restaurant, User, Vote
+from .pagination import PREFIX_END, Key, Page, fold_name, id_after, keys_after, pair_after
+from .recurrence import AvailabilityCalendar, RecurringWindows
+from .shared import SharedDict, SharedSet, SortedKeys
+from .sqlite_repository import VERSIONED_COLLECTIONS, SqliteRepository
+
+
+@dataclass(frozen=True, slots=True)
+class RepositorySnapshot:
+    """One published version of the in-memory state.
+
+    Nothing reachable from a published snapshot is mutated afterwards, so a
+    reader holding one sees a consistent view no matter what writers do.
+    The restaurant registry is the exception: it is append-only and shared by
+    every version. Collections keyed by entity are ``SharedDict``s and
+    sorted indexes are ``SortedKeys``, so consecutive versions share all but
+    the entries a batch wrote.
+    """
+
+    version: int = 0
+    restaurants: SharedDict[str, Restaurant] = field(default_factory=SharedDict)
+    restaurant_registry: RestaurantIdRegistry = field(default_factory=RestaurantIdRegistry)
+    catalog_bits: int = 0
+    restaurant_locations: GridIndex = field(default_factory=GridIndex)
+    users: SharedDict[str, User] = field(default_factory=SharedDict)
+    wishlist_index: SharedDict[str, SharedSet[str]] = field(default_factory=SharedDict)
+    availabilities: SharedDict[str, IntervalIndex] = field(default_factory=SharedDict)
+    availability_rules: SharedDict[str, Tuple[RecurringWindows, ...]] = field(default_factory=SharedDict)  # by rule id
+    invitations: SharedDict[str, Invitation] = field(default_factory=SharedDict)
+    calendar_events: SharedDict[str, CalendarEvent] = field(default_factory=SharedDict)
+    votes: SharedDict[str, Dict[str, Vote]] = field(default_factory=SharedDict)
+    # invitation -> option key -> votes
+    vote_tallies: SharedDict[str, Dict[str, int]] = field(default_factory=SharedDict)
+    # Sorted secondary indexes backing the paged listings.
+    restaurant_order: SortedKeys[Tuple[int, str]] = field(default_factory=SortedKeys)  # (insertion position, id)
+    restaurants_by_tag: SharedDict[str, SortedKeys[str]] = field(default_factory=SharedDict)
+    restaurants_by_rating: SortedKeys[Tuple[float, str]] = field(default_factory=SortedKeys)  # (-rating, id)
+    user_order: SortedKeys[Tuple[int, str]] = field(default_factory=SortedKeys)  # (insertion position, id)
+    users_by_name: SortedKeys[Tuple[str, str]] = field(default_factory=SortedKeys)  # (folded name, id)
+    invitation_order: SortedKeys[Tuple[int, str]] = field(default_factory=SortedKeys)  # (insertion position, id)
+    invitations_by_organizer: SharedDict[str, SortedKeys[str]] = field(default_factory=SharedDict)
+    invitations_by_participant: SharedDict[str, SortedKeys[str]] = field(default_factory=SharedDict)
+    # Snapshot version of the last write to each collection and to each entity in it.
+    collection_versions: Dict[str, int] = field(default_factory=dict)
+    entity_versions: Dict[str, SharedDict[str, int]] = field(default_factory=dict)
 
 
 class InMemoryRepository:
-    """A naive in-memory repository backing the MVP endpoints."""
+    """An in-memory repository backing the MVP endpoints.
+
+    Readers never lock: every read goes to the latest published
+    ``RepositorySnapshot``, or to the one pinned by ``reading()``. Writers
+    serialize on a lock, copy the collections they touch on first write and
+    publish a new snapshot with a single attribute assignment when their
+    ``batch()`` ends. The large collections are structurally shared, so that
+    copy costs about as much as the entries written, not the whole
+    collection; batching still saves re-copying the paths a batch revisits.
+    """
 
     def __init__(self) -> None:
-        self.restaurants: Dict[str, Restaurant] = {}
-        self.users: Dict[str, User] = {}
-        self.availabilities: Dict[str, List[Availability]] = defaultdict(list)
-        self.invitations: Dict[str, Invitation] = {}
-        self.calendar_events: Dict[str, CalendarEvent] = {}
-        self.votes: Dict[str, Dict[str, Vote]] = defaultdict(dict)
+        self._snapshot = RepositorySnapshot()
+        self._write_lock = threading.RLock()
+        self._batch_depth = 0
+        self._changes: Dict[str, Any] = {}
+        self._copied: Dict[str, Set[str]] = {}
+        self._local = threading.local()
+        # Versions restart with the process, so tags built from them carry this too.
+        self.version_epoch = uuid4().hex[:8]
+
+    def clear(self) -> None:
+        with self.batch():
+            empty = RepositorySnapshot()
+            self._copied.clear()
+            self._stage(**{name: getattr(empty, name) for name in _COLLECTIONS})
+            for name in VERSIONED_COLLECTIONS:
+                self._bump(name)
+
+    # Snapshots and batches -----------------------------------------------
+    def read_snapshot(self) -> RepositorySnapshot:
+        """The snapshot reads on this thread are currently served from."""
+        return getattr(self._local, "snapshot", None) or self._snapshot
+
+    @contextmanager
+    def reading(self) -> Iterator[RepositorySnapshot]:
+        """Serve every read on this thread inside the block from one snapshot."""
+        pinned = getattr(self._local, "snapshot", None)
+        if pinned is not None:
+            yield pinned
+            return
+        self._local.snapshot = self._snapshot
+        try:
+            yield self._local.snapshot
+        finally:
+            self._local.snapshot = None
+
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """Publish every write inside the block as one new snapshot."""
+        with self._write_lock:
+            self._batch_depth += 1
+            try:
+                yield
+            except BaseException:
+                self._batch_depth -= 1
+                if self._batch_depth == 0:
+                    self._changes.clear()
+                    self._copied.clear()
+                raise
+            self._batch_depth -= 1
+            if self._batch_depth == 0 and self._changes:
+                self._snapshot = replace(self._snapshot, version=self._snapshot.version + 1, **self._changes)
+                self._changes = {}
+                self._copied = {}
+
+    def _current(self, name: str) -> Any:
+        """A collection as the open batch sees it."""
+        if name in self._changes:
+            return self._changes[name]
+        return getattr(self._snapshot, name)
+
+    def _stage(self, **collections: Any) -> None:
+        self._changes.update(collections)
+
+    def _mutable(self, name: str) -> Any:
+        """The open batch's private copy of a collection."""
+        if name not in self._changes:
+            self._changes[name] = getattr(self._snapshot, name).copy()
+        return self._changes[name]
+
+    def _mutable_entry(self, name: str, key: str, factory: Callable[[], Any]) -> Any:
+        """The open batch's private copy of a nested collection."""
+        collection = self._mutable(name)
+        copied = self._copied.setdefault(name, set())
+        if key not in copied or key not in collection:
+            existing = collection.get(key)
+            collection[key] = factory() if existing is None else existing.copy()
+            copied.add(key)
+        return collection[key]
+
+    def _reindex(self, name: str, entity_id: str, old_keys: Iterable[str], new_keys: Iterable[str]) -> None:
+        """Move ``entity_id`` between the sorted postings of index ``name``."""
+        old_keys, new_keys = set(old_keys), set(new_keys)
+        for key in old_keys - new_keys:
+            postings = self._mutable_entry(name, key, SortedKeys)
+            postings.discard(entity_id)
+            if not postings:
+                del self._changes[name][key]
+        for key in new_keys - old_keys:
+            self._mutable_entry(name, key, SortedKeys).add(entity_id)
+
+    def _resort(self, name: str, old_key: Optional[Any], new_key: Optional[Any]) -> None:
+        """Replace ``old_key`` with ``new_key`` in the sorted index ``name``."""
+        if old_key == new_key:
+            return
+        keys = self._mutable(name)
+        if old_key is not None:
+            keys.discard(old_key)
+        if new_key is not None:
+            keys.add(new_key)
+
+    def _append(self, name: str, collection: str, entity_id: str) -> None:
+        """Record a new entity at the end of the insertion-order index ``name``.
+
+        Entities are never removed one by one, so the collection's size is a
+        fresh position.
+        """
+        self._mutable(name).add((len(self._current(collection)), entity_id))
+
+    # Versions ------------------------------------------------------------
+    def collection_version(self, name: str) -> int:
+        """Bumped by every write to collection ``name``; 0 if never written."""
+        return self.read_snapshot().collection_versions.get(name, 0)
+
+    def entity_version(self, name: str, entity_id: str) -> int:
+        """Bumped by every write to ``entity_id`` in collection ``name``."""
+        return self.read_snapshot().entity_versions.get(name, {}).get(entity_id, 0)
+
+    def _bump(self, name: str, entity_id: Optional[str] = None) -> None:
+        version = self._snapshot.version + 1
+        self._mutable("collection_versions")[name] = version
+        if entity_id is not None:
+            self._mutable_entry("entity_versions", name, SharedDict)[entity_id] = version
 
     # Restaurant CRUD -----------------------------------------------------
     def add_restaurant(self, restaurant: Restaurant) -> None:
-        self.restaurants[restaurant.id] = restaurant
+        restaurant = replace(restaurant, id=sys.intern(restaurant.id))
+        with self.batch():
+            position = self._current("restaurant_registry").position(restaurant.id)
+            self._stage(catalog_bits=self._current("catalog_bits") | 1 << position)
+            self._mutable("restaurant_locations").add(restaurant.id, restaurant.latitude, restaurant.longitude)
+            previous = self._current("restaurants").get(restaurant.id)
+            if previous is None:
+                self._append("restaurant_order", "restaurants", restaurant.id)
+            self._reindex("restaurants_by_tag", restaurant.id, previous.tags if previous else (), restaurant.tags)
+            self._resort(
+                "restaurants_by_rating",
+                _rating_key(previous) if previous else None,
+                _rating_key(restaurant),
+            )
+            self._mutable("restaurants")[restaurant.id] = restaurant
+            self._bump("restaurants", restaurant.id)
 
     def get_restaurant(self, restaurant_id: str) -> Optional[Restaurant]:
-        return self.restaurants.get(restaurant_id)
+        return self.read_snapshot().restaurants.get(restaurant_id)
 
     def list_restaurants(self) -> List[Restaurant]:
-        return list(self.restaurants.values())
+        snapshot = self.read_snapshot()
+        return [snapshot.restaurants[restaurant_id] for _, restaurant_id in snapshot.restaurant_order]
+
+    def scan_restaurants(self) -> Iterator[Restaurant]:
+        """Restaurants in insertion order from the current snapshot, yielded lazily."""
+        snapshot = self.read_snapshot()
+        return (snapshot.restaurants[restaurant_id] for _, restaurant_id in snapshot.restaurant_order)
+
+    def page_restaurants(
+        self,
+        limit: int,
+        after: Optional[Key] = None,
+        tag: Optional[str] = None,
+        min_rating: Optional[float] = None,
+    ) -> Page[Restaurant]:
+        """Restaurants in insertion order, by id under a ``tag``, or by rating then id for ``min_rating`` alone."""
+        snapshot = self.read_snapshot()
+        restaurants = snapshot.restaurants
+        if tag is None and min_rating is not None:
+            keys, more = keys_after(
+                snapshot.restaurants_by_rating,
+                limit,
+                pair_after(after, (int, float)),
+                stop=lambda key: -key[0] < min_rating,
+            )
+            return Page([restaurants[restaurant_id] for _, restaurant_id in keys], keys[-1] if more else None)
+        if tag is None:
+            keys, more = keys_after(snapshot.restaurant_order, limit, pair_after(after, int))
+            return Page([restaurants[restaurant_id] for _, restaurant_id in keys], keys[-1] if more else None)
+        # With both filters the tag postings are walked and narrowed by rating.
+        ids, more = keys_after(
+            snapshot.restaurants_by_tag.get(tag, ()),
+            limit,
+            id_after(after),
+            keep=None if min_rating is None else lambda restaurant_id: _rated(restaurants[restaurant_id], min_rating),
+        )
+        return Page([restaurants[restaurant_id] for restaurant_id in ids], (ids[-1],) if more else None)
+
+    def restaurants_within(
+        self,
+        latitude: float,
+        longitude: float,
+        radius_km: float,
+    ) -> List[Tuple[Restaurant, float]]:
+        """Restaurants within ``radius_km`` of a point with their distance, nearest first."""
+        snapshot = self.read_snapshot()
+        return [
+            (snapshot.restaurants[restaurant_id], distance)
+            for restaurant_id, distance in snapshot.restaurant_locations.within(latitude, longitude, radius_km)
+        ]
 
     # User CRUD -----------------------------------------------------------
     def add_user(self, user: User) -> None:
-        self.users[user.id] = user
+        wishlist = user.wishlist
+        with self.batch():
+            # Wishlists and visited sets are stored as bitsets over the shared
+            # restaurant registry; callers may pass any set of ids.
+            user = replace(
+                user,
+                id=sys.intern(user.id),
+                wishlist=self._restaurant_set(wishlist),
+                visited=self._restaurant_set(user.visited),
+            )
+            previous = self._current("users").get(user.id)
+            if previous is not None:
+                for restaurant_id in previous.wishlist - user.wishlist:
+                    wishers = self._mutable_entry("wishlist_index", restaurant_id, SharedSet)
+                    wishers.discard(user.id)
+                    if not wishers:
+                        del self._changes["wishlist_index"][restaurant_id]
+            for restaurant_id in wishlist:
+                self._mutable_entry("wishlist_index", restaurant_id, SharedSet).add(user.id)
+            if previous is None:
+                self._append("user_order", "users", user.id)
+            self._resort("users_by_name", _name_key(previous) if previous else None, _name_key(user))
+            self._mutable("users")[user.id] = user
+            self._bump("users", user.id)
 
     def get_user(self, user_id: str) -> Optional[User]:
-        return self.users.get(user_id)
+        return self.read_snapshot().users.get(user_id)
 
     def list_users(self) -> List[User]:
-        return list(self.users.values())
+        snapshot = self.read_snapshot()
+        return [snapshot.users[user_id] for _, user_id in snapshot.user_order]
+
+    def scan_users(self) -> Iterator[User]:
+        """Users in insertion order from the current snapshot, yielded lazily."""
+        snapshot = self.read_snapshot()
+        return (snapshot.users[user_id] for _, user_id in snapshot.user_order)
+
+    def page_users(self, limit: int, after: Optional[Key] = None, name_prefix: Optional[str] = None) -> Page[User]:
+        """Users in insertion order, or by case-folded name then id under a ``name_prefix``."""
+        snapshot = self.read_snapshot()
+        if name_prefix is None:
+            keys, more = keys_after(snapshot.user_order, limit, pair_after(after, int))
+            return Page([snapshot.users[user_id] for _, user_id in keys], keys[-1] if more else None)
+        prefix = fold_name(name_prefix)
+        keys, more = keys_after(
+            snapshot.users_by_name,
+            limit,
+            pair_after(after, str),
+            lowest=(prefix,),
+            stop=lambda key: key[0] >= prefix + PREFIX_END,
+        )
+        return Page([snapshot.users[user_id] for _, user_id in keys], keys[-1] if more else None)
+
+    def get_wishers(self, restaurant_id: str) -> AbstractSet[str]:
+        """Ids of all users with ``restaurant_id`` on their wishlist."""
+        return self.read_snapshot().wishlist_index.get(restaurant_id, frozenset())
+
+    def count_wishing(self, user_ids: Iterable[str], restaurant_id: str) -> int:
+        """How many of ``user_ids`` have ``restaurant_id`` on their wishlist."""
+        snapshot = self.read_snapshot()
+        position = snapshot.restaurant_registry.lookup(restaurant_id)
+        if position is None:
+            return 0
+        return sum((_bits(snapshot, user_id, "wishlist") >> position) & 1 for user_id in user_ids)
+
+    def visited_by_any(self, user_ids: Iterable[str]) -> RestaurantSet:
+        """Restaurants at least one of ``user_ids`` has visited."""
+        snapshot = self.read_snapshot()
+        visited = 0
+        for user_id in user_ids:
+            visited |= _bits(snapshot, user_id, "visited")
+        return RestaurantSet(visited, snapshot.restaurant_registry)
+
+    def unvisited_restaurants(self, user_ids: Iterable[str]) -> List[str]:
+        """Catalog restaurants that none of ``user_ids`` has visited."""
+        with self.reading() as snapshot:
+            unvisited = snapshot.catalog_bits & ~self.visited_by_any(user_ids).bits
+            return snapshot.restaurant_registry.decode(unvisited)
+
+    def _restaurant_set(self, restaurant_ids: Iterable[str]) -> RestaurantSet:
+        registry = self._current("restaurant_registry")
+        if isinstance(restaurant_ids, RestaurantSet) and restaurant_ids.registry is registry:
+            return restaurant_ids
+        return RestaurantSet(registry.encode(restaurant_ids), registry)
 
     # Availability --------------------------------------------------------
     def set_availabilities(self, user_id: str, availabilities: Iterable[Availability]) -> None:
-        self.availabilities[user_id] = list(availabilities)
+        index = IntervalIndex((availability.slot_start, availability.slot_end) for availability in availabilities)
+        with self.batch():
+            self._mutable("availabilities")[sys.intern(user_id)] = index
+            self._bump("availabilities", user_id)
+
+    def update_availability(
+        self,
+        user_id: str,
+        add: Sequence[Tuple[datetime, datetime]] = (),
+        remove: Sequence[Tuple[datetime, datetime]] = (),
+    ) -> IntervalIndex:
+        """Merge ``add`` into and then cut ``remove`` out of ``user_id``'s windows, atomically.
+
+        Repeating the same update leaves the same windows, so retries are safe.
+        """
+        with self.batch():
+            index = self._current("availabilities").get(user_id) or IntervalIndex()
+            for start, end in add:
+                index = index.with_window(start, end)
+            for start, end in remove:
+                index = index.without_window(start, end)
+            self._mutable("availabilities")[sys.intern(user_id)] = index
+            self._bump("availabilities", user_id)
+        return index
 
     def get_availabilities(self, user_id: str) -> List[Availability]:
-        return self.availabilities.get(user_id, [])
+        index = self.read_snapshot().availabilities.get(user_id)
+        if index is None:
+            return []
+        return [Availability(user_id=user_id, slot_start=start, slot_end=end) for start, end in index]
+
+    def get_availability_index(self, user_id: str) -> IntervalIndex:
+        return self.read_snapshot().availabilities.get(user_id) or IntervalIndex()
+
+    def set_availability_rule(self, rule: AvailabilityRule) -> None:
+        """Add ``rule`` to its user's recurring availability, replacing one with the same id."""
+        compiled = RecurringWindows(rule)
+        with self.batch():
+            rules = self._current("availability_rules").get(rule.user_id, ())
+            kept = [existing for existing in rules if existing.rule.id != rule.id]
+            self._mutable("availability_rules")[sys.intern(rule.user_id)] = tuple(
+                sorted([*kept, compiled], key=lambda existing: existing.rule.id)
+            )
+            self._bump("availabilities", rule.user_id)
+
+    def delete_availability_rule(self, user_id: str, rule_id: str) -> bool:
+        with self.batch():
+            rules = self._current("availability_rules").get(user_id, ())
+            kept = tuple(existing for existing in rules if existing.rule.id != rule_id)
+            if len(kept) == len(rules):
+                return False
+            if kept:
+                self._mutable("availability_rules")[user_id] = kept
+            else:
+                del self._mutable("availability_rules")[user_id]
+            self._bump("availabilities", user_id)
+        return True
+
+    def get_availability_rules(self, user_id: str) -> List[AvailabilityRule]:
+        return [compiled.rule for compiled in self.read_snapshot().availability_rules.get(user_id, ())]
+
+    def get_availability_calendar(self, user_id: str) -> AvailabilityCalendar:
+        """One-off windows and recurring rules of ``user_id``, from one snapshot."""
+        snapshot = self.read_snapshot()
+        return AvailabilityCalendar(
+            snapshot.availabilities.get(user_id) or IntervalIndex(),
+            snapshot.availability_rules.get(user_id, ()),
+        )
+
+    def who_is_free(
+        self,
+        user_ids: Sequence[str],
+        slots: Sequence[Tuple[datetime, datetime]],
+    ) -> List[List[bool]]:
+        """For each user, whether they are free for each of ``slots``.
+
+        Recurring rules are checked per slot, never expanded into windows.
+        """
+        snapshot = self.read_snapshot()
+        bounds = [(to_epoch(start), to_epoch(end)) for start, end in slots]
+        rows: List[List[bool]] = []
+        for user_id in user_ids:
+            index = snapshot.availabilities.get(user_id)
+            rules = snapshot.availability_rules.get(user_id)
+            if rules:
+                calendar = AvailabilityCalendar(index or IntervalIndex(), rules)
+                rows.append([calendar.covers_epoch(start, end) for start, end in bounds])
+            elif index is None:
+                rows.append([False] * len(slots))
+            else:
+                rows.append([index.covers_epoch(start, end) for start, end in bounds])
+        return rows
 
     # Invitation ----------------------------------------------------------
     def add_invitation(self, invitation: Invitation) -> None:
-        self.invitations[invitation.id] = invitation
+        with self.batch():
+            previous = self._current("invitations").get(invitation.id)
+            if previous is None:
+                self._append("invitation_order", "invitations", invitation.id)
+            self._reindex(
+                "invitations_by_organizer",
+                invitation.id,
+                (previous.organizer_id,) if previous else (),
+                (invitation.organizer_id,),
+            )
+            self._reindex(
+                "invitations_by_participant",
+                invitation.id,
+                previous.participant_ids if previous else (),
+                invitation.participant_ids,
+            )
+            self._mutable("invitations")[invitation.id] = invitation
+            self._bump("invitations", invitation.id)
 
     def get_invitation(self, invitation_id: str) -> Optional[Invitation]:
-        return self.invitations.get(invitation_id)
+        return self.read_snapshot().invitations.get(invitation_id)
 
     def list_invitations(self) -> List[Invitation]:
-        return list(self.invitations.values())
+        snapshot = self.read_snapshot()
+        return [snapshot.invitations[invitation_id] for _, invitation_id in snapshot.invitation_order]
+
+    def scan_invitations(self) -> Iterator[Invitation]:
+        """Invitations in insertion order from the current snapshot, yielded lazily."""
+        snapshot = self.read_snapshot()
+        return (snapshot.invitations[invitation_id] for _, invitation_id in snapshot.invitation_order)
+
+    def page_invitations(
+        self,
+        limit: int,
+        after: Optional[Key] = None,
+        organizer_id: Optional[str] = None,
+        participant_id: Optional[str] = None,
+    ) -> Page[Invitation]:
+        """Invitations in insertion order, or by id among those of an organizer or participant."""
+        snapshot = self.read_snapshot()
+        invitations = snapshot.invitations
+        if organizer_id is not None:
+            postings = snapshot.invitations_by_organizer.get(organizer_id, [])
+        elif participant_id is not None:
+            postings = snapshot.invitations_by_participant.get(participant_id, [])
+        else:
+            keys, more = keys_after(snapshot.invitation_order, limit, pair_after(after, int))
+            return Page([invitations[invitation_id] for _, invitation_id in keys], keys[-1] if more else None)
+        # With both filters the organizer postings are narrowed by participant.
+        ids, more = keys_after(
+            postings,
+            limit,
+            id_after(after),
+            keep=(
+                None
+                if organizer_id is None or participant_id is None
+                else lambda invitation_id: participant_id in invitations[invitation_id].participant_ids
+            ),
+        )
+        return Page([invitations[invitation_id] for invitation_id in ids], (ids[-1],) if more else None)
 
     def save_calendar_event(self, event: CalendarEvent) -> None:
-        self.calendar_events[event.invitation_id] = event
+        with self.batch():
+            self._mutable("calendar_events")[event.invitation_id] = event
 
     def get_calendar_event(self, invitation_id: str) -> Optional[CalendarEvent]:
-        return self.calendar_events.get(invitation_id)
+        return self.read_snapshot().calendar_events.get(invitation_id)
 
     # Voting --------------------------------------------------------------
-    def record_vote(self, vote: Vote) -> None:
-        self.votes[vote.invitation_id][vote.user_id] = vote
+    def record_vote(self, vote: Vote) -> Dict[str, int]:
+        """Store ``vote`` and return the invitation's tally with it counted."""
+        with self.batch():
+            votes = self._mutable_entry("votes", vote.invitation_id, dict)
+            previous = votes.get(vote.user_id)
+            votes[vote.user_id] = vote
+            if previous is not None and previous.option_key == vote.option_key:
+                return self._current("vote_tallies").get(vote.invitation_id, {})
+            tally = self._mutable_entry("vote_tallies", vote.invitation_id, dict)
+            if previous is not None:
+                tally[previous.option_key] -= 1
+                if not tally[previous.option_key]:
+                    del tally[previous.option_key]
+            tally[vote.option_key] = tally.get(vote.option_key, 0) + 1
+            return tally
 
     def get_votes(self, invitation_id: str) -> Dict[str, Vote]:
-        return self.votes.get(invitation_id, {})
+        return self.read_snapshot().votes.get(invitation_id, {})
+
+    def get_tally(self, invitation_id: str) -> Dict[str, int]:
+        """Votes per option key, kept up to date by ``record_vote``."""
+        return self.read_snapshot().vote_tallies.get(invitation_id, {})
+
+
+_COLLECTIONS = tuple(name for name in RepositorySnapshot.__slots__ if name != "version")
+
+
+def _rating_key(restaurant: Restaurant) -> Optional[Tuple[float, str]]:
+    return None if restaurant.rating is None else (-restaurant.rating, restaurant.id)
+
+
+def _rated(restaurant: Restaurant, min_rating: float) -> bool:
+    return restaurant.rating is not None and restaurant.rating >= min_rating
+
+
+def _name_key(user: User) -> Tuple[str, str]:
+    return fold_name(user.name), user.id
+
+
+def _bits(snapshot: RepositorySnapshot, user_id: str, attribute: str) -> int:
+    user = snapshot.users.get(user_id)
+    return getattr(user, attribute).bits if user else 0
+
+
+def create_repository(settings: Settings = settings) -> Union[InMemoryRepository, SqliteRepository]:
+    """Build the repository selected by ``settings.repository_backend``."""
+    if settings.repository_backend == "sqlite":
+        return SqliteRepository(settings.sqlite_path)
+    if settings.repository_backend == "durable":
+        from .persistence import DurableRepository
+
+        return DurableRepository(settings.data_dir, settings.snapshot_every, settings.wal_fsync)
+    if settings.repository_backend != "memory":
+        raise ValueError(f"Unknown repository backend {settings.repository_backend!r}")
+    return InMemoryRepository()
 
 
-repository = InMemoryRepository()
+repository = create_repository()
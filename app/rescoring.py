@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import threading
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set
+
+import numpy as np
+
+from .geo import haversine_matrix
+from .models import InvitationOption, Restaurant, User
+from .recurrence import AvailabilityCalendar
+from .scoring import CONVENIENCE_EPSILON, AvailabilityBitmap, ScoreGrid, SelectionStats
+from .scoring_pool import ScoringPayload, unpack_matrix
+
+
+class LiveGrid:
+    """Score components of one open invitation, patched row by row.
+
+    Wishlist and free counts are kept per restaurant and per slot, so a
+    participant's update only touches their own row: ``R`` wishlist cells or
+    ``S`` availability cells. A restaurant move recomputes one convenience
+    column. Only a participant move re-adds the ``P × R`` inverted distances,
+    in participant order, so convenience is summed exactly as a rebuild would.
+    No update rescores the ``R × S`` cross product; ``top_options`` re-runs
+    the pruned selection over the patched components.
+    """
+
+    def __init__(self, invitation_id: str, payload: ScoringPayload) -> None:
+        self.invitation_id = invitation_id
+        self.limit = payload.limit
+        self.participant_ids = payload.participant_ids
+        self.restaurant_ids = payload.restaurant_ids
+        self.slots = payload.slots
+        self.rows: Dict[str, int] = {user_id: row for row, user_id in enumerate(self.participant_ids)}
+        self.columns: Dict[str, List[int]] = defaultdict(list)
+        for column, restaurant_id in enumerate(self.restaurant_ids):
+            self.columns[restaurant_id].append(column)
+        participant_count = len(self.participant_ids)
+        self.wishlist = unpack_matrix(payload.wishlist_bits, participant_count, len(self.restaurant_ids))
+        self.availability = unpack_matrix(payload.availability_bits, participant_count, len(self.slots))
+        self.user_points = payload.user_points.copy()
+        self.restaurant_points = payload.restaurant_points.copy()
+        self.wish_counts = self.wishlist.sum(axis=0)
+        self.free_counts = self.availability.sum(axis=0)
+        self.inverted = 1 / (
+            haversine_matrix(
+                self.user_points[:, 0],
+                self.user_points[:, 1],
+                self.restaurant_points[:, 0],
+                self.restaurant_points[:, 1],
+            )
+            + CONVENIENCE_EPSILON
+        )
+        self._accumulate_convenience()
+
+    def set_availability(self, user_id: str, calendar: AvailabilityCalendar) -> None:
+        row = self.rows[user_id]
+        free = np.array([calendar.covers(start, end) for start, end in self.slots], dtype=bool)
+        self.free_counts += free.astype(np.int64) - self.availability[row]
+        self.availability[row] = free
+
+    def set_user(self, user: User) -> None:
+        row = self.rows[user.id]
+        wished = np.array([restaurant_id in user.wishlist for restaurant_id in self.restaurant_ids], dtype=bool)
+        self.wish_counts += wished.astype(np.int64) - self.wishlist[row]
+        self.wishlist[row] = wished
+        if (user.latitude, user.longitude) != tuple(self.user_points[row]):
+            self.user_points[row] = (user.latitude, user.longitude)
+            self.inverted[row] = 1 / (
+                haversine_matrix(
+                    self.user_points[row : row + 1, 0],
+                    self.user_points[row : row + 1, 1],
+                    self.restaurant_points[:, 0],
+                    self.restaurant_points[:, 1],
+                )[0]
+                + CONVENIENCE_EPSILON
+            )
+            self._accumulate_convenience()
+
+    def set_restaurant(self, restaurant: Restaurant) -> None:
+        for column in self.columns.get(restaurant.id, ()):
+            self.restaurant_points[column] = (restaurant.latitude, restaurant.longitude)
+            self.inverted[:, column] = 1 / (
+                haversine_matrix(
+                    self.user_points[:, 0],
+                    self.user_points[:, 1],
+                    self.restaurant_points[column : column + 1, 0],
+                    self.restaurant_points[column : column + 1, 1],
+                )[:, 0]
+                + CONVENIENCE_EPSILON
+            )
+            if self.participant_ids:
+                self.convenience[column] = np.add.accumulate(self.inverted[:, column])[-1] / len(self.participant_ids)
+
+    def grid(self) -> ScoreGrid:
+        participant_count = len(self.participant_ids)
+        return ScoreGrid(
+            restaurant_ids=self.restaurant_ids,
+            slots=self.slots,
+            availability=AvailabilityBitmap(self.participant_ids, self.slots, self.availability.copy()),
+            intersection_ratio=(
+                self.wish_counts / participant_count if participant_count else np.zeros(len(self.restaurant_ids))
+            ),
+            availability_ratio=(
+                self.free_counts / participant_count if participant_count else np.zeros(len(self.slots))
+            ),
+            convenience_score=self.convenience,
+        )
+
+    def top_options(self, stats: Optional[SelectionStats] = None) -> List[InvitationOption]:
+        return self.grid().top_options(self.limit, stats=stats)
+
+    def _accumulate_convenience(self) -> None:
+        if self.participant_ids:
+            self.convenience = np.add.accumulate(self.inverted, axis=0)[-1] / len(self.participant_ids)
+        else:
+            self.convenience = np.zeros(len(self.restaurant_ids))
+
+
+class OpenInvitations:
+    """Reverse index from users and restaurants to the open invitations using them.
+
+    Invitations are tracked by their compact ``ScoringPayload``; the larger
+    ``LiveGrid`` is only unpacked the first time a dependency changes. Hold
+    ``lock`` while patching and republishing so updates apply in order.
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.RLock()
+        self._payloads: Dict[str, ScoringPayload] = {}
+        self._grids: Dict[str, LiveGrid] = {}
+        self._by_user: Dict[str, Set[str]] = defaultdict(set)
+        self._by_restaurant: Dict[str, Set[str]] = defaultdict(set)
+
+    def __len__(self) -> int:
+        return len(self._payloads)
+
+    def __contains__(self, invitation_id: object) -> bool:
+        return invitation_id in self._payloads
+
+    def track(self, invitation_id: str, payload: ScoringPayload) -> None:
+        with self.lock:
+            self.untrack(invitation_id)
+            self._payloads[invitation_id] = payload
+            for user_id in payload.participant_ids:
+                self._by_user[user_id].add(invitation_id)
+            for restaurant_id in payload.restaurant_ids:
+                self._by_restaurant[restaurant_id].add(invitation_id)
+
+    def untrack(self, invitation_id: str) -> None:
+        with self.lock:
+            payload = self._payloads.pop(invitation_id, None)
+            self._grids.pop(invitation_id, None)
+            if payload is None:
+                return
+            for index, entity_ids in (
+                (self._by_user, payload.participant_ids),
+                (self._by_restaurant, payload.restaurant_ids),
+            ):
+                for entity_id in entity_ids:
+                    dependents = index.get(entity_id)
+                    if dependents is not None:
+                        dependents.discard(invitation_id)
+                        if not dependents:
+                            del index[entity_id]
+
+    def grid(self, invitation_id: str) -> Optional[LiveGrid]:
+        with self.lock:
+            if invitation_id not in self._payloads:
+                return None
+            return self._live((invitation_id,))[0]
+
+    def for_user(self, user_id: str) -> List[LiveGrid]:
+        with self.lock:
+            return self._live(self._by_user.get(user_id, ()))
+
+    def for_restaurant(self, restaurant_id: str) -> List[LiveGrid]:
+        with self.lock:
+            return self._live(self._by_restaurant.get(restaurant_id, ()))
+
+    def _live(self, invitation_ids: Iterable[str]) -> List[LiveGrid]:
+        grids = []
+        for invitation_id in sorted(invitation_ids):
+            grid = self._grids.get(invitation_id)
+            if grid is None:
+                grid = LiveGrid(invitation_id, self._payloads[invitation_id])
+                self._grids[invitation_id] = grid
+            grids.append(grid)
+        return grids
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
-from datetime import datetime
-from typing import List, Optional, Sequence
+from datetime import date, datetime, time
+from typing import List, Literal, Optional, Sequence
 
 from pydantic import BaseModel, Field, validator
 
@@ -19,6 +19,10 @@ class RestaurantRead(RestaurantCreate):
     pass
 
 
+class NearbyRestaurantRead(RestaurantRead):
+    distance_km: float
+
+
 class UserCreate(BaseModel):
     id: str
     name: str
@@ -48,18 +52,81 @@ class AvailabilityRead(AvailabilityCreate):
     pass
 
 
+class AvailabilityPatch(BaseModel):
+    """Windows to merge in, then windows to cut out."""
+
+    add: List[AvailabilityCreate] = Field(default_factory=list)
+    remove: List[AvailabilityCreate] = Field(default_factory=list)
+
+
+class AvailabilityRuleCreate(BaseModel):
+    """A window repeated every day, or on ``weekdays`` (0 is Monday) of every week."""
+
+    frequency: Literal["daily", "weekly"]
+    start_time: time
+    end_time: time = Field(..., description="At or before start_time means the window ends the next day")
+    starts_on: date
+    ends_on: Optional[date] = None
+    weekdays: List[int] = Field(default_factory=list)
+    exceptions: List[date] = Field(default_factory=list, description="Dates whose occurrence is skipped")
+
+
+class AvailabilityRuleRead(AvailabilityRuleCreate):
+    id: str
+
+
+class SlotSearch(BaseModel):
+    window_start: datetime
+    window_end: datetime
+    duration_minutes: int = Field(..., gt=0)
+    max_slots: int = Field(default=3, ge=1)
+
+    @validator("window_end")
+    def validate_window(cls, v: datetime, values: dict) -> datetime:
+        window_start: datetime = values.get("window_start")
+        if window_start and v <= window_start:
+            raise ValueError("window_end must be after window_start")
+        return v
+
+
 class InvitationCreate(BaseModel):
     id: str
     organizer_id: str
     participant_ids: List[str]
-    candidate_restaurant_ids: List[str]
-    candidate_slots: List[List[datetime]] = Field(..., description="Pairs of ISO start/end datetimes")
+    candidate_restaurant_ids: List[str] = Field(default_factory=list)
+    candidate_slots: List[List[datetime]] = Field(default_factory=list, description="Pairs of ISO start/end datetimes")
     top_limit: int = 3
+    recommend_top_n: Optional[int] = Field(
+        default=None,
+        ge=1,
+        description="Add this many catalog restaurants with the highest wishlist overlap to the candidates",
+    )
+    recommend_unvisited_only: bool = Field(
+        default=False,
+        description="Only recommend restaurants none of the participants has visited",
+    )
+    recommend_within_km: Optional[float] = Field(
+        default=None,
+        gt=0,
+        description="Only recommend restaurants within this distance of the participants' median point",
+    )
+    slot_search: Optional[SlotSearch] = Field(
+        default=None,
+        description="Discover the slots with the most participants free and add them to the candidates",
+    )
+    background: bool = Field(
+        default=False,
+        description="Build the invitation on the background queue and answer 202 with a job id",
+    )
+
+    @validator("recommend_top_n", always=True)
+    def validate_candidate_source(cls, v: Optional[int], values: dict) -> Optional[int]:
+        if v is None and not values.get("candidate_restaurant_ids"):
+            raise ValueError("candidate_restaurant_ids must not be empty unless recommend_top_n is set")
+        return v
 
     @validator("candidate_slots")
     def validate_slots(cls, slots: Sequence[Sequence[datetime]]) -> List[List[datetime]]:
-        if not slots:
-            raise ValueError("candidate_slots must not be empty")
         validated: List[List[datetime]] = []
         for slot in slots:
             if len(slot) != 2:
@@ -70,6 +137,12 @@ class InvitationCreate(BaseModel):
             validated.append([start, end])
         return validated
 
+    @validator("slot_search", always=True)
+    def validate_slot_source(cls, v: Optional[SlotSearch], values: dict) -> Optional[SlotSearch]:
+        if v is None and not values.get("candidate_slots"):
+            raise ValueError("candidate_slots must not be empty unless slot_search is set")
+        return v
+
 
 class InvitationOptionRead(BaseModel):
     restaurant_id: str
@@ -82,6 +155,19 @@ class InvitationOptionRead(BaseModel):
     total_score: float
 
 
+class SlotAvailabilityRead(BaseModel):
+    slot_start: datetime
+    slot_end: datetime
+    available_user_ids: List[str]
+    blocked_user_ids: List[str]
+    availability_ratio: float
+
+
+class SelectionStatsRead(BaseModel):
+    evaluated: int
+    pruned: int
+
+
 class InvitationRead(BaseModel):
     id: str
     organizer_id: str
@@ -94,6 +180,34 @@ class InvitationRead(BaseModel):
     reservation_link: Optional[str] = None
 
 
+class InvitationBatchCreate(BaseModel):
+    invitations: List[InvitationCreate] = Field(..., min_items=1)
+
+
+class InvitationBatchItemRead(BaseModel):
+    index: int
+    id: str
+    invitation: Optional[InvitationRead] = None
+    error: Optional[str] = None
+
+
+class InvitationJobRead(BaseModel):
+    job_id: str
+    invitation_id: str
+    status: str
+    progress_url: str
+
+
+class InvitationProgressRead(BaseModel):
+    job_id: Optional[str] = None
+    invitation_id: str
+    status: str
+    evaluated: int
+    total: int
+    top_options: List[InvitationOptionRead]
+    error: Optional[str] = None
+
+
 class VoteCreate(BaseModel):
     user_id: str
     option_index: int
@@ -101,3 +215,11 @@ class VoteCreate(BaseModel):
 
 class VoteRead(VoteCreate):
     pass
+
+
+class VoteTallyRead(BaseModel):
+    invitation_id: str
+    option_votes: List[int]
+    voters: int
+    participants: int
+    confirmed_option: Optional[InvitationOptionRead] = None
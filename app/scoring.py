@@ -0,0 +1,240 @@
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from heapq import heappush, heapreplace
+from time import monotonic
+from typing import Callable, ClassVar, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .bitset import membership_matrix
+from .geo import haversine_matrix
+from .models import InvitationOption, Restaurant, User
+
+# Matches the epsilon used by ``services.compute_convenience_score``.
+CONVENIENCE_EPSILON = 1e-6
+# Minimum seconds between two partial results reported by ``top_options``.
+PROGRESS_INTERVAL = 0.05
+
+ProgressCallback = Callable[[List[InvitationOption], int], None]
+
+
+@dataclass
+class AvailabilityBitmap:
+    """Participant × slot availability of one invitation.
+
+    Availability does not depend on the restaurant, so it is computed once per
+    invitation and shared by every restaurant row of the score grid.
+    """
+
+    participant_ids: List[str]
+    slots: List[Tuple[datetime, datetime]]
+    matrix: np.ndarray  # participant × slot, bool
+
+    def ratios(self) -> np.ndarray:
+        if not self.participant_ids:
+            return np.zeros(len(self.slots))
+        return self.matrix.sum(axis=0) / len(self.participant_ids)
+
+    def participants(self, slot_index: int) -> List[str]:
+        column = self.matrix[:, slot_index]
+        return [user_id for user_id, is_free in zip(self.participant_ids, column) if is_free]
+
+    def blocked(self, slot_index: int) -> List[str]:
+        column = self.matrix[:, slot_index]
+        return [user_id for user_id, is_free in zip(self.participant_ids, column) if not is_free]
+
+
+@dataclass
+class SelectionStats:
+    """How many restaurant × slot pairs top-k selection scored or skipped.
+
+    Request threads share one instance, so counts only change under a lock.
+    The lock is shared by the class so instances still pickle back from the
+    scoring pool.
+    """
+
+    _lock: ClassVar[threading.Lock] = threading.Lock()
+
+    evaluated: int = 0
+    pruned: int = 0
+
+    def add(self, other: "SelectionStats") -> None:
+        self.count(other.evaluated, other.pruned)
+
+    def count(self, evaluated: int, pruned: int) -> None:
+        with self._lock:
+            self.evaluated += evaluated
+            self.pruned += pruned
+
+    def totals(self) -> Tuple[int, int]:
+        """``(evaluated, pruned)`` read together."""
+        with self._lock:
+            return self.evaluated, self.pruned
+
+
+@dataclass
+class ScoreGrid:
+    """Score components for every restaurant × slot pair of an invitation.
+
+    Rows follow ``restaurant_ids`` and columns follow ``slots``, in the order they
+    were given, so ties resolve exactly like the scalar ``score_option`` loop.
+    """
+
+    restaurant_ids: List[str]
+    slots: List[Tuple[datetime, datetime]]
+    availability: AvailabilityBitmap
+    intersection_ratio: np.ndarray  # per restaurant
+    availability_ratio: np.ndarray  # per slot
+    convenience_score: np.ndarray  # per restaurant
+
+    def total_score(self, restaurant_index: int, slot_index: int) -> float:
+        return (
+            float(self.intersection_ratio[restaurant_index]) + float(self.availability_ratio[slot_index])
+        ) + float(self.convenience_score[restaurant_index])
+
+    def option(self, restaurant_index: int, slot_index: int) -> InvitationOption:
+        slot = self.slots[slot_index]
+        return InvitationOption(
+            restaurant_id=self.restaurant_ids[restaurant_index],
+            slot_start=slot[0],
+            slot_end=slot[1],
+            participants=self.availability.participants(slot_index),
+            intersection_ratio=float(self.intersection_ratio[restaurant_index]),
+            availability_ratio=float(self.availability_ratio[slot_index]),
+            convenience_score=float(self.convenience_score[restaurant_index]),
+            total_score=self.total_score(restaurant_index, slot_index),
+        )
+
+    def top_options(
+        self,
+        limit: int,
+        stats: Optional[SelectionStats] = None,
+        progress: Optional[ProgressCallback] = None,
+    ) -> List[InvitationOption]:
+        """Return the ``limit`` best options, best first.
+
+        Keeps a bounded min-heap of ``(score, -position)`` entries, where the
+        negated restaurant-major position makes earlier pairs win ties like a
+        stable sort would. Restaurants are visited by their score ceiling (own
+        intersection and convenience plus the best slot's availability) and
+        slots by availability, so once a ceiling falls below the k-th best the
+        remaining pairs are skipped without being scored.
+
+        ``progress`` is called with the best options so far and the number of
+        pairs scored whenever a restaurant improved them, at most once every
+        ``PROGRESS_INTERVAL`` seconds. Because the likeliest winners come
+        first, early reports are usually close to the final ranking.
+        """
+        restaurant_count = len(self.restaurant_ids)
+        slot_count = len(self.slots)
+        pair_count = restaurant_count * slot_count
+        if limit <= 0 or pair_count == 0:
+            if stats is not None:
+                stats.count(0, pair_count)
+            return []
+
+        intersection = self.intersection_ratio.tolist()
+        availability = self.availability_ratio.tolist()
+        convenience = self.convenience_score.tolist()
+        slot_order = sorted(range(slot_count), key=lambda index: -availability[index])
+        best_availability = availability[slot_order[0]]
+        ceilings = [
+            (intersection[index] + best_availability) + convenience[index]
+            for index in range(restaurant_count)
+        ]
+        restaurant_order = sorted(range(restaurant_count), key=lambda index: -ceilings[index])
+
+        heap: List[Tuple[float, int]] = []
+        evaluated = 0
+        next_report = 0.0
+        for restaurant_index in restaurant_order:
+            if len(heap) == limit and ceilings[restaurant_index] < heap[0][0]:
+                break
+            improved = False
+            for slot_index in slot_order:
+                score = (intersection[restaurant_index] + availability[slot_index]) + convenience[restaurant_index]
+                evaluated += 1
+                entry = (score, -(restaurant_index * slot_count + slot_index))
+                if len(heap) < limit:
+                    heappush(heap, entry)
+                elif entry > heap[0]:
+                    heapreplace(heap, entry)
+                elif score < heap[0][0]:
+                    break
+                else:
+                    continue
+                improved = True
+            if progress is not None and improved and monotonic() >= next_report:
+                progress(self._heap_options(heap), evaluated)
+                next_report = monotonic() + PROGRESS_INTERVAL
+
+        if stats is not None:
+            stats.count(evaluated, pair_count - evaluated)
+        return self._heap_options(heap)
+
+    def _heap_options(self, heap: List[Tuple[float, int]]) -> List[InvitationOption]:
+        slot_count = len(self.slots)
+        return [
+            self.option(-negated_position // slot_count, -negated_position % slot_count)
+            for _, negated_position in sorted(heap, reverse=True)
+        ]
+
+
+def wishlist_matrix(users: Sequence[User], restaurants: Sequence[Restaurant]) -> np.ndarray:
+    """Participant × restaurant matrix of wishlist membership."""
+    return membership_matrix([user.wishlist for user in users], [restaurant.id for restaurant in restaurants])
+
+
+def distance_matrix(users: Sequence[User], restaurants: Sequence[Restaurant]) -> np.ndarray:
+    """Participant × restaurant matrix of haversine distances in kilometres."""
+    return haversine_matrix(
+        [user.latitude for user in users],
+        [user.longitude for user in users],
+        [restaurant.latitude for restaurant in restaurants],
+        [restaurant.longitude for restaurant in restaurants],
+    )
+
+
+def build_score_grid(
+    users: Sequence[User],
+    restaurants: Sequence[Restaurant],
+    availability: AvailabilityBitmap,
+) -> ScoreGrid:
+    """Compute the score components of every restaurant × slot pair at once."""
+    return score_grid_from_matrices(
+        [restaurant.id for restaurant in restaurants],
+        availability,
+        wishlist_matrix(users, restaurants),
+        distance_matrix(users, restaurants),
+    )
+
+
+def score_grid_from_matrices(
+    restaurant_ids: List[str],
+    availability: AvailabilityBitmap,
+    wishlist: np.ndarray,
+    distances: np.ndarray,
+) -> ScoreGrid:
+    """Build a grid from participant × restaurant wishlist and distance matrices."""
+    user_count = len(availability.participant_ids)
+    restaurant_count = len(restaurant_ids)
+    if user_count:
+        intersection_ratio = wishlist.sum(axis=0) / user_count
+        inverted = 1 / (distances + CONVENIENCE_EPSILON)
+        # ``accumulate`` adds participants strictly in order, matching the
+        # left-to-right ``sum`` of the scalar path; ``ndarray.sum`` may add pair-wise.
+        convenience_score = np.add.accumulate(inverted, axis=0)[-1] / user_count
+    else:
+        intersection_ratio = np.zeros(restaurant_count)
+        convenience_score = np.zeros(restaurant_count)
+    return ScoreGrid(
+        restaurant_ids=restaurant_ids,
+        slots=availability.slots,
+        availability=availability,
+        intersection_ratio=intersection_ratio,
+        availability_ratio=availability.ratios(),
+        convenience_score=convenience_score,
+    )
@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .geo import haversine_matrix
+from .models import InvitationOption, Restaurant, User
+from .scoring import (
+    AvailabilityBitmap,
+    ProgressCallback,
+    SelectionStats,
+    score_grid_from_matrices,
+    wishlist_matrix,
+)
+
+
+@dataclass(slots=True)
+class ScoringPayload:
+    """Everything needed to score one invitation, detached from the repository.
+
+    Only ids, bit-packed matrices and coordinate arrays are kept, so shipping
+    a payload to a worker process costs about one bit per participant ×
+    restaurant and participant × slot pair instead of whole user records.
+    """
+
+    participant_ids: List[str]
+    restaurant_ids: List[str]
+    slots: List[Tuple[datetime, datetime]]
+    wishlist_bits: np.ndarray  # participant × restaurant, packed along rows
+    availability_bits: np.ndarray  # participant × slot, packed along rows
+    user_points: np.ndarray  # participant × (latitude, longitude)
+    restaurant_points: np.ndarray  # restaurant × (latitude, longitude)
+    limit: int
+    versions: Tuple[int, ...] = ()  # repository versions of the entities it was read from
+
+    @property
+    def cells(self) -> int:
+        """Size of the participant × restaurant × slot work."""
+        return len(self.participant_ids) * len(self.restaurant_ids) * len(self.slots)
+
+
+def build_payload(
+    users: Sequence[User],
+    restaurants: Sequence[Restaurant],
+    availability: AvailabilityBitmap,
+    limit: int,
+    versions: Tuple[int, ...] = (),
+) -> ScoringPayload:
+    return ScoringPayload(
+        participant_ids=[user.id for user in users],
+        restaurant_ids=[restaurant.id for restaurant in restaurants],
+        slots=list(availability.slots),
+        wishlist_bits=np.packbits(wishlist_matrix(users, restaurants), axis=1),
+        availability_bits=np.packbits(availability.matrix, axis=1),
+        user_points=np.array([(user.latitude, user.longitude) for user in users], dtype=float).reshape(-1, 2),
+        restaurant_points=np.array(
+            [(restaurant.latitude, restaurant.longitude) for restaurant in restaurants], dtype=float
+        ).reshape(-1, 2),
+        limit=limit,
+        versions=versions,
+    )
+
+
+def score_payload(
+    payload: ScoringPayload,
+    progress: Optional[ProgressCallback] = None,
+) -> Tuple[List[InvitationOption], SelectionStats]:
+    """Top options of a payload; runs inline or inside a worker process."""
+    participant_count = len(payload.participant_ids)
+    availability = AvailabilityBitmap(
+        participant_ids=payload.participant_ids,
+        slots=payload.slots,
+        matrix=unpack_matrix(payload.availability_bits, participant_count, len(payload.slots)),
+    )
+    wishlist = unpack_matrix(payload.wishlist_bits, participant_count, len(payload.restaurant_ids))
+    distances = haversine_matrix(
+        payload.user_points[:, 0],
+        payload.user_points[:, 1],
+        payload.restaurant_points[:, 0],
+        payload.restaurant_points[:, 1],
+    )
+    grid = score_grid_from_matrices(payload.restaurant_ids, availability, wishlist, distances)
+    stats = SelectionStats()
+    return grid.top_options(payload.limit, stats=stats, progress=progress), stats
+
+
+def score_payloads(payloads: Sequence[ScoringPayload]) -> List[Tuple[List[InvitationOption], SelectionStats]]:
+    """``score_payload`` over a chunk, so one round trip carries many jobs."""
+    return [score_payload(payload) for payload in payloads]
+
+
+def unpack_matrix(bits: np.ndarray, rows: int, columns: int) -> np.ndarray:
+    """Inverse of ``np.packbits(matrix, axis=1)`` for a ``rows × columns`` matrix."""
+    if rows == 0 or columns == 0:
+        return np.zeros((rows, columns), dtype=bool)
+    return np.unpackbits(bits, axis=1, count=columns).astype(bool)
+
+
+class ScoringPool:
+    """Scores large invitations in worker processes, small ones inline.
+
+    Payloads with fewer than ``offload_cells`` participant × restaurant × slot
+    cells are cheaper to score than to pickle, so they are scored in a
+    thread of this process instead, which keeps the event loop free.
+    Workers are spawned lazily on the first large job.
+    """
+
+    def __init__(self, workers: int, timeout: float, offload_cells: int) -> None:
+        self.workers = workers
+        self.timeout = timeout
+        self.offload_cells = offload_cells
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    async def score(self, payload: ScoringPayload) -> Tuple[List[InvitationOption], SelectionStats]:
+        """Score ``payload``; raises ``TimeoutError`` after ``timeout`` seconds.
+
+        A timed-out job is abandoned rather than killed: its worker finishes
+        it before taking the next one.
+        """
+        if self.workers <= 0 or payload.cells < self.offload_cells:
+            return await asyncio.to_thread(score_payload, payload)
+        executor = self._get_executor()
+        future = asyncio.get_running_loop().run_in_executor(executor, score_payload, payload)
+        try:
+            return await asyncio.wait_for(future, self.timeout)
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory); start afresh next time.
+            self._discard(executor)
+            raise
+
+    async def score_many(
+        self,
+        payloads: Sequence[ScoringPayload],
+    ) -> List[Union[Tuple[List[InvitationOption], SelectionStats], BaseException]]:
+        """Score many payloads, in order; a failed chunk fails each of its payloads.
+
+        Payloads are dealt largest first onto the least loaded of ``workers``
+        chunks, so each worker gets about the same number of cells and small
+        invitations share a round trip instead of paying one each.
+        """
+        if self.workers <= 0 or sum(payload.cells for payload in payloads) < self.offload_cells:
+            return await asyncio.to_thread(score_payloads, payloads)
+        chunk_count = min(self.workers, len(payloads))
+        chunks: List[List[int]] = [[] for _ in range(chunk_count)]
+        loads = [0] * chunk_count
+        for index in sorted(range(len(payloads)), key=lambda index: -payloads[index].cells):
+            lightest = loads.index(min(loads))
+            chunks[lightest].append(index)
+            loads[lightest] += payloads[index].cells
+
+        executor = self._get_executor()
+        loop = asyncio.get_running_loop()
+        outcomes = await asyncio.gather(
+            *(
+                asyncio.wait_for(
+                    loop.run_in_executor(executor, score_payloads, [payloads[index] for index in chunk]),
+                    self.timeout,
+                )
+                for chunk in chunks
+            ),
+            return_exceptions=True,
+        )
+        results: List[Union[Tuple[List[InvitationOption], SelectionStats], BaseException]] = [None] * len(payloads)
+        for chunk, outcome in zip(chunks, outcomes):
+            if isinstance(outcome, BrokenProcessPool):
+                self._discard(executor)
+            for position, index in enumerate(chunk):
+                results[index] = outcome if isinstance(outcome, BaseException) else outcome[position]
+        return results
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # Forking a threaded server can copy held locks into the
+                # child; spawned workers start clean.
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+
+    def _discard(self, executor: ProcessPoolExecutor) -> None:
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
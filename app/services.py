@@ -1,12 +1,36 @@
 from __future__ import annotations
 
+import asyncio
+from collections import Counter
 from dataclasses import replace
-from datetime import datetime
-from math import dist
-from typing import Iterable, List, Tuple
+from datetime import datetime, timedelta
+from heapq import nsmallest
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple, TypeVar, Union
 
-from .models import Availability, Invitation, InvitationOption, Restaurant, User
+import numpy as np
+
+from .config import settings
+from .events import CONFIRMED, OPTIONS_CHANGED, VOTE_RECORDED, EventBus
+from .geo import median_point
+from .intervals import IntervalIndex
+from .jobs import DONE, InvitationJob, JobQueue
+from .models import Availability, AvailabilityRule, Invitation, InvitationOption, Restaurant, User, Vote
+from .recurrence import FREQUENCIES, WEEKLY
 from .repository import repository
+from .rescoring import LiveGrid, OpenInvitations
+from .scoring import CONVENIENCE_EPSILON, AvailabilityBitmap, SelectionStats, build_score_grid, distance_matrix
+from .scoring_pool import ScoringPayload, ScoringPool, build_payload, score_payload
+from .slot_discovery import discover_slots
+
+Entity = TypeVar("Entity")
+
+# Cumulative top-k selection counters since process start.
+selection_stats = SelectionStats()
+scoring_pool = ScoringPool(settings.scoring_workers, settings.scoring_timeout, settings.scoring_offload_cells)
+invitation_jobs = JobQueue(settings.job_workers, settings.job_queue_size)
+# Unconfirmed invitations built by this process, rescored as their inputs change.
+open_invitations = OpenInvitations()
+invitation_events = EventBus(settings.event_queue_size)
 
 
 def get_users(user_ids: Iterable[str]) -> List[User]:
@@ -29,6 +53,109 @@ def get_restaurants(restaurant_ids: Iterable[str]) -> List[Restaurant]:
     return restaurants
 
 
+def recommend_restaurants(
+    users: Sequence[User],
+    limit: int,
+    exclude: Iterable[str] = (),
+    unvisited_only: bool = False,
+    within_km: Optional[float] = None,
+) -> List[str]:
+    """Catalog restaurants most wished for by ``users``, best first.
+
+    Only the group's own wishlists are walked, so the cost does not grow with
+    the catalog. Equal overlaps are broken by how many users overall wish for
+    the restaurant, then by id. ``unvisited_only`` drops restaurants any of
+    the users has already been to, and ``within_km`` those farther than that
+    from the group's median point.
+    """
+    excluded = set(exclude)
+    visited = repository.visited_by_any(user.id for user in users) if unvisited_only else frozenset()
+    nearby = None
+    if within_km is not None:
+        nearby = {restaurant.id for restaurant, _ in nearby_restaurants(users, within_km)}
+    overlap: Counter[str] = Counter()
+    for user in users:
+        overlap.update(
+            restaurant_id
+            for restaurant_id in user.wishlist
+            if restaurant_id not in excluded and restaurant_id not in visited
+        )
+    candidates = [
+        restaurant_id
+        for restaurant_id in overlap
+        if repository.get_restaurant(restaurant_id) and (nearby is None or restaurant_id in nearby)
+    ]
+    return nsmallest(
+        limit,
+        candidates,
+        key=lambda restaurant_id: (
+            -overlap[restaurant_id],
+            -len(repository.get_wishers(restaurant_id)),
+            restaurant_id,
+        ),
+    )
+
+
+def nearby_restaurants(users: Sequence[User], radius_km: float) -> List[Tuple[Restaurant, float]]:
+    """Restaurants within ``radius_km`` of the users' median point, nearest first."""
+    if not users:
+        return []
+    latitude, longitude = median_point((user.latitude, user.longitude) for user in users)
+    return repository.restaurants_within(latitude, longitude, radius_km)
+
+
+def resolve_candidate_restaurants(
+    participant_ids: Sequence[str],
+    candidate_restaurant_ids: Sequence[str],
+    recommend_top_n: Optional[int] = None,
+    unvisited_only: bool = False,
+    within_km: Optional[float] = None,
+) -> List[str]:
+    """Listed candidates followed by up to ``recommend_top_n`` recommendations."""
+    resolved = list(candidate_restaurant_ids)
+    if recommend_top_n:
+        users = get_users(participant_ids)
+        resolved.extend(
+            recommend_restaurants(
+                users,
+                recommend_top_n,
+                exclude=resolved,
+                unvisited_only=unvisited_only,
+                within_km=within_km,
+            )
+        )
+        if not resolved:
+            raise ValueError("No wishlist restaurants to recommend for this group")
+    return resolved
+
+
+def resolve_candidate_slots(
+    participant_ids: Sequence[str],
+    candidate_slots: Sequence[Tuple[datetime, datetime]],
+    search_window: Optional[Tuple[datetime, datetime]] = None,
+    duration: Optional[timedelta] = None,
+    max_slots: int = 3,
+) -> List[Tuple[datetime, datetime]]:
+    """Listed slots followed by the best slots discovered inside ``search_window``."""
+    resolved = list(candidate_slots)
+    if search_window is not None and duration is not None:
+        users = get_users(participant_ids)
+        # Recurring rules only expand inside the search window.
+        discovered = discover_slots(
+            [repository.get_availability_calendar(user.id).windows(*search_window) for user in users],
+            search_window[0],
+            search_window[1],
+            duration,
+            max_slots,
+        )
+        for slot in discovered:
+            if (slot.slot_start, slot.slot_end) not in resolved:
+                resolved.append((slot.slot_start, slot.slot_end))
+        if not resolved:
+            raise ValueError("No participant is free for a slot in the search window")
+    return resolved
+
+
 def compute_intersection_ratio(restaurant_id: str, users: List[User]) -> float:
     interested = sum(1 for user in users if restaurant_id in user.wishlist)
     return interested / len(users) if users else 0.0
@@ -43,12 +170,8 @@ def is_user_available(user_availabilities: List[Availability], slot: Tuple[datet
 
 
 def compute_availability_ratio(users: List[User], slot: Tuple[datetime, datetime]) -> Tuple[float, List[str]]:
-    slot_start, slot_end = slot
-    available_users: List[str] = []
-    for user in users:
-        availabilities = repository.get_availabilities(user.id)
-        if is_user_available(availabilities, (slot_start, slot_end)):
-            available_users.append(user.id)
+    rows = repository.who_is_free([user.id for user in users], [slot])
+    available_users = [user.id for user, row in zip(users, rows) if row[0]]
     ratio = len(available_users) / len(users) if users else 0.0
     return ratio, available_users
 
@@ -56,16 +179,10 @@ def compute_availability_ratio(users: List[User], slot: Tuple[datetime, datetime
 def compute_convenience_score(restaurant: Restaurant, users: List[User]) -> float:
     if not users:
         return 0.0
-    distances = [
-        dist((user.latitude, user.longitude), (restaurant.latitude, restaurant.longitude))
-        for user in users
-    ]
-    if not distances:
-        return 0.0
+    distances = distance_matrix(users, [restaurant])[:, 0].tolist()
     # Lower distance should yield a higher score. Normalize using inverse distance.
     # Add a small epsilon to avoid division by zero.
-    epsilon = 1e-6
-    inverted = [1 / (d + epsilon) for d in distances]
+    inverted = [1 / (d + CONVENIENCE_EPSILON) for d in distances]
     return sum(inverted) / len(inverted)
 
 
@@ -90,39 +207,443 @@ def score_option(
     )
 
 
+def compute_availability_bitmap(
+    users: Sequence[User],
+    slots: Sequence[Tuple[datetime, datetime]],
+) -> AvailabilityBitmap:
+    rows = repository.who_is_free([user.id for user in users], slots)
+    return AvailabilityBitmap(
+        participant_ids=[user.id for user in users],
+        slots=list(slots),
+        matrix=np.array(rows, dtype=bool).reshape(len(users), len(slots)),
+    )
+
+
 def generate_top_options(invitation: Invitation, limit: int = 3) -> List[InvitationOption]:
-    users = get_users(invitation.participant_ids)
-    restaurants = get_restaurants(invitation.candidate_restaurant_ids)
+    # Users, restaurants and availability all come from one repository snapshot.
+    with repository.reading():
+        users = get_users(invitation.participant_ids)
+        restaurants = get_restaurants(invitation.candidate_restaurant_ids)
+        availability = compute_availability_bitmap(users, invitation.candidate_slots)
+    grid = build_score_grid(users, restaurants, availability)
+    return grid.top_options(limit, stats=selection_stats)
+
 
-    options: List[InvitationOption] = []
-    for restaurant in restaurants:
-        for slot in invitation.candidate_slots:
-            options.append(score_option(restaurant, slot, users))
-    options.sort(key=lambda option: option.total_score, reverse=True)
-    return options[:limit]
+def prepare_scoring(invitation: Invitation, limit: int = 3) -> ScoringPayload:
+    """Read everything scoring ``invitation`` needs into one detached payload."""
+    with repository.reading():
+        users = get_users(invitation.participant_ids)
+        restaurants = get_restaurants(invitation.candidate_restaurant_ids)
+        availability = compute_availability_bitmap(users, invitation.candidate_slots)
+        versions = read_versions(invitation.participant_ids, invitation.candidate_restaurant_ids)
+    return build_payload(users, restaurants, availability, limit, versions)
+
+
+def read_versions(
+    participant_ids: Sequence[str],
+    restaurant_ids: Sequence[str],
+    version: Optional[Callable[[str, str], int]] = None,
+) -> Tuple[int, ...]:
+    """Entity versions of everything an invitation's score depends on."""
+    version = version or repository.entity_version
+    return (
+        *(version("users", user_id) for user_id in participant_ids),
+        *(version("availabilities", user_id) for user_id in participant_ids),
+        *(version("restaurants", restaurant_id) for restaurant_id in restaurant_ids),
+    )
+
+
+def prepare_scoring_batch(
+    invitations: Sequence[Invitation],
+    limits: Sequence[int],
+) -> List[Union[ScoringPayload, ValueError]]:
+    """``prepare_scoring`` for many invitations, looking each entity up once.
+
+    Users, restaurants and every user's free/busy state for every distinct
+    slot are read from one snapshot; each invitation then only picks its rows
+    and columns. An invitation naming an unknown entity gets its
+    ``ValueError`` in place of a payload.
+    """
+    user_ids = list(dict.fromkeys(user_id for invitation in invitations for user_id in invitation.participant_ids))
+    restaurant_ids = list(
+        dict.fromkeys(
+            restaurant_id for invitation in invitations for restaurant_id in invitation.candidate_restaurant_ids
+        )
+    )
+    slots = list(dict.fromkeys(slot for invitation in invitations for slot in invitation.candidate_slots))
+    with repository.reading():
+        users = {user_id: repository.get_user(user_id) for user_id in user_ids}
+        restaurants = {restaurant_id: repository.get_restaurant(restaurant_id) for restaurant_id in restaurant_ids}
+        known_ids = [user_id for user_id, user in users.items() if user]
+        free = np.array(repository.who_is_free(known_ids, slots), dtype=bool).reshape(len(known_ids), len(slots))
+        versions = {
+            (name, entity_id): repository.entity_version(name, entity_id)
+            for names, entity_ids in ((("users", "availabilities"), user_ids), (("restaurants",), restaurant_ids))
+            for name in names
+            for entity_id in entity_ids
+        }
+    rows = {user_id: row for row, user_id in enumerate(known_ids)}
+    columns = {slot: column for column, slot in enumerate(slots)}
+
+    payloads: List[Union[ScoringPayload, ValueError]] = []
+    for invitation, limit in zip(invitations, limits):
+        try:
+            members = _pick(users, invitation.participant_ids, "User")
+            candidates = _pick(restaurants, invitation.candidate_restaurant_ids, "Restaurant")
+        except ValueError as exc:
+            payloads.append(exc)
+            continue
+        availability = AvailabilityBitmap(
+            participant_ids=[user.id for user in members],
+            slots=list(invitation.candidate_slots),
+            matrix=free[np.ix_(
+                [rows[user.id] for user in members],
+                [columns[slot] for slot in invitation.candidate_slots],
+            )],
+        )
+        payloads.append(
+            build_payload(
+                members,
+                candidates,
+                availability,
+                limit,
+                read_versions(
+                    invitation.participant_ids,
+                    invitation.candidate_restaurant_ids,
+                    lambda name, entity_id: versions[name, entity_id],
+                ),
+            )
+        )
+    return payloads
+
+
+def _pick(entities: Dict[str, Optional[Entity]], entity_ids: Iterable[str], kind: str) -> List[Entity]:
+    picked = []
+    for entity_id in entity_ids:
+        entity = entities[entity_id]
+        if not entity:
+            raise ValueError(f"{kind} {entity_id} not found")
+        picked.append(entity)
+    return picked
+
+
+def invitation_availability(invitation_id: str) -> AvailabilityBitmap:
+    with repository.reading():
+        invitation = repository.get_invitation(invitation_id)
+        if not invitation:
+            raise ValueError("Invitation not found")
+        users = get_users(invitation.participant_ids)
+        return compute_availability_bitmap(users, invitation.candidate_slots)
 
 
 def build_invitation(
     invitation: Invitation,
     limit: int = 3,
 ) -> Invitation:
-    top_options = generate_top_options(invitation, limit=limit)
+    payload = prepare_scoring(invitation, limit)
+    top_options = LiveGrid(invitation.id, payload).top_options(stats=selection_stats)
+    invitation = replace(invitation, top_options=top_options)
+    repository.add_invitation(invitation)
+    invitation = _track(invitation, payload)
+    invitation_events.publish(OPTIONS_CHANGED, invitation)
+    return invitation
+
+
+async def build_invitation_async(
+    invitation: Invitation,
+    limit: int = 3,
+) -> Invitation:
+    """``build_invitation`` with scoring handed to ``scoring_pool``.
+
+    Repository access runs in worker threads so the event loop only waits.
+    """
+    payload = await asyncio.to_thread(prepare_scoring, invitation, limit)
+    top_options, stats = await scoring_pool.score(payload)
+    selection_stats.add(stats)
+    invitation = replace(invitation, top_options=top_options)
+    await asyncio.to_thread(repository.add_invitation, invitation)
+    invitation = await asyncio.to_thread(_track, invitation, payload)
+    invitation_events.publish(OPTIONS_CHANGED, invitation)
+    return invitation
+
+
+async def build_invitations_async(
+    invitations: Sequence[Invitation],
+    limits: Sequence[int],
+) -> List[Union[Invitation, BaseException]]:
+    """Build many invitations at once; failures are returned in place.
+
+    Entities are resolved once for the whole batch, payloads are scored in
+    parallel by ``scoring_pool`` and every built invitation is stored in one
+    repository batch.
+    """
+    prepared = await asyncio.to_thread(prepare_scoring_batch, invitations, limits)
+    scored = iter(await scoring_pool.score_many([item for item in prepared if isinstance(item, ScoringPayload)]))
+    results: List[Union[Invitation, BaseException]] = []
+    for invitation, item in zip(invitations, prepared):
+        outcome = item if isinstance(item, BaseException) else next(scored)
+        if isinstance(outcome, BaseException):
+            results.append(outcome)
+            continue
+        top_options, stats = outcome
+        selection_stats.add(stats)
+        results.append(replace(invitation, top_options=top_options))
+    built = [(result, payload) for result, payload in zip(results, prepared) if isinstance(result, Invitation)]
+    await asyncio.to_thread(_store_invitations, [invitation for invitation, _ in built])
+    tracked = iter(await asyncio.to_thread(lambda: [_track(invitation, payload) for invitation, payload in built]))
+    results = [next(tracked) if isinstance(result, Invitation) else result for result in results]
+    for result in results:
+        if isinstance(result, Invitation):
+            invitation_events.publish(OPTIONS_CHANGED, result)
+    return results
+
+
+def _store_invitations(invitations: Sequence[Invitation]) -> None:
+    with repository.batch():
+        for invitation in invitations:
+            repository.add_invitation(invitation)
+
+
+def run_invitation_job(job: InvitationJob, invitation: Invitation, limit: int = 3) -> Invitation:
+    """``build_invitation`` for a background job, publishing partial top-k."""
+    payload = prepare_scoring(invitation, limit)
+    job.publish(total=len(payload.restaurant_ids) * len(payload.slots))
+    top_options, stats = score_payload(
+        payload,
+        progress=lambda options, evaluated: job.publish(top_options=options, evaluated=evaluated),
+    )
+    selection_stats.add(stats)
     invitation = replace(invitation, top_options=top_options)
     repository.add_invitation(invitation)
+    invitation = _track(invitation, payload)
+    invitation_events.publish(OPTIONS_CHANGED, invitation)
+    job.publish(status=DONE, top_options=top_options, evaluated=stats.evaluated)
+    return invitation
+
+
+def confirm_option(invitation_id: str, option_index: int, user_id: Optional[str] = None) -> Invitation:
+    """Confirm an option; when ``user_id`` is given it must be the organizer's."""
+    # The batch keeps a concurrent rescoring from overwriting the confirmation.
+    with repository.batch():
+        invitation = repository.get_invitation(invitation_id)
+        if not invitation:
+            raise ValueError("Invitation not found")
+        if user_id is not None and user_id != invitation.organizer_id:
+            raise ValueError("Only the organizer can confirm an invitation")
+        invitation = _confirm(invitation, option_index)
+    open_invitations.untrack(invitation_id)
+    invitation_events.publish(CONFIRMED, invitation)
     return invitation
 
 
-def confirm_option(invitation_id: str, option_index: int) -> Invitation:
-    invitation = repository.get_invitation(invitation_id)
-    if not invitation:
-        raise ValueError("Invitation not found")
+def _confirm(invitation: Invitation, option_index: int) -> Invitation:
     if not (0 <= option_index < len(invitation.top_options)):
         raise ValueError("Invalid option index")
     option = invitation.top_options[option_index]
-    calendar_link = f"https://calendar.example.com/events/{invitation_id}-{option_index}"
+    calendar_link = f"https://calendar.example.com/events/{invitation.id}-{option_index}"
     reservation_link = f"https://reservations.example.com/{option.restaurant_id}?slot={option.slot_start.isoformat()}"
-    invitation.confirmed_option = option
-    invitation.calendar_link = calendar_link
-    invitation.reservation_link = reservation_link
+    # Published invitations are shared with concurrent readers; store a new one.
+    invitation = replace(
+        invitation,
+        confirmed_option=option,
+        calendar_link=calendar_link,
+        reservation_link=reservation_link,
+    )
     repository.add_invitation(invitation)
     return invitation
+
+
+def option_key(option: InvitationOption) -> str:
+    """Stable vote key of an option; indexes shift when an invitation is rescored."""
+    return f"{option.restaurant_id}@{option.slot_start.isoformat()}/{option.slot_end.isoformat()}"
+
+
+def record_vote(invitation_id: str, user_id: str, option_index: int) -> Tuple[Vote, Invitation]:
+    """Record ``user_id``'s vote and confirm the invitation if the vote decides it.
+
+    Returns the vote and the invitation as it stands afterwards.
+    """
+    with repository.batch():
+        invitation = repository.get_invitation(invitation_id)
+        if not invitation:
+            raise ValueError("Invitation not found")
+        if invitation.confirmed_option is not None:
+            raise ValueError("Invitation is already confirmed")
+        if user_id not in invitation.participant_ids:
+            raise ValueError("Only participants can vote")
+        if not (0 <= option_index < len(invitation.top_options)):
+            raise ValueError("Invalid option index")
+        vote = Vote(
+            invitation_id=invitation_id,
+            user_id=user_id,
+            option_key=option_key(invitation.top_options[option_index]),
+        )
+        elected = _elected_option(invitation, repository.record_vote(vote))
+        if elected is not None:
+            invitation = _confirm(invitation, elected)
+    invitation_events.publish(VOTE_RECORDED, invitation, vote)
+    if elected is not None:
+        open_invitations.untrack(invitation_id)
+        invitation_events.publish(CONFIRMED, invitation)
+    return vote, invitation
+
+
+def vote_tally(invitation_id: str) -> Tuple[Invitation, List[int], int]:
+    """The invitation, votes for each of its current options and how many have voted."""
+    with repository.reading():
+        invitation = repository.get_invitation(invitation_id)
+        if not invitation:
+            raise ValueError("Invitation not found")
+        tally = repository.get_tally(invitation_id)
+    return invitation, [tally.get(option_key(option), 0) for option in invitation.top_options], sum(tally.values())
+
+
+def _elected_option(invitation: Invitation, tally: Dict[str, int]) -> Optional[int]:
+    """The option the votes settle on, if any.
+
+    An option wins outright once more than ``vote_majority`` of the
+    participants back it. Once ``vote_quorum`` of them have voted, a sole
+    leader wins; a tie waits for more votes or the organizer.
+    """
+    counts = [tally.get(option_key(option), 0) for option in invitation.top_options]
+    if not counts:
+        return None
+    participants = len(invitation.participant_ids)
+    leading = max(counts)
+    if leading > settings.vote_majority * participants:
+        return counts.index(leading)
+    if sum(tally.values()) >= settings.vote_quorum * participants and leading and counts.count(leading) == 1:
+        return counts.index(leading)
+    return None
+
+
+def save_user(user: User) -> None:
+    """Store ``user`` and rescore the open invitations they take part in."""
+    repository.add_user(user)
+    stored = repository.get_user(user.id)
+    with open_invitations.lock:
+        for grid in open_invitations.for_user(user.id):
+            grid.set_user(stored)
+            _republish(grid)
+
+
+def save_availabilities(user_id: str, availabilities: Iterable[Availability]) -> None:
+    """Store ``user_id``'s availability and rescore their open invitations."""
+    repository.set_availabilities(user_id, availabilities)
+    _rescore_availability(user_id)
+
+
+def update_availability(
+    user_id: str,
+    add: Sequence[Tuple[datetime, datetime]] = (),
+    remove: Sequence[Tuple[datetime, datetime]] = (),
+) -> IntervalIndex:
+    """Add and remove windows of ``user_id``'s availability and rescore their open invitations."""
+    for start, end in [*add, *remove]:
+        if end <= start:
+            raise ValueError("slot_end must be after slot_start")
+    index = repository.update_availability(user_id, add, remove)
+    _rescore_availability(user_id)
+    return index
+
+
+def import_free_busy(
+    user_id: str,
+    free: Sequence[Tuple[datetime, datetime]],
+    busy: Sequence[Tuple[datetime, datetime]],
+) -> IntervalIndex:
+    """Replace ``user_id``'s availability inside a parsed calendar's horizon.
+
+    ``free`` and ``busy`` together tile the horizon, so merging one and
+    cutting out the other leaves windows outside the horizon untouched.
+    """
+    return update_availability(user_id, add=free, remove=busy)
+
+
+def save_availability_rule(rule: AvailabilityRule) -> None:
+    """Store a recurring availability rule and rescore the user's open invitations."""
+    if rule.frequency not in FREQUENCIES:
+        raise ValueError(f"frequency must be one of {', '.join(FREQUENCIES)}")
+    if rule.frequency == WEEKLY and not rule.weekdays:
+        raise ValueError("weekly rules need at least one weekday")
+    if any(not 0 <= weekday <= 6 for weekday in rule.weekdays):
+        raise ValueError("weekdays run from 0 (Monday) to 6 (Sunday)")
+    if rule.ends_on is not None and rule.ends_on < rule.starts_on:
+        raise ValueError("ends_on must not be before starts_on")
+    repository.set_availability_rule(rule)
+    _rescore_availability(rule.user_id)
+
+
+def delete_availability_rule(user_id: str, rule_id: str) -> bool:
+    """Remove a recurring availability rule; False if ``user_id`` has no such rule."""
+    if not repository.delete_availability_rule(user_id, rule_id):
+        return False
+    _rescore_availability(user_id)
+    return True
+
+
+def _rescore_availability(user_id: str) -> None:
+    with open_invitations.lock:
+        grids = open_invitations.for_user(user_id)
+        if not grids:
+            return
+        calendar = repository.get_availability_calendar(user_id)
+        for grid in grids:
+            grid.set_availability(user_id, calendar)
+            _republish(grid)
+
+
+def save_restaurant(restaurant: Restaurant) -> None:
+    """Store ``restaurant`` and rescore the open invitations listing it."""
+    repository.add_restaurant(restaurant)
+    with open_invitations.lock:
+        for grid in open_invitations.for_restaurant(restaurant.id):
+            grid.set_restaurant(restaurant)
+            _republish(grid)
+
+
+def _track(invitation: Invitation, payload: ScoringPayload) -> Invitation:
+    """Track a freshly scored invitation and catch up on writes made meanwhile.
+
+    An update that landed between reading ``payload`` and ``track`` found
+    nothing to rescore, so the versions the payload was read at are
+    compared under the lock; if any moved, the grid is refreshed from the
+    repository and the rescored invitation is stored and returned.
+    """
+    with open_invitations.lock:
+        open_invitations.track(invitation.id, payload)
+        if read_versions(payload.participant_ids, payload.restaurant_ids) == payload.versions:
+            return invitation
+        grid = open_invitations.grid(invitation.id)
+        with repository.reading():
+            for user_id in payload.participant_ids:
+                user = repository.get_user(user_id)
+                if user is not None:
+                    grid.set_user(user)
+                grid.set_availability(user_id, repository.get_availability_calendar(user_id))
+            for restaurant_id in dict.fromkeys(payload.restaurant_ids):
+                restaurant = repository.get_restaurant(restaurant_id)
+                if restaurant is not None:
+                    grid.set_restaurant(restaurant)
+        return _rescored(grid) or invitation
+
+
+def _republish(grid: LiveGrid) -> None:
+    invitation = _rescored(grid)
+    if invitation is not None:
+        invitation_events.publish(OPTIONS_CHANGED, invitation)
+
+
+def _rescored(grid: LiveGrid) -> Optional[Invitation]:
+    """Store the grid's current top options; None once the invitation is closed."""
+    top_options = grid.top_options(stats=selection_stats)
+    with repository.batch():
+        invitation = repository.get_invitation(grid.invitation_id)
+        if invitation is None or invitation.confirmed_option is not None:
+            invitation = None
+        else:
+            invitation = replace(invitation, top_options=top_options)
+            repository.add_invitation(invitation)
+    if invitation is None:
+        open_invitations.untrack(grid.invitation_id)
+    return invitation
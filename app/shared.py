@@ -0,0 +1,394 @@
+from __future__ import annotations
+
+from bisect import bisect_left, bisect_right
+from itertools import accumulate, chain
+from typing import (
+    Any,
+    Dict,
+    Generic,
+    Hashable,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    MutableMapping,
+    MutableSet,
+    Optional,
+    Set,
+    Tuple,
+    TypeVar,
+    Union,
+)
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+# Hash bits consumed per trie level, and entries a leaf holds before it splits.
+BRANCH_BITS = 6
+LEAF_SIZE = 128
+# Past this shift the hash has no bits left, so leaves just grow.
+MAX_SHIFT = 60
+# Keys per chunk of a SortedKeys; a chunk splits in two at twice this.
+CHUNK_SIZE = 512
+
+_WIDTH = 1 << BRANCH_BITS
+_MASK = _WIDTH - 1
+# Shared by every trie; never owned, so never written to.
+_EMPTY: Dict[Any, Any] = {}
+
+Node = Union[List[Any], Dict[Any, Any]]
+
+
+class SharedDict(MutableMapping[K, V]):
+    """A dict whose copies share structure, for copy-on-write snapshots.
+
+    Entries live in small leaf dicts at the bottom of a hash trie with 64-way
+    branches, so ``copy()`` is O(1) and a write copies only the branches and
+    the leaf on its key's path, a few hundred references whatever the size.
+    A read walks two or three branches before its dict lookup. Nodes created
+    since the last ``copy()`` are owned and updated in place, so a batch of
+    writes copies each path once. Iteration follows hash order, not
+    insertion order.
+    """
+
+    __slots__ = ("_root", "_size", "_owned")
+
+    def __init__(self, items: Union[Mapping[K, V], Iterable[Tuple[K, V]]] = ()) -> None:
+        entries = dict(items)
+        self._root: Node = _build(entries) if entries else _EMPTY
+        self._size = len(entries)
+        self._owned: Set[int] = set()
+
+    def get(self, key: K, default: Optional[V] = None) -> Optional[V]:
+        node = self._root
+        code = hash(key)
+        while node.__class__ is list:
+            node = node[code & _MASK]
+            code >>= BRANCH_BITS
+        return node.get(key, default)
+
+    def __getitem__(self, key: K) -> V:
+        node = self._root
+        code = hash(key)
+        while node.__class__ is list:
+            node = node[code & _MASK]
+            code >>= BRANCH_BITS
+        return node[key]
+
+    def __contains__(self, key: object) -> bool:
+        node = self._root
+        code = hash(key)
+        while node.__class__ is list:
+            node = node[code & _MASK]
+            code >>= BRANCH_BITS
+        return key in node
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self) -> Iterator[K]:
+        for leaf in _leaves(self._root):
+            yield from leaf
+
+    def values(self) -> Iterator[V]:  # type: ignore[override]
+        for leaf in _leaves(self._root):
+            yield from leaf.values()
+
+    def items(self) -> Iterator[Tuple[K, V]]:  # type: ignore[override]
+        for leaf in _leaves(self._root):
+            yield from leaf.items()
+
+    def __setitem__(self, key: K, value: V) -> None:
+        leaf, parent, slot, shift = self._leaf(key)
+        if key not in leaf:
+            self._size += 1
+        leaf[key] = value
+        if len(leaf) > LEAF_SIZE and shift < MAX_SHIFT:
+            branch = self._split(leaf, shift)
+            if parent is None:
+                self._root = branch
+            else:
+                parent[slot] = branch
+
+    def __delitem__(self, key: K) -> None:
+        if key not in self:
+            raise KeyError(key)
+        leaf = self._leaf(key)[0]
+        del leaf[key]
+        self._size -= 1
+
+    def copy(self) -> "SharedDict[K, V]":
+        """An independent dict sharing every node with this one."""
+        clone = self.__class__.__new__(self.__class__)
+        clone._root, clone._size, clone._owned = self._root, self._size, set()
+        # Both now reference every node, so neither may write to one in place.
+        self._owned = set()
+        return clone
+
+    def __getstate__(self) -> Tuple[Node, int]:
+        # Pickled as its nodes, so loading needs no rebuild; ownership is not kept.
+        return self._root, self._size
+
+    def __setstate__(self, state: Tuple[Node, int]) -> None:
+        self._root, self._size = state
+        self._owned = set()
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({dict(self.items())!r})"
+
+    def _leaf(self, key: K) -> Tuple[Dict[K, V], Optional[List[Any]], int, int]:
+        """The owned leaf for ``key``, its parent branch, slot and shift."""
+        code = hash(key)
+        owned = self._owned
+        node = self._root
+        if id(node) not in owned:
+            node = self._root = node.copy()
+            owned.add(id(node))
+        parent: Optional[List[Any]] = None
+        slot = shift = 0
+        while node.__class__ is list:
+            parent, slot = node, (code >> shift) & _MASK
+            node = parent[slot]
+            if id(node) not in owned:
+                node = parent[slot] = node.copy()
+                owned.add(id(node))
+            shift += BRANCH_BITS
+        return node, parent, slot, shift
+
+    def _split(self, leaf: Dict[K, V], shift: int) -> List[Any]:
+        branch: List[Any] = [_EMPTY] * _WIDTH
+        for key, value in leaf.items():
+            slot = (hash(key) >> shift) & _MASK
+            if branch[slot] is _EMPTY:
+                branch[slot] = {}
+                self._owned.add(id(branch[slot]))
+            branch[slot][key] = value
+        self._owned.discard(id(leaf))
+        self._owned.add(id(branch))
+        return branch
+
+
+class SharedSet(MutableSet[K]):
+    """A set whose copies share structure, backed by a ``SharedDict``."""
+
+    __slots__ = ("_members",)
+
+    def __init__(self, members: Iterable[K] = ()) -> None:
+        self._members: SharedDict[K, None] = SharedDict((member, None) for member in members)
+
+    def __contains__(self, member: object) -> bool:
+        return member in self._members
+
+    def __iter__(self) -> Iterator[K]:
+        return iter(self._members)
+
+    def __len__(self) -> int:
+        return len(self._members)
+
+    def add(self, member: K) -> None:
+        self._members[member] = None
+
+    def discard(self, member: K) -> None:
+        if member in self._members:
+            del self._members[member]
+
+    def copy(self) -> "SharedSet[K]":
+        clone = SharedSet.__new__(SharedSet)
+        clone._members = self._members.copy()
+        return clone
+
+    def __getstate__(self) -> SharedDict[K, None]:
+        return self._members
+
+    def __setstate__(self, members: SharedDict[K, None]) -> None:
+        self._members = members
+
+    def __repr__(self) -> str:
+        return f"SharedSet({set(self)!r})"
+
+
+class SortedKeys(Generic[K]):
+    """Sorted distinct keys in chunks, so copies share every untouched chunk.
+
+    ``copy()`` copies the list of chunks, one reference per ``CHUNK_SIZE``
+    keys, and a write copies the one chunk it changes. Positions are found
+    with a bisect over the chunks' last keys, then one within the chunk.
+    """
+
+    __slots__ = ("_chunks", "_maxes", "_owned", "_size", "_offsets")
+
+    def __init__(self, keys: Iterable[K] = ()) -> None:
+        ordered = list(dict.fromkeys(sorted(keys)))
+        self._chunks: List[List[K]] = [
+            ordered[start : start + CHUNK_SIZE] for start in range(0, len(ordered), CHUNK_SIZE)
+        ]
+        self._maxes: List[K] = [chunk[-1] for chunk in self._chunks]
+        self._owned: Set[int] = {id(chunk) for chunk in self._chunks}
+        self._size = len(ordered)
+        self._offsets: Optional[List[int]] = None
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self) -> Iterator[K]:
+        return chain.from_iterable(self._chunks)
+
+    def __contains__(self, key: object) -> bool:
+        index = bisect_left(self._maxes, key)
+        return index < len(self._maxes) and _found(self._chunks[index], key)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, (SortedKeys, list)):
+            return len(self) == len(other) and list(self) == list(other)
+        return NotImplemented
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __getitem__(self, position: int) -> K:
+        if position < 0:
+            position += self._size
+        if not 0 <= position < self._size:
+            raise IndexError("SortedKeys index out of range")
+        index, offset = self._locate(position)
+        return self._chunks[index][offset]
+
+    def bisect_left(self, key: K) -> int:
+        index = bisect_left(self._maxes, key)
+        if index == len(self._maxes):
+            return self._size
+        return self._start(index) + bisect_left(self._chunks[index], key)
+
+    def bisect_right(self, key: K) -> int:
+        index = bisect_right(self._maxes, key)
+        if index == len(self._maxes):
+            return self._size
+        return self._start(index) + bisect_right(self._chunks[index], key)
+
+    def iter_from(self, position: int) -> Iterator[K]:
+        """Keys from ``position`` on, in order."""
+        if position >= self._size:
+            return iter(())
+        index, offset = self._locate(max(position, 0))
+        return chain(self._chunks[index][offset:], chain.from_iterable(self._chunks[index + 1 :]))
+
+    def add(self, key: K) -> None:
+        if not self._chunks:
+            chunk = [key]
+            self._chunks.append(chunk)
+            self._maxes.append(key)
+            self._owned.add(id(chunk))
+            self._size = 1
+            self._offsets = None
+            return
+        index = min(bisect_left(self._maxes, key), len(self._maxes) - 1)
+        position = bisect_left(self._chunks[index], key)
+        if _found(self._chunks[index], key, position):
+            return
+        chunk = self._own(index)
+        chunk.insert(position, key)
+        self._maxes[index] = chunk[-1]
+        self._size += 1
+        self._offsets = None
+        if len(chunk) > 2 * CHUNK_SIZE:
+            head, tail = chunk[:CHUNK_SIZE], chunk[CHUNK_SIZE:]
+            self._chunks[index : index + 1] = [head, tail]
+            self._maxes[index : index + 1] = [head[-1], tail[-1]]
+            self._owned.discard(id(chunk))
+            self._owned.update((id(head), id(tail)))
+
+    def discard(self, key: K) -> None:
+        index = bisect_left(self._maxes, key)
+        if index == len(self._maxes):
+            return
+        position = bisect_left(self._chunks[index], key)
+        if not _found(self._chunks[index], key, position):
+            return
+        chunk = self._own(index)
+        del chunk[position]
+        self._size -= 1
+        self._offsets = None
+        if chunk:
+            self._maxes[index] = chunk[-1]
+        else:
+            del self._chunks[index], self._maxes[index]
+            self._owned.discard(id(chunk))
+
+    def copy(self) -> "SortedKeys[K]":
+        """Independent keys sharing every chunk with these."""
+        clone = SortedKeys.__new__(SortedKeys)
+        clone._chunks, clone._maxes = list(self._chunks), list(self._maxes)
+        clone._owned, clone._size, clone._offsets = set(), self._size, self._offsets
+        self._owned = set()
+        return clone
+
+    def __getstate__(self) -> Tuple[List[List[K]], List[K], int]:
+        return self._chunks, self._maxes, self._size
+
+    def __setstate__(self, state: Tuple[List[List[K]], List[K], int]) -> None:
+        self._chunks, self._maxes, self._size = state
+        self._owned, self._offsets = set(), None
+
+    def __repr__(self) -> str:
+        return f"SortedKeys({list(self)!r})"
+
+    def _own(self, index: int) -> List[K]:
+        chunk = self._chunks[index]
+        if id(chunk) not in self._owned:
+            chunk = self._chunks[index] = list(chunk)
+            self._owned.add(id(chunk))
+        return chunk
+
+    def _start(self, index: int) -> int:
+        return self._cumulative()[index]
+
+    def _locate(self, position: int) -> Tuple[int, int]:
+        offsets = self._cumulative()
+        index = bisect_right(offsets, position) - 1
+        return index, position - offsets[index]
+
+    def _cumulative(self) -> List[int]:
+        # Computed once per version; concurrent readers may race to store
+        # the same list, which is harmless.
+        offsets = self._offsets
+        if offsets is None:
+            offsets = self._offsets = list(accumulate((len(chunk) for chunk in self._chunks), initial=0))
+        return offsets
+
+
+def _build(entries: Dict[Any, Any]) -> Node:
+    """A trie holding ``entries``, deep enough for leaves of about half ``LEAF_SIZE``.
+
+    Entries are dealt into their leaves in one pass, then the branches above
+    them are assembled; a leaf that came out larger splits on its next write.
+    """
+    depth = 0
+    while len(entries) >> (BRANCH_BITS * depth) > LEAF_SIZE // 2 and BRANCH_BITS * depth < MAX_SHIFT:
+        depth += 1
+    if depth == 0:
+        return entries
+    leaves: List[Dict[Any, Any]] = [{} for _ in range(1 << (BRANCH_BITS * depth))]
+    mask = len(leaves) - 1
+    for key, value in entries.items():
+        leaves[hash(key) & mask][key] = value
+    return _assemble(leaves, 0, 0, depth)
+
+
+def _assemble(leaves: List[Dict[Any, Any]], prefix: int, level: int, depth: int) -> Node:
+    if level == depth:
+        return leaves[prefix] or _EMPTY
+    shift = BRANCH_BITS * level
+    return [_assemble(leaves, prefix | slot << shift, level + 1, depth) for slot in range(_WIDTH)]
+
+
+def _leaves(node: Node) -> Iterator[Dict[Any, Any]]:
+    if node.__class__ is list:
+        for child in node:
+            yield from _leaves(child)
+    else:
+        yield node
+
+
+def _found(chunk: List[Any], key: Any, position: Optional[int] = None) -> bool:
+    if position is None:
+        position = bisect_left(chunk, key)
+    return position < len(chunk) and chunk[position] == key
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from .intervals import from_epoch, to_epoch
+
+
+@dataclass
+class DiscoveredSlot:
+    slot_start: datetime
+    slot_end: datetime
+    free_count: int
+
+
+def discover_slots(
+    calendars: Sequence[Iterable[Tuple[datetime, datetime]]],
+    window_start: datetime,
+    window_end: datetime,
+    duration: timedelta,
+    limit: int,
+) -> List[DiscoveredSlot]:
+    """Find the non-overlapping slots of ``duration`` with the most people free.
+
+    ``calendars`` holds one iterable of non-overlapping free windows per
+    participant. A participant is free for ``[t, t + duration]`` exactly when
+    ``t`` lies in ``[start, end - duration]`` of one of their windows, so each
+    window becomes one closed interval of feasible start times. With the
+    interval endpoints sorted, the number of free participants at any start
+    time is two bisects. Candidates are the instants where an interval opens
+    and the back-to-back slots that follow each of them, so a long common
+    window yields up to ``limit`` slots rather than one. Bounds are compared
+    as epoch seconds, so naive and aware datetimes mix freely; slots come
+    back in the kind of ``window_start`` and ``window_end``.
+    """
+    low, high = to_epoch(window_start), to_epoch(window_end)
+    length = duration.total_seconds()
+    opens: List[float] = []
+    closes: List[float] = []
+    for windows in calendars:
+        for start, end in windows:
+            first_start = max(to_epoch(start), low)
+            last_start = min(to_epoch(end), high) - length
+            if first_start <= last_start:
+                opens.append(first_start)
+                closes.append(last_start)
+    opens.sort()
+    closes.sort()
+
+    def free_at(instant: float) -> int:
+        # The intervals are closed on both ends.
+        return bisect_right(opens, instant) - bisect_left(closes, instant)
+
+    # A chosen slot overlaps at most two back-to-back candidates, so this
+    # many per opening is always enough to fill ``limit`` slots.
+    strides = 3 * limit
+    candidates: Dict[float, int] = {}
+    for opening in dict.fromkeys(opens):
+        for step in range(strides if length > 0 else 1):
+            instant = opening + step * length
+            if instant in candidates:
+                continue
+            free = free_at(instant)
+            if not free:
+                break
+            candidates[instant] = free
+
+    naive = window_start.tzinfo is None and window_end.tzinfo is None
+    chosen: List[Tuple[float, int]] = []
+    for instant, free_count in sorted(candidates.items(), key=lambda candidate: (-candidate[1], candidate[0])):
+        if len(chosen) == limit:
+            break
+        if any(instant < start + length and start < instant + length for start, _ in chosen):
+            continue
+        chosen.append((instant, free_count))
+    return [
+        DiscoveredSlot(
+            slot_start=from_epoch(instant, naive),
+            slot_end=from_epoch(instant + length, naive),
+            free_count=free_count,
+        )
+        for instant, free_count in chosen
+    ]
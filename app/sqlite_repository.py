@@ -0,0 +1,807 @@
+from __future__ import annotations
+
+import json
+import pickle
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+from .geo import bounding_box, haversine_km
+from .intervals import IntervalIndex, to_epoch
+from .models import Availability, AvailabilityRule, CalendarEvent, Invitation, Restaurant, User, Vote
+from .pagination import PREFIX_END, Key, Page, fold_name, id_after, pair_after, scan_pages
+from .recurrence import AvailabilityCalendar, RecurringWindows
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS restaurants (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    tags TEXT NOT NULL,
+    rating REAL,
+    latitude REAL NOT NULL,
+    longitude REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS restaurants_location ON restaurants (latitude, longitude);
+CREATE INDEX IF NOT EXISTS restaurants_rating ON restaurants (rating DESC, id);
+CREATE TABLE IF NOT EXISTS restaurant_tags (
+    tag TEXT NOT NULL,
+    restaurant_id TEXT NOT NULL,
+    PRIMARY KEY (tag, restaurant_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS users (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    latitude REAL NOT NULL,
+    longitude REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS users_name ON users (lower(name), id);
+CREATE TABLE IF NOT EXISTS wishlist (
+    user_id TEXT NOT NULL,
+    restaurant_id TEXT NOT NULL,
+    PRIMARY KEY (user_id, restaurant_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS wishlist_restaurant ON wishlist (restaurant_id, user_id);
+CREATE TABLE IF NOT EXISTS visited (
+    user_id TEXT NOT NULL,
+    restaurant_id TEXT NOT NULL,
+    PRIMARY KEY (user_id, restaurant_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS availabilities (
+    user_id TEXT NOT NULL,
+    slot_start TEXT NOT NULL,
+    slot_end TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS availabilities_user ON availabilities (user_id, slot_start);
+CREATE TABLE IF NOT EXISTS availability_rules (
+    user_id TEXT NOT NULL,
+    id TEXT NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (user_id, id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS invitations (
+    id TEXT PRIMARY KEY,
+    data BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS invitation_organizers (
+    organizer_id TEXT NOT NULL,
+    invitation_id TEXT NOT NULL,
+    PRIMARY KEY (organizer_id, invitation_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS invitation_participants (
+    user_id TEXT NOT NULL,
+    invitation_id TEXT NOT NULL,
+    PRIMARY KEY (user_id, invitation_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS calendar_events (
+    invitation_id TEXT PRIMARY KEY,
+    data BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS vote_tallies (
+    invitation_id TEXT NOT NULL,
+    option_key TEXT NOT NULL,
+    votes INTEGER NOT NULL,
+    PRIMARY KEY (invitation_id, option_key)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS collection_versions (
+    collection TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS entity_versions (
+    collection TEXT NOT NULL,
+    entity_id TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    PRIMARY KEY (collection, entity_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS votes (
+    invitation_id TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    option_key TEXT NOT NULL,
+    PRIMARY KEY (invitation_id, user_id)
+) WITHOUT ROWID;
+"""
+
+# Collections whose writes bump version counters.
+VERSIONED_COLLECTIONS = ("restaurants", "users", "availabilities", "invitations")
+
+_RESTAURANT_COLUMNS = "r.id, r.name, r.tags, r.rating, r.latitude, r.longitude"
+
+TABLES = (
+    "restaurants",
+    "restaurant_tags",
+    "users",
+    "wishlist",
+    "visited",
+    "availabilities",
+    "availability_rules",
+    "invitations",
+    "invitation_organizers",
+    "invitation_participants",
+    "calendar_events",
+    "votes",
+    "vote_tallies",
+)
+
+
+class SqliteRepository:
+    """SQLite-backed store with the same interface as ``InMemoryRepository``.
+
+    Each thread gets its own connection to a WAL-mode database, so readers
+    never block the writer and several worker processes can share one file.
+    Users, restaurants and availability indexes are cached in memory, per
+    connection: a connection's cache only ever holds rows it read or wrote
+    itself, and is dropped whenever its ``PRAGMA data_version`` shows another
+    connection committed. Inside ``reading()`` that check runs within the
+    read transaction, so cached and queried rows come from one version.
+    This keeps point lookups on the scoring path close to in-memory speed.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self._connection().executescript(SCHEMA)
+        self._backfill_indexes()
+        self.version_epoch = self._epoch()
+
+    # Connections ---------------------------------------------------------
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            # Only the owning thread uses a connection; ``close`` may run elsewhere.
+            connection = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            self._local.batch_depth = 0
+            self._local.data_version = None
+            self._local.users: Dict[str, Optional[User]] = {}
+            self._local.restaurants: Dict[str, Optional[Restaurant]] = {}
+            self._local.availability_indexes: Dict[str, IntervalIndex] = {}
+            self._local.availability_rules: Dict[str, Tuple[RecurringWindows, ...]] = {}
+            with self._connections_lock:
+                self._connections.append(connection)
+        return connection
+
+    def close(self) -> None:
+        with self._connections_lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """Group every write inside the block into one transaction."""
+        connection = self._connection()
+        if self._local.batch_depth == 0:
+            connection.execute("BEGIN IMMEDIATE")
+        self._local.batch_depth += 1
+        try:
+            yield
+        except BaseException:
+            self._local.batch_depth -= 1
+            if self._local.batch_depth == 0:
+                connection.execute("ROLLBACK")
+                self._clear_cache()
+            raise
+        self._local.batch_depth -= 1
+        if self._local.batch_depth == 0:
+            connection.execute("COMMIT")
+
+    @contextmanager
+    def reading(self) -> Iterator[None]:
+        """Serve every query inside the block from one database snapshot.
+
+        The block holds a read transaction, so it must not write.
+        """
+        connection = self._connection()
+        if connection.in_transaction:
+            yield
+            return
+        connection.execute("BEGIN")
+        try:
+            # Checked inside the transaction, so the cache matches its snapshot.
+            self._read()
+            yield
+        finally:
+            connection.execute("COMMIT")
+
+    def _read(self) -> sqlite3.Connection:
+        connection = self._connection()
+        version = connection.execute("PRAGMA data_version").fetchone()[0]
+        if version != self._local.data_version:
+            # Another connection committed since this thread last looked.
+            self._local.data_version = version
+            self._clear_cache()
+        return connection
+
+    def _page(self, query: str, parameters: List[object], limit: int) -> List[Tuple]:
+        """Rows of one page plus one more, which only tells whether another page follows."""
+        return self._read().execute(query + " LIMIT ?", [*parameters, limit + 1]).fetchall()
+
+    def _clear_cache(self) -> None:
+        self._local.users.clear()
+        self._local.restaurants.clear()
+        self._local.availability_indexes.clear()
+        self._local.availability_rules.clear()
+
+    def _backfill_indexes(self) -> None:
+        """Fill index tables added after a database was created."""
+        with self.batch():
+            connection = self._connection()
+            connection.execute(
+                "INSERT OR IGNORE INTO restaurant_tags (tag, restaurant_id) "
+                "SELECT json_each.value, restaurants.id FROM restaurants, json_each(restaurants.tags) "
+                "WHERE NOT EXISTS (SELECT 1 FROM restaurant_tags)"
+            )
+            rows = connection.execute(
+                "SELECT data FROM invitations WHERE id NOT IN (SELECT invitation_id FROM invitation_organizers)"
+            ).fetchall()
+            for (data,) in rows:
+                self._index_invitation(connection, pickle.loads(data))
+            connection.execute(
+                "INSERT INTO vote_tallies (invitation_id, option_key, votes) "
+                "SELECT invitation_id, option_key, COUNT(*) FROM votes "
+                "WHERE NOT EXISTS (SELECT 1 FROM vote_tallies) GROUP BY invitation_id, option_key"
+            )
+
+    def clear(self) -> None:
+        with self.batch():
+            connection = self._connection()
+            for table in TABLES:
+                connection.execute(f"DELETE FROM {table}")
+            connection.execute("DELETE FROM entity_versions")
+            for name in VERSIONED_COLLECTIONS:
+                self._bump(connection, name)
+        self._clear_cache()
+
+    # Versions ------------------------------------------------------------
+    def collection_version(self, name: str) -> int:
+        """Bumped by every write to collection ``name``; 0 if never written."""
+        row = self._read().execute(
+            "SELECT version FROM collection_versions WHERE collection = ?", (name,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def entity_version(self, name: str, entity_id: str) -> int:
+        """Bumped by every write to ``entity_id`` in collection ``name``."""
+        row = self._read().execute(
+            "SELECT version FROM entity_versions WHERE collection = ? AND entity_id = ?", (name, entity_id)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def _bump(self, connection: sqlite3.Connection, name: str, entity_id: Optional[str] = None) -> None:
+        (version,) = connection.execute(
+            "INSERT INTO collection_versions (collection, version) VALUES (?, 1) "
+            "ON CONFLICT (collection) DO UPDATE SET version = version + 1 RETURNING version",
+            (name,),
+        ).fetchone()
+        if entity_id is not None:
+            connection.execute(
+                "INSERT INTO entity_versions (collection, entity_id, version) VALUES (?, ?, ?) "
+                "ON CONFLICT (collection, entity_id) DO UPDATE SET version = excluded.version",
+                (name, entity_id, version),
+            )
+
+    def _epoch(self) -> str:
+        """A random tag fixed when the database is created, under the empty collection name."""
+        with self.batch():
+            connection = self._connection()
+            connection.execute(
+                "INSERT OR IGNORE INTO collection_versions (collection, version) VALUES ('', random())"
+            )
+            (value,) = connection.execute("SELECT version FROM collection_versions WHERE collection = ''").fetchone()
+        return format(value & 0xFFFFFFFF, "08x")
+
+    # Restaurant CRUD -----------------------------------------------------
+    def add_restaurant(self, restaurant: Restaurant) -> None:
+        with self.batch():
+            self._connection().execute(
+                "INSERT INTO restaurants (id, name, tags, rating, latitude, longitude) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (id) DO UPDATE SET name = excluded.name, tags = excluded.tags, "
+                "rating = excluded.rating, latitude = excluded.latitude, longitude = excluded.longitude",
+                (
+                    restaurant.id,
+                    restaurant.name,
+                    json.dumps(restaurant.tags),
+                    restaurant.rating,
+                    restaurant.latitude,
+                    restaurant.longitude,
+                ),
+            )
+            connection = self._connection()
+            connection.execute("DELETE FROM restaurant_tags WHERE restaurant_id = ?", (restaurant.id,))
+            connection.executemany(
+                "INSERT OR IGNORE INTO restaurant_tags (tag, restaurant_id) VALUES (?, ?)",
+                [(tag, restaurant.id) for tag in restaurant.tags],
+            )
+            self._bump(connection, "restaurants", restaurant.id)
+        self._local.restaurants[restaurant.id] = restaurant
+
+    def get_restaurant(self, restaurant_id: str) -> Optional[Restaurant]:
+        connection = self._read()
+        if restaurant_id not in self._local.restaurants:
+            row = connection.execute(
+                "SELECT id, name, tags, rating, latitude, longitude FROM restaurants WHERE id = ?",
+                (restaurant_id,),
+            ).fetchone()
+            self._local.restaurants[restaurant_id] = _restaurant(row) if row else None
+        return self._local.restaurants[restaurant_id]
+
+    def list_restaurants(self) -> List[Restaurant]:
+        rows = self._read().execute(
+            "SELECT id, name, tags, rating, latitude, longitude FROM restaurants ORDER BY rowid"
+        )
+        return [_restaurant(row) for row in rows]
+
+    def scan_restaurants(self) -> Iterator[Restaurant]:
+        """Restaurants in insertion order, fetched a page at a time as they are consumed."""
+        return scan_pages(self.page_restaurants)
+
+    def page_restaurants(
+        self,
+        limit: int,
+        after: Optional[Key] = None,
+        tag: Optional[str] = None,
+        min_rating: Optional[float] = None,
+    ) -> Page[Restaurant]:
+        """Restaurants in insertion order, by id under a ``tag``, or by rating then id for ``min_rating`` alone."""
+        if tag is None and min_rating is not None:
+            after = pair_after(after, (int, float))
+            query = f"SELECT {_RESTAURANT_COLUMNS} FROM restaurants r WHERE r.rating >= ?"
+            parameters: List[object] = [min_rating]
+            if after is not None:
+                query += " AND (-r.rating, r.id) > (?, ?)"
+                parameters.extend(after)
+            rows = self._page(query + " ORDER BY r.rating DESC, r.id", parameters, limit)
+            restaurants = [_restaurant(row) for row in rows[:limit]]
+            last = restaurants[-1] if len(rows) > limit else None
+            return Page(restaurants, (-last.rating, last.id) if last else None)
+        if tag is None:
+            after = pair_after(after, int)
+            rows = self._page(
+                f"SELECT r.rowid, {_RESTAURANT_COLUMNS} FROM restaurants r WHERE r.rowid > ? ORDER BY r.rowid",
+                [after[0] if after else 0],
+                limit,
+            )
+            restaurants = [_restaurant(row[1:]) for row in rows[:limit]]
+            return Page(restaurants, (rows[limit - 1][0], restaurants[-1].id) if len(rows) > limit else None)
+        # With both filters the tag postings are walked and narrowed by rating.
+        query = (
+            f"SELECT {_RESTAURANT_COLUMNS} FROM restaurant_tags t JOIN restaurants r ON r.id = t.restaurant_id "
+            "WHERE t.tag = ? AND t.restaurant_id > ?"
+        )
+        parameters = [tag, id_after(after) or ""]
+        if min_rating is not None:
+            query += " AND r.rating >= ?"
+            parameters.append(min_rating)
+        rows = self._page(query + " ORDER BY r.id", parameters, limit)
+        restaurants = [_restaurant(row) for row in rows[:limit]]
+        return Page(restaurants, (restaurants[-1].id,) if len(rows) > limit else None)
+
+    def restaurants_within(
+        self,
+        latitude: float,
+        longitude: float,
+        radius_km: float,
+    ) -> List[Tuple[Restaurant, float]]:
+        """Restaurants within ``radius_km`` of a point with their distance, nearest first."""
+        lowest, highest, longitude_span = bounding_box(latitude, radius_km)
+        query = "SELECT id, name, tags, rating, latitude, longitude FROM restaurants WHERE latitude BETWEEN ? AND ?"
+        parameters: Tuple[float, ...] = (lowest, highest)
+        if longitude_span < 180:
+            west = (longitude - longitude_span + 180) % 360 - 180
+            east = (longitude + longitude_span + 180) % 360 - 180
+            if west <= east:
+                query += " AND longitude BETWEEN ? AND ?"
+            else:
+                query += " AND (longitude >= ? OR longitude <= ?)"
+            parameters += (west, east)
+        matches = []
+        for row in self._read().execute(query, parameters):
+            restaurant = _restaurant(row)
+            distance = haversine_km(latitude, longitude, restaurant.latitude, restaurant.longitude)
+            if distance <= radius_km:
+                matches.append((restaurant, distance))
+        matches.sort(key=lambda match: (match[1], match[0].id))
+        return matches
+
+    # User CRUD -----------------------------------------------------------
+    def add_user(self, user: User) -> None:
+        with self.batch():
+            connection = self._connection()
+            connection.execute(
+                "INSERT INTO users (id, name, latitude, longitude) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (id) DO UPDATE SET name = excluded.name, "
+                "latitude = excluded.latitude, longitude = excluded.longitude",
+                (user.id, user.name, user.latitude, user.longitude),
+            )
+            for table, restaurant_ids in (("wishlist", user.wishlist), ("visited", user.visited)):
+                connection.execute(f"DELETE FROM {table} WHERE user_id = ?", (user.id,))
+                connection.executemany(
+                    f"INSERT INTO {table} (user_id, restaurant_id) VALUES (?, ?)",
+                    [(user.id, restaurant_id) for restaurant_id in restaurant_ids],
+                )
+            self._bump(connection, "users", user.id)
+        self._local.users[user.id] = User(
+            id=user.id,
+            name=user.name,
+            wishlist=frozenset(user.wishlist),
+            visited=frozenset(user.visited),
+            latitude=user.latitude,
+            longitude=user.longitude,
+        )
+
+    def get_user(self, user_id: str) -> Optional[User]:
+        connection = self._read()
+        if user_id not in self._local.users:
+            row = connection.execute(
+                "SELECT id, name, latitude, longitude FROM users WHERE id = ?", (user_id,)
+            ).fetchone()
+            self._local.users[user_id] = self._user(connection, row) if row else None
+        return self._local.users[user_id]
+
+    def list_users(self) -> List[User]:
+        connection = self._read()
+        rows = connection.execute("SELECT id, name, latitude, longitude FROM users ORDER BY rowid").fetchall()
+        return [self._user(connection, row) for row in rows]
+
+    def scan_users(self) -> Iterator[User]:
+        """Users in insertion order, fetched a page at a time as they are consumed."""
+        return scan_pages(self.page_users)
+
+    def page_users(self, limit: int, after: Optional[Key] = None, name_prefix: Optional[str] = None) -> Page[User]:
+        """Users in insertion order, or by case-folded name then id under a ``name_prefix``."""
+        connection = self._read()
+        if name_prefix is None:
+            after = pair_after(after, int)
+            rows = self._page(
+                "SELECT rowid, id, name, latitude, longitude FROM users WHERE rowid > ? ORDER BY rowid",
+                [after[0] if after else 0],
+                limit,
+            )
+            users = [self._user(connection, row[1:]) for row in rows[:limit]]
+            return Page(users, (rows[limit - 1][0], users[-1].id) if len(rows) > limit else None)
+        prefix = fold_name(name_prefix)
+        query = "SELECT id, name, latitude, longitude FROM users WHERE lower(name) >= ? AND lower(name) < ?"
+        parameters: List[object] = [prefix, prefix + PREFIX_END]
+        after = pair_after(after, str)
+        if after is not None:
+            query += " AND (lower(name), id) > (?, ?)"
+            parameters.extend(after)
+        rows = self._page(query + " ORDER BY lower(name), id", parameters, limit)
+        users = [self._user(connection, row) for row in rows[:limit]]
+        return Page(users, (fold_name(users[-1].name), users[-1].id) if len(rows) > limit else None)
+
+    def get_wishers(self, restaurant_id: str) -> Set[str]:
+        """Ids of all users with ``restaurant_id`` on their wishlist."""
+        rows = self._read().execute("SELECT user_id FROM wishlist WHERE restaurant_id = ?", (restaurant_id,))
+        return {user_id for (user_id,) in rows}
+
+    def count_wishing(self, user_ids: Iterable[str], restaurant_id: str) -> int:
+        """How many of ``user_ids`` have ``restaurant_id`` on their wishlist."""
+        wishers = self.get_wishers(restaurant_id)
+        return sum(1 for user_id in user_ids if user_id in wishers)
+
+    def visited_by_any(self, user_ids: Iterable[str]) -> Set[str]:
+        """Restaurants at least one of ``user_ids`` has visited."""
+        ids = list(user_ids)
+        rows = self._read().execute(
+            f"SELECT DISTINCT restaurant_id FROM visited WHERE user_id IN ({_placeholders(ids)})", ids
+        )
+        return {restaurant_id for (restaurant_id,) in rows}
+
+    def unvisited_restaurants(self, user_ids: Iterable[str]) -> List[str]:
+        """Catalog restaurants that none of ``user_ids`` has visited."""
+        ids = list(user_ids)
+        rows = self._read().execute(
+            "SELECT id FROM restaurants WHERE id NOT IN "
+            f"(SELECT restaurant_id FROM visited WHERE user_id IN ({_placeholders(ids)})) ORDER BY rowid",
+            ids,
+        )
+        return [restaurant_id for (restaurant_id,) in rows]
+
+    def _user(self, connection: sqlite3.Connection, row: Tuple) -> User:
+        user_id, name, latitude, longitude = row
+        return User(
+            id=user_id,
+            name=name,
+            wishlist=frozenset(
+                restaurant_id
+                for (restaurant_id,) in connection.execute(
+                    "SELECT restaurant_id FROM wishlist WHERE user_id = ?", (user_id,)
+                )
+            ),
+            visited=frozenset(
+                restaurant_id
+                for (restaurant_id,) in connection.execute(
+                    "SELECT restaurant_id FROM visited WHERE user_id = ?", (user_id,)
+                )
+            ),
+            latitude=latitude,
+            longitude=longitude,
+        )
+
+    # Availability --------------------------------------------------------
+    def set_availabilities(self, user_id: str, availabilities: Iterable[Availability]) -> None:
+        index = IntervalIndex(
+            (availability.slot_start, availability.slot_end) for availability in availabilities
+        )
+        with self.batch():
+            connection = self._connection()
+            connection.execute("DELETE FROM availabilities WHERE user_id = ?", (user_id,))
+            connection.executemany(
+                "INSERT INTO availabilities (user_id, slot_start, slot_end) VALUES (?, ?, ?)",
+                [(user_id, start.isoformat(), end.isoformat()) for start, end in index],
+            )
+            self._bump(connection, "availabilities", user_id)
+        self._local.availability_indexes[user_id] = index
+
+    def update_availability(
+        self,
+        user_id: str,
+        add: Sequence[Tuple[datetime, datetime]] = (),
+        remove: Sequence[Tuple[datetime, datetime]] = (),
+    ) -> IntervalIndex:
+        """Merge ``add`` into and then cut ``remove`` out of ``user_id``'s windows, atomically.
+
+        Only rows for windows that changed are deleted or inserted, and
+        repeating the same update leaves the same rows.
+        """
+        with self.batch():
+            connection = self._connection()
+            before = self.get_availability_index(user_id)
+            index = before
+            for start, end in add:
+                index = index.with_window(start, end)
+            for start, end in remove:
+                index = index.without_window(start, end)
+            old, new = set(before), set(index)
+            connection.executemany(
+                "DELETE FROM availabilities WHERE user_id = ? AND slot_start = ? AND slot_end = ?",
+                [(user_id, start.isoformat(), end.isoformat()) for start, end in old - new],
+            )
+            connection.executemany(
+                "INSERT INTO availabilities (user_id, slot_start, slot_end) VALUES (?, ?, ?)",
+                [(user_id, start.isoformat(), end.isoformat()) for start, end in new - old],
+            )
+            self._bump(connection, "availabilities", user_id)
+        self._local.availability_indexes[user_id] = index
+        return index
+
+    def get_availabilities(self, user_id: str) -> List[Availability]:
+        return [
+            Availability(user_id=user_id, slot_start=start, slot_end=end)
+            for start, end in self.get_availability_index(user_id)
+        ]
+
+    def get_availability_index(self, user_id: str) -> IntervalIndex:
+        connection = self._read()
+        index = self._local.availability_indexes.get(user_id)
+        if index is None:
+            rows = connection.execute(
+                "SELECT slot_start, slot_end FROM availabilities WHERE user_id = ?", (user_id,)
+            )
+            index = IntervalIndex(
+                (datetime.fromisoformat(start), datetime.fromisoformat(end)) for start, end in rows
+            )
+            self._local.availability_indexes[user_id] = index
+        return index
+
+    def set_availability_rule(self, rule: AvailabilityRule) -> None:
+        """Add ``rule`` to its user's recurring availability, replacing one with the same id."""
+        with self.batch():
+            connection = self._connection()
+            connection.execute(
+                "INSERT INTO availability_rules (user_id, id, data) VALUES (?, ?, ?) "
+                "ON CONFLICT (user_id, id) DO UPDATE SET data = excluded.data",
+                (rule.user_id, rule.id, pickle.dumps(rule)),
+            )
+            self._bump(connection, "availabilities", rule.user_id)
+        self._local.availability_rules.pop(rule.user_id, None)
+
+    def delete_availability_rule(self, user_id: str, rule_id: str) -> bool:
+        with self.batch():
+            connection = self._connection()
+            deleted = connection.execute(
+                "DELETE FROM availability_rules WHERE user_id = ? AND id = ?", (user_id, rule_id)
+            ).rowcount
+            if deleted:
+                self._bump(connection, "availabilities", user_id)
+        self._local.availability_rules.pop(user_id, None)
+        return bool(deleted)
+
+    def get_availability_rules(self, user_id: str) -> List[AvailabilityRule]:
+        return [compiled.rule for compiled in self._compiled_rules(user_id)]
+
+    def get_availability_calendar(self, user_id: str) -> AvailabilityCalendar:
+        """One-off windows and recurring rules of ``user_id``."""
+        with self.reading():
+            return AvailabilityCalendar(self.get_availability_index(user_id), self._compiled_rules(user_id))
+
+    def _compiled_rules(self, user_id: str) -> Tuple[RecurringWindows, ...]:
+        connection = self._read()
+        rules = self._local.availability_rules.get(user_id)
+        if rules is None:
+            rows = connection.execute("SELECT data FROM availability_rules WHERE user_id = ? ORDER BY id", (user_id,))
+            rules = tuple(RecurringWindows(pickle.loads(data)) for (data,) in rows)
+            self._local.availability_rules[user_id] = rules
+        return rules
+
+    def who_is_free(
+        self,
+        user_ids: Sequence[str],
+        slots: Sequence[Tuple[datetime, datetime]],
+    ) -> List[List[bool]]:
+        """For each user, whether they are free for each of ``slots``.
+
+        Recurring rules are checked per slot, never expanded into windows.
+        """
+        bounds = [(to_epoch(start), to_epoch(end)) for start, end in slots]
+        rows: List[List[bool]] = []
+        for user_id in user_ids:
+            index = self.get_availability_index(user_id)
+            rules = self._compiled_rules(user_id)
+            free = AvailabilityCalendar(index, rules).covers_epoch if rules else index.covers_epoch
+            rows.append([free(start, end) for start, end in bounds])
+        return rows
+
+    # Invitation ----------------------------------------------------------
+    def add_invitation(self, invitation: Invitation) -> None:
+        with self.batch():
+            self._connection().execute(
+                "INSERT INTO invitations (id, data) VALUES (?, ?) ON CONFLICT (id) DO UPDATE SET data = excluded.data",
+                (invitation.id, pickle.dumps(invitation)),
+            )
+            self._index_invitation(self._connection(), invitation)
+            self._bump(self._connection(), "invitations", invitation.id)
+
+    def _index_invitation(self, connection: sqlite3.Connection, invitation: Invitation) -> None:
+        for table in ("invitation_organizers", "invitation_participants"):
+            connection.execute(f"DELETE FROM {table} WHERE invitation_id = ?", (invitation.id,))
+        connection.execute(
+            "INSERT INTO invitation_organizers (organizer_id, invitation_id) VALUES (?, ?)",
+            (invitation.organizer_id, invitation.id),
+        )
+        connection.executemany(
+            "INSERT OR IGNORE INTO invitation_participants (user_id, invitation_id) VALUES (?, ?)",
+            [(user_id, invitation.id) for user_id in invitation.participant_ids],
+        )
+
+    def get_invitation(self, invitation_id: str) -> Optional[Invitation]:
+        row = self._read().execute("SELECT data FROM invitations WHERE id = ?", (invitation_id,)).fetchone()
+        return pickle.loads(row[0]) if row else None
+
+    def list_invitations(self) -> List[Invitation]:
+        rows = self._read().execute("SELECT data FROM invitations ORDER BY rowid")
+        return [pickle.loads(data) for (data,) in rows]
+
+    def scan_invitations(self) -> Iterator[Invitation]:
+        """Invitations in insertion order, fetched a page at a time as they are consumed."""
+        return scan_pages(self.page_invitations)
+
+    def page_invitations(
+        self,
+        limit: int,
+        after: Optional[Key] = None,
+        organizer_id: Optional[str] = None,
+        participant_id: Optional[str] = None,
+    ) -> Page[Invitation]:
+        """Invitations in insertion order, or by id among those of an organizer or participant."""
+        if organizer_id is None and participant_id is None:
+            after = pair_after(after, int)
+            rows = self._page(
+                "SELECT rowid, id, data FROM invitations WHERE rowid > ? ORDER BY rowid",
+                [after[0] if after else 0],
+                limit,
+            )
+            invitations = [pickle.loads(data) for _, _, data in rows[:limit]]
+            return Page(invitations, tuple(rows[limit - 1][:2]) if len(rows) > limit else None)
+        parameters: List[object] = []
+        if organizer_id is not None:
+            query = (
+                "SELECT i.id, i.data FROM invitation_organizers o JOIN invitations i ON i.id = o.invitation_id "
+                "WHERE o.organizer_id = ? AND o.invitation_id > ?"
+            )
+            parameters.append(organizer_id)
+        elif participant_id is not None:
+            query = (
+                "SELECT i.id, i.data FROM invitation_participants p JOIN invitations i ON i.id = p.invitation_id "
+                "WHERE p.user_id = ? AND p.invitation_id > ?"
+            )
+            parameters.append(participant_id)
+        parameters.append(id_after(after) or "")
+        if organizer_id is not None and participant_id is not None:
+            # With both filters the organizer postings are narrowed by participant.
+            query += (
+                " AND EXISTS (SELECT 1 FROM invitation_participants p "
+                "WHERE p.user_id = ? AND p.invitation_id = i.id)"
+            )
+            parameters.append(participant_id)
+        rows = self._page(query + " ORDER BY i.id", parameters, limit)
+        invitations = [pickle.loads(data) for _, data in rows[:limit]]
+        return Page(invitations, (rows[limit - 1][0],) if len(rows) > limit else None)
+
+    def save_calendar_event(self, event: CalendarEvent) -> None:
+        with self.batch():
+            self._connection().execute(
+                "INSERT INTO calendar_events (invitation_id, data) VALUES (?, ?) "
+                "ON CONFLICT (invitation_id) DO UPDATE SET data = excluded.data",
+                (event.invitation_id, pickle.dumps(event)),
+            )
+
+    def get_calendar_event(self, invitation_id: str) -> Optional[CalendarEvent]:
+        row = self._read().execute(
+            "SELECT data FROM calendar_events WHERE invitation_id = ?", (invitation_id,)
+        ).fetchone()
+        return pickle.loads(row[0]) if row else None
+
+    # Voting --------------------------------------------------------------
+    def record_vote(self, vote: Vote) -> Dict[str, int]:
+        """Store ``vote`` and return the invitation's tally with it counted."""
+        with self.batch():
+            connection = self._connection()
+            previous = connection.execute(
+                "SELECT option_key FROM votes WHERE invitation_id = ? AND user_id = ?",
+                (vote.invitation_id, vote.user_id),
+            ).fetchone()
+            if previous is not None and previous[0] == vote.option_key:
+                return self._tally(connection, vote.invitation_id)
+            connection.execute(
+                "INSERT INTO votes (invitation_id, user_id, option_key) VALUES (?, ?, ?) "
+                "ON CONFLICT (invitation_id, user_id) DO UPDATE SET option_key = excluded.option_key",
+                (vote.invitation_id, vote.user_id, vote.option_key),
+            )
+            if previous is not None:
+                connection.execute(
+                    "UPDATE vote_tallies SET votes = votes - 1 WHERE invitation_id = ? AND option_key = ?",
+                    (vote.invitation_id, previous[0]),
+                )
+                connection.execute(
+                    "DELETE FROM vote_tallies WHERE invitation_id = ? AND option_key = ? AND votes = 0",
+                    (vote.invitation_id, previous[0]),
+                )
+            connection.execute(
+                "INSERT INTO vote_tallies (invitation_id, option_key, votes) VALUES (?, ?, 1) "
+                "ON CONFLICT (invitation_id, option_key) DO UPDATE SET votes = votes + 1",
+                (vote.invitation_id, vote.option_key),
+            )
+            return self._tally(connection, vote.invitation_id)
+
+    def get_votes(self, invitation_id: str) -> Dict[str, Vote]:
+        rows = self._read().execute(
+            "SELECT user_id, option_key FROM votes WHERE invitation_id = ?", (invitation_id,)
+        )
+        return {
+            user_id: Vote(invitation_id=invitation_id, user_id=user_id, option_key=option_key)
+            for user_id, option_key in rows
+        }
+
+    def get_tally(self, invitation_id: str) -> Dict[str, int]:
+        """Votes per option key, kept up to date by ``record_vote``."""
+        return self._tally(self._read(), invitation_id)
+
+    def _tally(self, connection: sqlite3.Connection, invitation_id: str) -> Dict[str, int]:
+        rows = connection.execute(
+            "SELECT option_key, votes FROM vote_tallies WHERE invitation_id = ?", (invitation_id,)
+        )
+        return dict(rows)
+
+
+def _restaurant(row: Tuple) -> Restaurant:
+    restaurant_id, name, tags, rating, latitude, longitude = row
+    return Restaurant(
+        id=restaurant_id,
+        name=name,
+        tags=json.loads(tags),
+        rating=rating,
+        latitude=latitude,
+        longitude=longitude,
+    )
+
+
+def _placeholders(values: Sequence[object]) -> str:
+    return ", ".join("?" for _ in values)
@@ -0,0 +1 @@
+"""Benchmarks for TogetherDine hot paths."""
@@ -0,0 +1,65 @@
+"""Time to turn a multi-megabyte calendar upload into free windows.
+
+Run with ``python -m benchmarks.bench_ics`` from the repository root.
+"""
+from __future__ import annotations
+
+import time
+from datetime import datetime, timedelta
+
+from app.ical import FreeBusyParser
+
+EVENTS = 20_000
+RECURRING = 500
+CHUNK = 64 * 1024
+ROUNDS = 3
+BASE = datetime(2022, 1, 3, 9)
+HORIZON = (datetime(2024, 1, 1), datetime(2024, 4, 1))
+
+
+def build() -> str:
+    lines = ["BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//bench//EN"]
+    for number in range(EVENTS):
+        start = BASE + timedelta(hours=number * 3 % (24 * 900))
+        lines += [
+            "BEGIN:VEVENT",
+            f"UID:event-{number}@example.com",
+            f"DTSTART;TZID=Europe/Berlin:{start:%Y%m%dT%H%M%S}",
+            f"DTEND;TZID=Europe/Berlin:{start + timedelta(minutes=45):%Y%m%dT%H%M%S}",
+            f"SUMMARY:Meeting {number} about a fairly long and descriptive topic that gets",
+            " folded onto a second line as calendar exports do",
+            "DESCRIPTION:" + "Agenda item. " * 20,
+            "END:VEVENT",
+        ]
+    for number in range(RECURRING):
+        start = BASE + timedelta(days=number % 7, hours=number % 8)
+        lines += [
+            "BEGIN:VEVENT",
+            f"UID:series-{number}@example.com",
+            f"DTSTART:{start:%Y%m%dT%H%M%S}Z",
+            "DURATION:PT30M",
+            "RRULE:FREQ=WEEKLY;BYDAY=MO,WE,FR" if number % 2 else "RRULE:FREQ=DAILY;INTERVAL=2",
+            "END:VEVENT",
+        ]
+    lines.append("END:VCALENDAR")
+    return "\r\n".join(lines) + "\r\n"
+
+
+def main() -> None:
+    text = build()
+    best = float("inf")
+    for _ in range(ROUNDS):
+        started = time.perf_counter()
+        parser = FreeBusyParser(*HORIZON)
+        for offset in range(0, len(text), CHUNK):
+            parser.feed(text[offset : offset + CHUNK])
+        parser.close()
+        free = parser.free_windows(timedelta(minutes=30))
+        best = min(best, time.perf_counter() - started)
+    print(f"{len(text) / 1e6:.1f} MB, {EVENTS:,} events and {RECURRING} recurring series")
+    print(f"{len(parser.busy):,} busy blocks in the horizon, {len(free):,} free windows")
+    print(f"parse and invert: {best * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Memory footprint of 1M availability windows, before and after packing.
+
+Run with ``python -m benchmarks.bench_memory`` from the repository root.
+"""
+from __future__ import annotations
+
+import gc
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List
+
+from app.intervals import IntervalIndex
+from app.models import Availability
+
+USERS = 10_000
+WINDOWS_PER_USER = 100
+BASE = datetime(2024, 1, 1)
+
+
+@dataclass
+class DictAvailability:
+    """The previous model: a plain dataclass with a per-instance ``__dict__``."""
+
+    user_id: str
+    slot_start: datetime
+    slot_end: datetime
+
+
+def windows(user: int) -> List[tuple]:
+    # Every other two-hour block, so the windows do not merge.
+    return [
+        (BASE + timedelta(hours=4 * index + user % 3), BASE + timedelta(hours=4 * index + user % 3 + 2))
+        for index in range(WINDOWS_PER_USER)
+    ]
+
+
+def build_lists(model: type) -> Dict[str, list]:
+    # Each window gets its own id string, like ids decoded from JSON payloads.
+    return {
+        f"user-{user}": [model(f"user-{user}", start, end) for start, end in windows(user)]
+        for user in range(USERS)
+    }
+
+
+def build_indexes() -> Dict[str, IntervalIndex]:
+    return {f"user-{user}": IntervalIndex(windows(user)) for user in range(USERS)}
+
+
+def measure(label: str, build: Callable[[], object]) -> int:
+    gc.collect()
+    tracemalloc.start()
+    data = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del data
+    print(f"{label:<38} {size / 2**20:8.1f} MiB  {size / (USERS * WINDOWS_PER_USER):6.1f} B/window")
+    return size
+
+
+def main() -> None:
+    print(f"{USERS * WINDOWS_PER_USER:,} availability windows across {USERS:,} users")
+    before = measure("list[Availability] (dict dataclass)", lambda: build_lists(DictAvailability))
+    measure("list[Availability] (slotted dataclass)", lambda: build_lists(Availability))
+    after = measure("IntervalIndex (packed epoch arrays)", build_indexes)
+    print(f"reduction: {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""Cost of one unbatched write as the in-memory repository grows.
+
+Every write outside ``batch()`` publishes a new snapshot, so its cost is the
+cost of copying what it touched. Run with ``python -m benchmarks.bench_publish``
+from the repository root.
+"""
+from __future__ import annotations
+
+import time
+from datetime import datetime, timedelta
+
+from app.models import Availability, User
+from app.repository import InMemoryRepository
+
+SIZES = (10_000, 100_000, 300_000)
+WRITES = 500
+BASE = datetime(2024, 5, 1, 18)
+
+
+def populate(store: InMemoryRepository, users: int) -> None:
+    with store.batch():
+        for number in range(users):
+            store.add_user(User(id=f"user-{number:07d}", name=f"User {number}", wishlist={"sushi"}))
+            store.update_availability(f"user-{number:07d}", add=[(BASE, BASE + timedelta(hours=2))])
+
+
+def per_write(write) -> float:
+    started = time.perf_counter()
+    for number in range(WRITES):
+        write(number)
+    return (time.perf_counter() - started) / WRITES * 1e6
+
+
+def main() -> None:
+    print(f"{'users':>8}  {'add_user':>10}  {'set_availabilities':>18}")
+    for users in SIZES:
+        store = InMemoryRepository()
+        populate(store, users)
+        add = per_write(lambda number: store.add_user(User(id=f"new-{number}", name="New", wishlist={"ramen"})))
+        window = [Availability(user_id="", slot_start=BASE, slot_end=BASE + timedelta(hours=1))]
+        update = per_write(lambda number: store.set_availabilities(f"user-{number * 7:07d}", window))
+        print(f"{users:>8,}  {add:>8.1f}µs  {update:>16.1f}µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Time to encode a page of invitations: read models vs. the direct encoder.
+
+Run with ``python -m benchmarks.bench_serialization`` from the repository root.
+"""
+from __future__ import annotations
+
+import json
+import time
+from datetime import datetime, timedelta
+from typing import Callable, List
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import parse_obj_as
+
+from app.encoding import EncodedCache, encode_array, encode_invitation
+from app.main import serialize_invitation
+from app.models import Invitation, InvitationOption
+from app.schemas import InvitationRead
+
+INVITATIONS = 1_000
+OPTIONS = 5
+PARTICIPANTS = 8
+ROUNDS = 5
+BASE = datetime(2024, 5, 3, 18)
+
+
+def build() -> List[Invitation]:
+    participants = [f"user-{index}" for index in range(PARTICIPANTS)]
+    invitations = []
+    for number in range(INVITATIONS):
+        options = [
+            InvitationOption(
+                restaurant_id=f"restaurant-{index}",
+                slot_start=BASE + timedelta(days=index),
+                slot_end=BASE + timedelta(days=index, hours=2),
+                participants=participants,
+                intersection_ratio=0.5,
+                availability_ratio=0.875,
+                convenience_score=0.123456789,
+                total_score=1.498456789,
+            )
+            for index in range(OPTIONS)
+        ]
+        invitations.append(
+            Invitation(
+                id=f"inv-{number}",
+                organizer_id=participants[0],
+                participant_ids=participants,
+                candidate_restaurant_ids=[option.restaurant_id for option in options],
+                candidate_slots=[(option.slot_start, option.slot_end) for option in options],
+                top_options=options,
+            )
+        )
+    return invitations
+
+
+def read_models(invitations: List[Invitation]) -> bytes:
+    # What a ``response_model=List[InvitationRead]`` endpoint did: build the
+    # models, validate them again and encode the result.
+    models = parse_obj_as(List[InvitationRead], [serialize_invitation(invitation) for invitation in invitations])
+    return json.dumps(jsonable_encoder(models), separators=(",", ":")).encode()
+
+
+def direct(invitations: List[Invitation]) -> bytes:
+    return encode_array(encode_invitation(invitation) for invitation in invitations)
+
+
+def measure(label: str, encode: Callable[[List[Invitation]], bytes], invitations: List[Invitation]) -> float:
+    best = float("inf")
+    for _ in range(ROUNDS):
+        started = time.perf_counter()
+        encode(invitations)
+        best = min(best, time.perf_counter() - started)
+    print(f"{label:<28} {best * 1000:8.1f} ms  {best / len(invitations) * 1e6:7.1f} µs/invitation")
+    return best
+
+
+def main() -> None:
+    invitations = build()
+    assert json.loads(read_models(invitations)) == json.loads(direct(invitations))
+    print(f"{INVITATIONS:,} invitations, {OPTIONS} options and {PARTICIPANTS} participants each")
+    before = measure("read models + validation", read_models, invitations)
+    after = measure("direct encoder", direct, invitations)
+    cache = EncodedCache(INVITATIONS)
+    cached = measure(
+        "direct encoder, cached",
+        lambda items: encode_array(cache.encode(invitation, encode_invitation) for invitation in items),
+        invitations,
+    )
+    print(f"speedup: {before / after:.1f}x uncached, {before / cached:.1f}x cached")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,450 @@
+import json
+from datetime import datetime
+
+from fastapi.testclient import TestClient
+
+from app.main import DEFAULT_PAGE_SIZE, app
+from app.pagination import encode_cursor
+from app.repository import repository
+
+client = TestClient(app)
+
+
+def setup_function() -> None:
+    repository.clear()
+
+
+def create_user(user_id: str) -> None:
+    response = client.post("/users", json={"id": user_id, "name": user_id, "wishlist": ["sushi"]})
+    assert response.status_code == 200
+
+
+def test_invitation_availability_reports_blocking_users() -> None:
+    create_user("alice")
+    create_user("bob")
+    client.post("/restaurants", json={"id": "sushi", "name": "Sushi", "latitude": 0.0, "longitude": 0.0})
+    client.put(
+        "/users/alice/availabilities",
+        json=[{"slot_start": "2024-05-03T18:00:00", "slot_end": "2024-05-03T22:00:00"}],
+    )
+    client.put(
+        "/users/bob/availabilities",
+        json=[{"slot_start": "2024-05-04T11:00:00", "slot_end": "2024-05-04T14:00:00"}],
+    )
+    client.post(
+        "/invitations",
+        json={
+            "id": "inv-1",
+            "organizer_id": "alice",
+            "participant_ids": ["alice", "bob"],
+            "candidate_restaurant_ids": ["sushi"],
+            "candidate_slots": [
+                ["2024-05-03T19:00:00", "2024-05-03T21:00:00"],
+                ["2024-05-04T12:00:00", "2024-05-04T13:00:00"],
+            ],
+        },
+    )
+
+    response = client.get("/invitations/inv-1/availability")
+
+    assert response.status_code == 200
+    body = response.json()
+    assert [datetime.fromisoformat(item["slot_start"]).day for item in body] == [3, 4]
+    assert body[0]["available_user_ids"] == ["alice"]
+    assert body[0]["blocked_user_ids"] == ["bob"]
+    assert body[1]["blocked_user_ids"] == ["alice"]
+    assert body[1]["availability_ratio"] == 0.5
+
+
+def test_invitation_availability_unknown_invitation() -> None:
+    assert client.get("/invitations/missing/availability").status_code == 404
+
+
+def test_create_invitation_recommends_group_wishlist_overlap() -> None:
+    for restaurant_id in ("sushi", "ramen", "tacos", "pho"):
+        client.post(
+            "/restaurants",
+            json={"id": restaurant_id, "name": restaurant_id, "latitude": 0.0, "longitude": 0.0},
+        )
+    client.post("/users", json={"id": "alice", "name": "alice", "wishlist": ["ramen", "tacos", "gone"]})
+    client.post("/users", json={"id": "bob", "name": "bob", "wishlist": ["ramen", "pho"]})
+    client.post("/users", json={"id": "carol", "name": "carol", "wishlist": ["pho"]})
+    client.post("/users", json={"id": "dave", "name": "dave", "wishlist": ["sushi"]})
+
+    response = client.post(
+        "/invitations",
+        json={
+            "id": "inv-rec",
+            "organizer_id": "alice",
+            "participant_ids": ["alice", "bob"],
+            "candidate_slots": [["2024-05-03T19:00:00", "2024-05-03T21:00:00"]],
+            "recommend_top_n": 2,
+        },
+    )
+
+    assert response.status_code == 200
+    assert response.json()["candidate_restaurant_ids"] == ["ramen", "pho"]
+
+
+def test_create_invitation_requires_a_candidate_source() -> None:
+    response = client.post(
+        "/invitations",
+        json={
+            "id": "inv-empty",
+            "organizer_id": "alice",
+            "participant_ids": ["alice"],
+            "candidate_slots": [["2024-05-03T19:00:00", "2024-05-03T21:00:00"]],
+        },
+    )
+
+    assert response.status_code == 422
+
+
+def test_create_invitation_discovers_slots_from_availability() -> None:
+    create_user("alice")
+    create_user("bob")
+    client.post("/restaurants", json={"id": "sushi", "name": "Sushi", "latitude": 0.0, "longitude": 0.0})
+    client.put(
+        "/users/alice/availabilities",
+        json=[{"slot_start": "2024-05-03T18:00:00", "slot_end": "2024-05-03T22:00:00"}],
+    )
+    client.put(
+        "/users/bob/availabilities",
+        json=[{"slot_start": "2024-05-03T19:30:00", "slot_end": "2024-05-03T23:00:00"}],
+    )
+
+    response = client.post(
+        "/invitations",
+        json={
+            "id": "inv-discover",
+            "organizer_id": "alice",
+            "participant_ids": ["alice", "bob"],
+            "candidate_restaurant_ids": ["sushi"],
+            "slot_search": {
+                "window_start": "2024-05-03T00:00:00",
+                "window_end": "2024-05-04T00:00:00",
+                "duration_minutes": 120,
+                "max_slots": 1,
+            },
+        },
+    )
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["candidate_slots"] == [["2024-05-03T19:30:00", "2024-05-03T21:30:00"]]
+    assert body["top_options"][0]["participants"] == ["alice", "bob"]
+
+
+def test_background_invitation_streams_progress_until_done() -> None:
+    create_user("alice")
+    client.post("/restaurants", json={"id": "sushi", "name": "Sushi", "latitude": 0.0, "longitude": 0.0})
+
+    response = client.post(
+        "/invitations",
+        json={
+            "id": "inv-bg",
+            "organizer_id": "alice",
+            "participant_ids": ["alice"],
+            "candidate_restaurant_ids": ["sushi"],
+            "candidate_slots": [["2024-05-03T19:00:00", "2024-05-03T21:00:00"]],
+            "background": True,
+        },
+    )
+
+    assert response.status_code == 202
+    assert response.json()["progress_url"] == "/invitations/inv-bg/progress"
+    lines = [json.loads(line) for line in client.get("/invitations/inv-bg/progress").iter_lines() if line]
+    assert lines[-1]["status"] == "done"
+    assert lines[-1]["top_options"][0]["restaurant_id"] == "sushi"
+    assert client.get("/invitations").json()[0]["id"] == "inv-bg"
+
+
+def test_background_invitation_reports_failure() -> None:
+    response = client.post(
+        "/invitations",
+        json={
+            "id": "inv-bad",
+            "organizer_id": "ghost",
+            "participant_ids": ["ghost"],
+            "candidate_restaurant_ids": ["sushi"],
+            "candidate_slots": [["2024-05-03T19:00:00", "2024-05-03T21:00:00"]],
+            "background": True,
+        },
+    )
+
+    assert response.status_code == 202
+    lines = [json.loads(line) for line in client.get("/invitations/inv-bad/progress").iter_lines() if line]
+    assert lines[-1]["status"] == "failed"
+    assert lines[-1]["error"] == "User ghost not found"
+
+
+def test_batch_creates_invitations_and_reports_item_errors() -> None:
+    create_user("alice")
+    create_user("bob")
+    for restaurant_id in ("sushi", "ramen"):
+        client.post("/restaurants", json={"id": restaurant_id, "name": restaurant_id, "latitude": 0.0, "longitude": 0.0})
+    client.put(
+        "/users/alice/availabilities",
+        json=[{"slot_start": "2024-05-03T18:00:00", "slot_end": "2024-05-03T22:00:00"}],
+    )
+
+    def item(invitation_id: str, participant_ids: list) -> dict:
+        return {
+            "id": invitation_id,
+            "organizer_id": participant_ids[0],
+            "participant_ids": participant_ids,
+            "candidate_restaurant_ids": ["sushi", "ramen"],
+            "candidate_slots": [
+                ["2024-05-03T19:00:00", "2024-05-03T21:00:00"],
+                ["2024-05-04T12:00:00", "2024-05-04T13:00:00"],
+            ],
+        }
+
+    response = client.post(
+        "/invitations:batch",
+        json={"invitations": [item("inv-a", ["alice", "bob"]), item("inv-b", ["ghost"]), item("inv-c", ["bob"])]},
+    )
+
+    assert response.status_code == 200
+    body = response.json()
+    assert [result["id"] for result in body] == ["inv-a", "inv-b", "inv-c"]
+    assert body[1] == {"index": 1, "id": "inv-b", "invitation": None, "error": "User ghost not found"}
+    single = client.post("/invitations", json=item("inv-single", ["alice", "bob"])).json()
+    assert body[0]["invitation"]["top_options"] == single["top_options"]
+    assert body[2]["invitation"]["top_options"][0]["participants"] == []
+    assert {invitation["id"] for invitation in client.get("/invitations").json()} == {"inv-a", "inv-c", "inv-single"}
+
+
+def test_list_endpoints_page_with_cursor_header() -> None:
+    for user_id in ("carol", "alice", "bob"):
+        create_user(user_id)
+
+    first = client.get("/users", params={"limit": 2})
+    assert [user["id"] for user in first.json()] == ["carol", "alice"]
+    second = client.get("/users", params={"limit": 2, "cursor": first.headers["X-Next-Cursor"]})
+    assert [user["id"] for user in second.json()] == ["bob"]
+    assert "X-Next-Cursor" not in second.headers
+    assert client.get("/users", params={"cursor": encode_cursor(("alice",))}).status_code == 400
+
+    assert client.get("/users", params={"cursor": "not-a-cursor"}).status_code == 400
+    assert client.get("/users", params={"limit": 0}).status_code == 422
+
+
+def test_list_endpoints_return_everything_without_limit_or_cursor() -> None:
+    for number in range(DEFAULT_PAGE_SIZE + 5):
+        create_user(f"user-{number:03d}")
+
+    response = client.get("/users")
+
+    assert len(response.json()) == DEFAULT_PAGE_SIZE + 5
+    assert "X-Next-Cursor" not in response.headers
+    assert len(client.get("/users", params={"limit": 10}).json()) == 10
+
+
+def test_export_streams_one_json_document_per_line() -> None:
+    for user_id in ("bob", "alice"):
+        create_user(user_id)
+    client.post("/restaurants", json={"id": "sushi", "name": "Sushi", "latitude": 0.0, "longitude": 0.0})
+
+    response = client.get("/export/users")
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert [json.loads(line)["id"] for line in response.text.splitlines()] == ["bob", "alice"]
+    assert json.loads(client.get("/export/restaurants").text)["name"] == "Sushi"
+    assert client.get("/export/invitations").text == ""
+
+
+def test_unchanged_lists_answer_conditional_gets_with_304() -> None:
+    create_user("alice")
+    first = client.get("/users")
+    etag = first.headers["ETag"]
+
+    assert client.get("/users", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get("/users", headers={"If-None-Match": f'"other", W/{etag}'}).status_code == 304
+    assert client.get("/restaurants", headers={"If-None-Match": etag}).status_code == 200
+
+    create_user("bob")
+    changed = client.get("/users", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+
+
+def test_list_etags_differ_per_page_and_filter() -> None:
+    for user_id in ("alice", "bob", "carol"):
+        create_user(user_id)
+    first = client.get("/users", params={"limit": 1})
+    etag = first.headers["ETag"]
+
+    assert client.get("/users", params={"limit": 1}, headers={"If-None-Match": etag}).status_code == 304
+    for params in (
+        {},
+        {"limit": 2},
+        {"limit": 1, "cursor": first.headers["X-Next-Cursor"]},
+        {"limit": 1, "name_prefix": "a"},
+    ):
+        response = client.get("/users", params=params, headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+
+    cached = {"If-None-Match": client.get("/users/alice/availabilities").headers["ETag"]}
+    assert client.get("/users/alice/availabilities", headers=cached).status_code == 304
+    client.put(
+        "/users/alice/availabilities",
+        json=[{"slot_start": "2024-05-03T18:00:00", "slot_end": "2024-05-03T22:00:00"}],
+    )
+    assert client.get("/users/alice/availabilities", headers=cached).status_code == 200
+
+
+def test_votes_are_limited_to_participants_and_listed_options() -> None:
+    create_user("alice")
+    create_user("bob")
+    client.post("/restaurants", json={"id": "sushi", "name": "Sushi", "latitude": 0.0, "longitude": 0.0})
+    client.post(
+        "/invitations",
+        json={
+            "id": "inv-vote",
+            "organizer_id": "alice",
+            "participant_ids": ["alice"],
+            "candidate_restaurant_ids": ["sushi"],
+            "candidate_slots": [["2024-05-03T19:00:00", "2024-05-03T21:00:00"]],
+        },
+    )
+
+    vote = client.post("/invitations/inv-vote/votes", json={"user_id": "alice", "option_index": 0})
+    assert vote.json() == {"user_id": "alice", "option_index": 0}
+    assert client.post("/invitations/inv-vote/votes", json={"user_id": "bob", "option_index": 0}).status_code == 400
+    assert client.post("/invitations/inv-vote/votes", json={"user_id": "alice", "option_index": 5}).status_code == 400
+    assert client.get("/invitations/missing/events").status_code == 404
+
+
+def test_patch_adds_and_removes_availability_windows() -> None:
+    create_user("alice")
+    patch = {
+        "add": [
+            {"slot_start": "2024-05-03T18:00:00", "slot_end": "2024-05-03T20:00:00"},
+            {"slot_start": "2024-05-03T20:00:00", "slot_end": "2024-05-03T22:00:00"},
+        ],
+        "remove": [{"slot_start": "2024-05-03T19:00:00", "slot_end": "2024-05-03T19:30:00"}],
+    }
+    # Windows that only touch are kept apart, like separate availabilities.
+    expected = [
+        {"slot_start": "2024-05-03T18:00:00", "slot_end": "2024-05-03T19:00:00"},
+        {"slot_start": "2024-05-03T19:30:00", "slot_end": "2024-05-03T20:00:00"},
+        {"slot_start": "2024-05-03T20:00:00", "slot_end": "2024-05-03T22:00:00"},
+    ]
+
+    assert client.patch("/users/alice/availabilities", json=patch).json() == expected
+    assert client.patch("/users/alice/availabilities", json=patch).json() == expected
+    assert client.get("/users/alice/availabilities").json() == expected
+    assert client.patch("/users/nobody/availabilities", json=patch).status_code == 404
+
+
+def test_calendar_upload_replaces_availability_inside_the_horizon() -> None:
+    create_user("alice")
+    client.put(
+        "/users/alice/availabilities",
+        json=[
+            {"slot_start": "2024-05-02T18:00:00", "slot_end": "2024-05-02T20:00:00"},
+            {"slot_start": "2024-05-03T06:00:00", "slot_end": "2024-05-03T10:00:00"},
+        ],
+    )
+    body = "\r\n".join(
+        [
+            "BEGIN:VCALENDAR",
+            "BEGIN:VEVENT",
+            "DTSTART:20240503T120000Z",
+            "DTEND:20240503T140000Z",
+            "END:VEVENT",
+            "END:VCALENDAR",
+        ]
+    )
+    params = {"horizon_start": "2024-05-03T08:00:00", "horizon_end": "2024-05-03T18:00:00"}
+
+    response = client.post("/users/alice/availabilities/ics", params=params, content=body)
+
+    assert response.status_code == 200
+    assert response.json() == [
+        {"slot_start": "2024-05-02T18:00:00", "slot_end": "2024-05-02T20:00:00"},
+        {"slot_start": "2024-05-03T06:00:00", "slot_end": "2024-05-03T12:00:00"},
+        {"slot_start": "2024-05-03T14:00:00", "slot_end": "2024-05-03T18:00:00"},
+    ]
+    bad = {"horizon_start": "2024-05-03T18:00:00", "horizon_end": "2024-05-03T08:00:00"}
+    assert client.post("/users/alice/availabilities/ics", params=bad, content=body).status_code == 400
+    assert client.post("/users/nobody/availabilities/ics", params=params, content=body).status_code == 404
+
+
+def test_recurring_availability_counts_for_slot_discovery_and_scoring() -> None:
+    create_user("alice")
+    create_user("bob")
+    client.post("/restaurants", json={"id": "sushi", "name": "Sushi", "latitude": 0.0, "longitude": 0.0})
+    client.put(
+        "/users/alice/availabilities",
+        json=[{"slot_start": "2024-05-10T18:00:00", "slot_end": "2024-05-10T22:00:00"}],
+    )
+    rule = {
+        "frequency": "weekly",
+        "start_time": "19:00:00",
+        "end_time": "23:00:00",
+        "starts_on": "2024-01-01",
+        "weekdays": [4],
+        "exceptions": ["2024-05-03"],
+    }
+
+    response = client.put("/users/bob/availability-rules/fridays", json=rule)
+
+    assert response.status_code == 200
+    assert client.get("/users/bob/availability-rules").json() == [{**rule, "ends_on": None, "id": "fridays"}]
+    assert client.put("/users/bob/availability-rules/bad", json={**rule, "weekdays": []}).status_code == 400
+    invitation = client.post(
+        "/invitations",
+        json={
+            "id": "inv-weekly",
+            "organizer_id": "alice",
+            "participant_ids": ["alice", "bob"],
+            "candidate_restaurant_ids": ["sushi"],
+            "slot_search": {
+                "window_start": "2024-05-01T00:00:00",
+                "window_end": "2024-05-12T00:00:00",
+                "duration_minutes": 120,
+                "max_slots": 1,
+            },
+        },
+    ).json()
+    assert invitation["candidate_slots"] == [["2024-05-10T19:00:00", "2024-05-10T21:00:00"]]
+    assert invitation["top_options"][0]["participants"] == ["alice", "bob"]
+
+    assert client.delete("/users/bob/availability-rules/fridays").status_code == 204
+    assert client.delete("/users/bob/availability-rules/fridays").status_code == 404
+    assert repository.get_invitation("inv-weekly").top_options[0].participants == ["alice"]
+
+
+def test_rule_only_participant_with_an_aware_search_window() -> None:
+    create_user("alice")
+    client.post("/restaurants", json={"id": "sushi", "name": "Sushi", "latitude": 0.0, "longitude": 0.0})
+    rule = {
+        "frequency": "weekly",
+        "start_time": "18:00:00",
+        "end_time": "22:00:00",
+        "starts_on": "2024-01-01",
+        "weekdays": [4],
+    }
+    assert client.put("/users/alice/availability-rules/fridays", json=rule).status_code == 200
+
+    response = client.post(
+        "/invitations",
+        json={
+            "id": "inv-aware",
+            "organizer_id": "alice",
+            "participant_ids": ["alice"],
+            "candidate_restaurant_ids": ["sushi"],
+            "slot_search": {
+                "window_start": "2024-05-01T00:00:00Z",
+                "window_end": "2024-05-05T00:00:00Z",
+                "duration_minutes": 120,
+                "max_slots": 1,
+            },
+        },
+    )
+
+    assert response.status_code == 200
+    assert response.json()["candidate_slots"] == [["2024-05-03T18:00:00+00:00", "2024-05-03T20:00:00+00:00"]]
+    assert response.json()["top_options"][0]["participants"] == ["alice"]
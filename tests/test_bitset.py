@@ -0,0 +1,54 @@
+from app.bitset import RestaurantIdRegistry, RestaurantSet, membership_matrix
+from app.models import Restaurant, User
+from app.repository import repository
+
+
+def setup_function() -> None:
+    repository.clear()
+
+
+def add_restaurant(restaurant_id: str) -> None:
+    repository.add_restaurant(
+        Restaurant(id=restaurant_id, name=restaurant_id, tags=[], rating=None, latitude=0.0, longitude=0.0)
+    )
+
+
+def test_restaurant_set_behaves_like_a_set() -> None:
+    registry = RestaurantIdRegistry()
+    registry.encode(["pho", "tacos"])
+    values = RestaurantSet(registry.encode(["sushi", "ramen"]), registry)
+
+    assert "sushi" in values
+    assert "pho" not in values
+    assert "unknown" not in values
+    assert len(values) == 2
+    assert sorted(values) == ["ramen", "sushi"]
+    assert values == {"ramen", "sushi"}
+    assert values - {"ramen"} == {"sushi"}
+
+
+def test_membership_matrix_reads_bitsets_by_position() -> None:
+    registry = RestaurantIdRegistry()
+    sets = [
+        RestaurantSet(registry.encode(["a", "c"]), registry),
+        RestaurantSet(registry.encode(["b"]), registry),
+        {"c"},
+    ]
+
+    matrix = membership_matrix(sets, ["c", "b", "missing"])
+
+    assert matrix.tolist() == [[True, False, False], [False, True, False], [True, False, False]]
+
+
+def test_repository_group_operations_use_bitsets() -> None:
+    for restaurant_id in ("sushi", "ramen", "tacos"):
+        add_restaurant(restaurant_id)
+    repository.add_user(User(id="alice", name="alice", wishlist={"sushi", "ramen"}, visited={"tacos"}))
+    repository.add_user(User(id="bob", name="bob", wishlist={"sushi", "pho"}, visited={"sushi"}))
+
+    assert isinstance(repository.get_user("alice").wishlist, RestaurantSet)
+    assert repository.count_wishing(["alice", "bob"], "sushi") == 2
+    assert repository.count_wishing(["alice", "bob"], "pho") == 1
+    assert repository.count_wishing(["alice"], "nowhere") == 0
+    assert repository.unvisited_restaurants(["alice", "bob"]) == ["ramen"]
+    assert repository.unvisited_restaurants(["alice"]) == ["sushi", "ramen"]
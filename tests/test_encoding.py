@@ -0,0 +1,56 @@
+import json
+from dataclasses import asdict, replace
+from datetime import datetime
+
+from app.encoding import EncodedCache, encode_invitation, encode_restaurant, encode_user
+from app.main import serialize_invitation, serialize_user
+from app.models import Invitation, InvitationOption, Restaurant, User
+from app.schemas import RestaurantRead
+
+
+def invitation() -> Invitation:
+    option = InvitationOption(
+        restaurant_id="sushi",
+        slot_start=datetime(2024, 5, 3, 18),
+        slot_end=datetime(2024, 5, 3, 20),
+        participants=["alice", "bob"],
+        intersection_ratio=0.5,
+        availability_ratio=1,
+        convenience_score=0.1 + 0.2,
+        total_score=1.4000000000000001,
+    )
+    return Invitation(
+        id="inv-1",
+        organizer_id="alice",
+        participant_ids=["alice", "bob"],
+        candidate_restaurant_ids=["sushi", "râmen"],
+        candidate_slots=[(option.slot_start, option.slot_end)],
+        top_options=[option],
+        confirmed_option=option,
+        calendar_link="https://calendar.example.com/events/inv-1-0",
+    )
+
+
+def test_fast_encoders_match_the_read_models() -> None:
+    restaurant = Restaurant(id="sushi", name='Sushi "Bar"', tags=["jp"], rating=4, latitude=25.0, longitude=121.5)
+    user = User(id="alice", name="Alice", wishlist={"sushi", "ramen"}, visited={"tacos"}, latitude=1, longitude=2.5)
+
+    assert json.loads(encode_restaurant(restaurant)) == json.loads(RestaurantRead(**asdict(restaurant)).json())
+    assert json.loads(encode_user(user)) == json.loads(serialize_user(user).json())
+    assert json.loads(encode_invitation(invitation())) == json.loads(serialize_invitation(invitation()).json())
+    assert b'"rating":4.0' in encode_restaurant(restaurant)
+
+
+def test_cache_reuses_bytes_until_the_entity_is_replaced() -> None:
+    cache = EncodedCache(capacity=1)
+    stored = invitation()
+    first = cache.encode(stored, encode_invitation)
+    assert cache.encode(stored, encode_invitation) is first
+
+    confirmed = replace(stored, confirmed_option=None)
+    assert json.loads(cache.encode(confirmed, encode_invitation))["confirmed_option"] is None
+    assert (cache.hits, cache.misses) == (1, 2)
+
+    cache.encode(User(id="alice", name="Alice"), encode_user)
+    assert len(cache) == 1
+    assert cache.encode(confirmed, encode_invitation) is not first
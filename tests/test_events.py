@@ -0,0 +1,85 @@
+import asyncio
+import threading
+from datetime import datetime
+
+from app import services
+from app.events import CONFIRMED, OPTIONS_CHANGED, RESYNC, VOTE_RECORDED, EventBus
+from app.main import encode_event, stream_events
+from app.models import Invitation, Restaurant, User
+from app.repository import repository
+
+
+def setup_function() -> None:
+    repository.clear()
+
+
+def invitation(invitation_id: str) -> Invitation:
+    return Invitation(
+        id=invitation_id,
+        organizer_id="alice",
+        participant_ids=["alice", "bob"],
+        candidate_restaurant_ids=["sushi"],
+        candidate_slots=[(datetime(2024, 5, 3, 18), datetime(2024, 5, 3, 20))],
+    )
+
+
+def test_subscribers_get_their_invitations_from_any_thread() -> None:
+    async def scenario() -> None:
+        bus = EventBus(queue_size=8)
+        everything = bus.subscribe()
+        only_a = bus.subscribe("inv-a")
+        publisher = threading.Thread(
+            target=lambda: [bus.publish(OPTIONS_CHANGED, invitation(name)) for name in ("inv-b", "inv-a")]
+        )
+        publisher.start()
+        publisher.join()
+        assert [(await everything.get()).invitation.id for _ in range(2)] == ["inv-b", "inv-a"]
+        assert (await only_a.get()).invitation.id == "inv-a"
+        bus.unsubscribe(only_a)
+        bus.publish(CONFIRMED, invitation("inv-a"))
+        assert (await everything.get()).kind == CONFIRMED
+        await asyncio.sleep(0)
+        assert only_a._queue.empty()
+
+    asyncio.run(scenario())
+
+
+def test_slow_subscribers_are_told_to_resync() -> None:
+    async def scenario() -> None:
+        bus = EventBus(queue_size=2)
+        subscription = bus.subscribe()
+        for name in ("inv-1", "inv-2", "inv-3", "inv-4"):
+            bus.publish(OPTIONS_CHANGED, invitation(name))
+        await asyncio.sleep(0)
+        assert subscription.dropped == 3
+        resync = await subscription.get()
+        assert (resync.kind, resync.invitation, resync.dropped) == (RESYNC, None, 3)
+        assert encode_event(resync).split(b"\n")[1:3] == [b"event: resync", b'data: {"dropped":3}']
+        assert (await subscription.get()).invitation.id == "inv-4"
+
+    asyncio.run(scenario())
+
+
+def test_services_publish_builds_votes_and_confirmations() -> None:
+    repository.add_restaurant(Restaurant(id="sushi", name="Sushi", tags=[], rating=None, latitude=0.0, longitude=0.0))
+    for user_id in ("alice", "bob"):
+        repository.add_user(User(id=user_id, name=user_id, wishlist={"sushi"}))
+
+    async def scenario() -> list:
+        subscription = services.invitation_events.subscribe("inv-live")
+        frames = stream_events(subscription)
+        assert await frames.__anext__() == b": connected\n\n"
+        services.build_invitation(invitation("inv-live"))
+        services.record_vote("inv-live", "bob", 0)
+        services.confirm_option("inv-live", 0)
+        received = [await frames.__anext__() for _ in range(3)]
+        await frames.aclose()
+        return received
+
+    frames = asyncio.run(scenario())
+    assert [frame.split(b"\n")[1] for frame in frames] == [
+        b"event: " + kind.encode() for kind in (OPTIONS_CHANGED, VOTE_RECORDED, CONFIRMED)
+    ]
+    assert b'"user_id":"bob","option_key":"sushi@2024-05-03T18:00:00/2024-05-03T20:00:00"' in frames[1]
+    assert b'"confirmed_option":{"restaurant_id":"sushi"' in frames[2]
+    assert not services.invitation_events._subscribers
@@ -0,0 +1,67 @@
+import random
+
+import pytest
+
+from app import services
+from app.geo import GridIndex, haversine_km, haversine_matrix
+from app.models import Restaurant, User
+from app.repository import repository
+
+
+def setup_function() -> None:
+    repository.clear()
+
+
+def test_haversine_scales_longitude_with_latitude() -> None:
+    assert haversine_km(0.0, 0.0, 0.0, 1.0) == pytest.approx(111.195, abs=1e-3)
+    assert haversine_km(60.0, 0.0, 60.0, 1.0) == pytest.approx(55.6, abs=0.1)
+
+    matrix = haversine_matrix([0.0, 60.0], [0.0, 0.0], [0.0, 60.0], [1.0, 1.0])
+    assert matrix.shape == (2, 2)
+    assert matrix[0, 0] == pytest.approx(111.195, abs=1e-3)
+    assert matrix[1, 1] == pytest.approx(55.6, abs=0.1)
+
+
+@pytest.mark.parametrize("center", [(25.03, 121.56), (-33.9, 179.95), (78.2, 15.6)])
+def test_grid_index_matches_brute_force(center: tuple) -> None:
+    rng = random.Random(3)
+    index = GridIndex()
+    points = {}
+    for position in range(500):
+        latitude = max(-90.0, min(90.0, center[0] + rng.uniform(-1.0, 1.0)))
+        longitude = (center[1] + rng.uniform(-3.0, 3.0) + 180) % 360 - 180
+        points[f"p{position}"] = (latitude, longitude)
+        index.add(f"p{position}", latitude, longitude)
+
+    found = index.within(center[0], center[1], 40.0)
+
+    expected = sorted(
+        (item_id, haversine_km(center[0], center[1], *point))
+        for item_id, point in points.items()
+        if haversine_km(center[0], center[1], *point) <= 40.0
+    )
+    assert found
+    assert sorted(found) == expected
+    assert [distance for _, distance in found] == sorted(distance for _, distance in found)
+
+
+def test_nearby_restaurants_use_group_median_point() -> None:
+    for restaurant_id, longitude in [("near", 121.565), ("mid", 121.60), ("far", 122.5)]:
+        repository.add_restaurant(
+            Restaurant(id=restaurant_id, name=restaurant_id, tags=[], rating=None, latitude=25.03, longitude=longitude)
+        )
+    repository.add_restaurant(
+        Restaurant(id="moved", name="moved", tags=[], rating=None, latitude=25.03, longitude=121.56)
+    )
+    repository.add_restaurant(
+        Restaurant(id="moved", name="moved", tags=[], rating=None, latitude=40.0, longitude=121.56)
+    )
+    users = []
+    for user_id, longitude in [("alice", 121.55), ("bob", 121.56), ("carol", 121.9)]:
+        user = User(id=user_id, name=user_id, latitude=25.03, longitude=longitude)
+        repository.add_user(user)
+        users.append(user)
+
+    nearby = services.nearby_restaurants(users, radius_km=5.0)
+
+    assert [restaurant.id for restaurant, _ in nearby] == ["near", "mid"]
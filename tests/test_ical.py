@@ -0,0 +1,93 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.ical import FreeBusyParser
+
+
+def parse(text: str, start: datetime, end: datetime, chunk: int = 7) -> FreeBusyParser:
+    parser = FreeBusyParser(start, end)
+    for offset in range(0, len(text), chunk):
+        parser.feed(text[offset : offset + chunk])
+    parser.close()
+    return parser
+
+
+def calendar(*lines: str) -> str:
+    return "\r\n".join(["BEGIN:VCALENDAR", *lines, "END:VCALENDAR"]) + "\r\n"
+
+
+def event(*lines: str) -> tuple:
+    return ("BEGIN:VEVENT", *lines, "END:VEVENT")
+
+
+def test_busy_events_are_inverted_into_free_windows_inside_the_horizon() -> None:
+    text = calendar(
+        *event("DTSTART:20240503T090000Z", "DTEND:20240503T110000Z"),
+        *event("DTSTART:20240503T100000Z", "DURATION:PT2H"),
+        *event("DTSTART:20240503T150000Z", "DTEND:20240503T160000Z", "TRANSP:TRANSPARENT"),
+        *event("DTSTART:20240503T160000Z", "DTEND:20240503T170000Z", "STATUS:CANCELLED"),
+        *event("DTSTART;TZID=Europe/Berlin:20240503T200000", "DTEND;TZID=Europe/Berlin:20240503T2300", "00"),
+        *event("DTSTART;VALUE=DATE:20240504"),
+    )
+    # The Berlin event's DTEND is folded across two lines.
+    text = text.replace("T2300\r\n00", "T2300\r\n 00")
+    parser = parse(text, datetime(2024, 5, 3, 8), datetime(2024, 5, 5))
+
+    assert parser.free_windows() == [
+        (datetime(2024, 5, 3, 8), datetime(2024, 5, 3, 9)),
+        (datetime(2024, 5, 3, 12), datetime(2024, 5, 3, 18)),
+        (datetime(2024, 5, 3, 21), datetime(2024, 5, 4)),
+    ]
+    assert parser.free_windows(timedelta(hours=2)) == [
+        (datetime(2024, 5, 3, 12), datetime(2024, 5, 3, 18)),
+        (datetime(2024, 5, 3, 21), datetime(2024, 5, 4)),
+    ]
+    assert parser.busy_windows(timedelta(hours=2)) == [
+        (datetime(2024, 5, 3, 8), datetime(2024, 5, 3, 12)),
+        (datetime(2024, 5, 3, 18), datetime(2024, 5, 3, 21)),
+        (datetime(2024, 5, 4), datetime(2024, 5, 5)),
+    ]
+
+
+def test_weekly_rules_expand_only_inside_the_horizon_and_skip_exdates() -> None:
+    text = calendar(
+        *event(
+            "DTSTART:20200106T180000Z",
+            "DTEND:20200106T190000Z",
+            "RRULE:FREQ=WEEKLY;BYDAY=MO,WE",
+            "EXDATE:20240506T180000Z",
+        ),
+        *event("DTSTART:20240501T080000Z", "DTEND:20240501T090000Z", "RRULE:FREQ=DAILY;COUNT=2"),
+    )
+    parser = parse(text, datetime(2024, 5, 1, tzinfo=timezone.utc), datetime(2024, 5, 9, tzinfo=timezone.utc))
+
+    assert sorted(parser.busy) == [
+        (datetime(2024, 5, day, hour, tzinfo=timezone.utc).timestamp(),
+         datetime(2024, 5, day, hour + 1, tzinfo=timezone.utc).timestamp())
+        for day, hour in [(1, 8), (1, 18), (2, 8), (8, 18)]
+    ]
+    assert parser.free_windows()[0] == (
+        datetime(2024, 5, 1, tzinfo=timezone.utc),
+        datetime(2024, 5, 1, 8, tzinfo=timezone.utc),
+    )
+
+
+def test_free_busy_exports_count_busy_periods() -> None:
+    text = calendar(
+        "BEGIN:VFREEBUSY",
+        "FREEBUSY;FBTYPE=BUSY:20240503T090000Z/20240503T100000Z,20240503T120000Z/PT30M",
+        "FREEBUSY;FBTYPE=FREE:20240503T130000Z/20240503T140000Z",
+        "END:VFREEBUSY",
+    )
+    parser = parse(text, datetime(2024, 5, 3, 9), datetime(2024, 5, 3, 14))
+
+    assert parser.free_windows() == [
+        (datetime(2024, 5, 3, 10), datetime(2024, 5, 3, 12)),
+        (datetime(2024, 5, 3, 12, 30), datetime(2024, 5, 3, 14)),
+    ]
+
+
+def test_horizon_must_not_be_empty() -> None:
+    with pytest.raises(ValueError):
+        FreeBusyParser(datetime(2024, 5, 3), datetime(2024, 5, 3))
@@ -0,0 +1,92 @@
+import sys
+from datetime import datetime
+
+from fastapi.testclient import TestClient
+
+from app.bitset import RestaurantSet
+from app.intervals import IntervalIndex
+from app.main import app
+from app.models import Availability, Restaurant, User
+from app.repository import repository
+
+
+def at(hour: int) -> datetime:
+    return datetime(2024, 5, 3, hour)
+
+
+def setup_function() -> None:
+    repository.clear()
+
+
+def test_interval_index_merges_overlapping_but_not_touching_windows() -> None:
+    index = IntervalIndex([(at(18), at(20)), (at(9), at(11)), (at(10), at(12)), (at(20), at(22))])
+
+    assert list(index) == [(at(9), at(12)), (at(18), at(20)), (at(20), at(22))]
+    assert not index.covers(at(19), at(21))
+    assert index.covers(at(20), at(21))
+    assert index.covers(at(9), at(12))
+    assert not index.covers(at(11), at(13))
+    assert not index.covers(at(7), at(8))
+
+
+def test_adding_and_removing_windows_splices_only_what_they_touch() -> None:
+    index = IntervalIndex([(at(9), at(11)), (at(14), at(16)), (at(20), at(22))])
+
+    assert list(index.with_window(at(11), at(14))) == [
+        (at(9), at(11)),
+        (at(11), at(14)),
+        (at(14), at(16)),
+        (at(20), at(22)),
+    ]
+    bridged = index.with_window(at(10), at(15))
+    assert list(bridged) == [(at(9), at(16)), (at(20), at(22))]
+    assert list(bridged.with_window(at(10), at(12))) == list(bridged)
+    assert list(index) == [(at(9), at(11)), (at(14), at(16)), (at(20), at(22))]
+
+    cut = bridged.without_window(at(10), at(15))
+    assert list(cut) == [(at(9), at(10)), (at(15), at(16)), (at(20), at(22))]
+    assert list(cut.without_window(at(10), at(15))) == list(cut)
+    assert list(cut.without_window(at(8), at(23))) == []
+
+
+def test_who_is_free_answers_every_slot_for_every_user() -> None:
+    repository.set_availabilities(
+        "alice",
+        [Availability(user_id="alice", slot_start=at(9), slot_end=at(13))],
+    )
+    repository.set_availabilities(
+        "bob",
+        [Availability(user_id="bob", slot_start=at(12), slot_end=at(14))],
+    )
+    slots = [(at(9), at(10)), (at(12), at(13))]
+
+    assert repository.who_is_free(["alice", "bob", "nobody"], slots) == [
+        [True, True],
+        [False, True],
+        [False, False],
+    ]
+
+
+def test_interned_ids_and_bitset_wishlists_round_trip() -> None:
+    restaurant_id = "".join(["su", "shi"])
+    restaurant = Restaurant(id=restaurant_id, name="Sushi", tags=[], rating=None, latitude=0.0, longitude=0.0)
+    repository.add_restaurant(restaurant)
+    user_id = "".join(["ali", "ce"])
+    repository.add_user(User(id=user_id, name="Alice", wishlist={"sushi", "ramen"}))
+    repository.set_availabilities(user_id, [Availability(user_id=user_id, slot_start=at(18), slot_end=at(22))])
+
+    # The caller's object is left alone; the stored copy carries the interned id.
+    assert restaurant.id is restaurant_id
+    assert repository.get_restaurant("sushi").id is sys.intern("sushi")
+    stored = repository.get_user("alice")
+    assert stored.id is sys.intern("alice")
+    assert isinstance(stored.wishlist, RestaurantSet)
+    assert stored.wishlist == {"sushi", "ramen"}
+    assert repository.who_is_free(["alice"], [(at(18), at(20)), (at(21), at(23))]) == [[True, False]]
+
+    client = TestClient(app)
+    assert client.get("/users").json()[0]["wishlist"] == ["ramen", "sushi"]
+    assert client.get("/restaurants").json()[0]["id"] == "sushi"
+    assert client.get("/users/alice/availabilities").json() == [
+        {"slot_start": "2024-05-03T18:00:00", "slot_end": "2024-05-03T22:00:00"}
+    ]
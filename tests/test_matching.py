@@ -6,12 +6,7 @@ from app.repository import repository
 
 
 def setup_function() -> None:
-    repository.restaurants.clear()
-    repository.users.clear()
-    repository.availabilities.clear()
-    repository.invitations.clear()
-    repository.calendar_events.clear()
-    repository.votes.clear()
+    repository.clear()
 
 
 def create_user(user_id: str, wishlist: list[str], location: tuple[float, float]) -> None:
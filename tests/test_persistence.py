@@ -0,0 +1,120 @@
+from datetime import date, datetime, time
+
+from app.models import Availability, AvailabilityRule, Invitation, Restaurant, User, Vote
+from app.persistence import DurableRepository
+
+
+def at(hour: int) -> datetime:
+    return datetime(2024, 5, 3, hour)
+
+
+def write_some(store: DurableRepository, suffix: str) -> None:
+    store.add_restaurant(
+        Restaurant(id=f"r-{suffix}", name=suffix, tags=[], rating=None, latitude=25.0, longitude=121.5)
+    )
+    store.add_user(User(id=f"u-{suffix}", name=suffix, wishlist={f"r-{suffix}"}))
+    store.set_availabilities(
+        f"u-{suffix}",
+        [Availability(user_id=f"u-{suffix}", slot_start=at(18), slot_end=at(20))],
+    )
+    store.update_availability(f"u-{suffix}", add=[(at(21), at(22))])
+    store.set_availability_rule(
+        AvailabilityRule(
+            id="mornings",
+            user_id=f"u-{suffix}",
+            frequency="daily",
+            start_time=time(8),
+            end_time=time(9),
+            starts_on=date(2024, 1, 1),
+        )
+    )
+    store.add_invitation(
+        Invitation(
+            id=f"inv-{suffix}",
+            organizer_id=f"u-{suffix}",
+            participant_ids=[f"u-{suffix}"],
+            candidate_restaurant_ids=[f"r-{suffix}"],
+            candidate_slots=[(at(18), at(19))],
+        )
+    )
+    store.record_vote(Vote(invitation_id=f"inv-{suffix}", user_id=f"u-{suffix}", option_key="0"))
+
+
+def assert_restored(store: DurableRepository, suffixes: list) -> None:
+    assert sorted(user.id for user in store.list_users()) == sorted(f"u-{suffix}" for suffix in suffixes)
+    for suffix in suffixes:
+        assert store.get_user(f"u-{suffix}").wishlist == {f"r-{suffix}"}
+        assert store.get_wishers(f"r-{suffix}") == {f"u-{suffix}"}
+        assert store.who_is_free([f"u-{suffix}"], [(at(18), at(19)), (at(21), at(22)), (at(8), at(9))]) == [
+            [True, True, True]
+        ]
+        assert store.get_invitation(f"inv-{suffix}").candidate_slots == [(at(18), at(19))]
+        assert store.get_votes(f"inv-{suffix}")[f"u-{suffix}"].option_key == "0"
+
+
+def test_restart_replays_snapshot_and_log_tail(tmp_path) -> None:
+    store = DurableRepository(str(tmp_path), snapshot_every=7)
+    for suffix in "abc":
+        write_some(store, suffix)
+    store.close()
+
+    assert (tmp_path / "snapshot.bin").exists()
+    restored = DurableRepository(str(tmp_path), snapshot_every=7)
+    assert_restored(restored, list("abc"))
+    write_some(restored, "d")
+    restored.close()
+
+    assert_restored(DurableRepository(str(tmp_path)), list("abcd"))
+
+
+def test_torn_log_tail_is_dropped(tmp_path) -> None:
+    store = DurableRepository(str(tmp_path))
+    write_some(store, "a")
+    store.close()
+    with open(tmp_path / "wal.log", "ab") as handle:
+        handle.write(b"\x00\x00\x01\x00partial")
+
+    restored = DurableRepository(str(tmp_path))
+    assert_restored(restored, ["a"])
+    write_some(restored, "b")
+    restored.close()
+
+    assert_restored(DurableRepository(str(tmp_path)), ["a", "b"])
+
+
+def test_clear_persists(tmp_path) -> None:
+    store = DurableRepository(str(tmp_path))
+    write_some(store, "a")
+    store.clear()
+    store.close()
+
+    assert DurableRepository(str(tmp_path)).list_users() == []
+
+
+def test_snapshot_inside_a_batch_waits_for_it_to_publish(tmp_path) -> None:
+    store = DurableRepository(str(tmp_path), snapshot_every=3)
+    with store.batch():
+        for suffix in "abcde":
+            write_some(store, suffix)
+    store.close()
+
+    restored = DurableRepository(str(tmp_path), snapshot_every=3)
+    assert_restored(restored, list("abcde"))
+    restored.close()
+
+
+def test_rolled_back_batch_is_not_replayed(tmp_path) -> None:
+    store = DurableRepository(str(tmp_path))
+    write_some(store, "a")
+    try:
+        with store.batch():
+            write_some(store, "b")
+            raise RuntimeError("abandon the batch")
+    except RuntimeError:
+        pass
+    write_some(store, "c")
+    store.close()
+
+    restored = DurableRepository(str(tmp_path))
+    assert_restored(restored, ["a", "c"])
+    restored.close()
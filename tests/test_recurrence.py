@@ -0,0 +1,49 @@
+from datetime import date, datetime, time
+
+from app.intervals import IntervalIndex
+from app.models import AvailabilityRule
+from app.recurrence import AvailabilityCalendar, RecurringWindows
+
+
+def rule(**overrides) -> AvailabilityRule:
+    fields = dict(
+        id="fridays",
+        user_id="alice",
+        frequency="weekly",
+        start_time=time(18),
+        end_time=time(22),
+        starts_on=date(2024, 1, 1),
+        weekdays=[4],
+    )
+    fields.update(overrides)
+    return AvailabilityRule(**fields)
+
+
+def test_weekly_rule_covers_matching_slots_without_expanding() -> None:
+    fridays = AvailabilityCalendar(IntervalIndex(), [RecurringWindows(rule(exceptions=[date(2024, 5, 10)]))])
+
+    assert fridays.covers(datetime(2024, 5, 3, 18), datetime(2024, 5, 3, 22))
+    assert fridays.covers(datetime(2099, 12, 25, 19), datetime(2099, 12, 25, 20))
+    assert not fridays.covers(datetime(2024, 5, 3, 17), datetime(2024, 5, 3, 19))
+    assert not fridays.covers(datetime(2024, 5, 4, 18), datetime(2024, 5, 4, 20))
+    assert not fridays.covers(datetime(2024, 5, 10, 18), datetime(2024, 5, 10, 20))
+    assert not fridays.covers(datetime(2023, 12, 29, 18), datetime(2023, 12, 29, 20))
+
+
+def test_overnight_daily_rule_and_one_off_windows_join_where_they_overlap() -> None:
+    nights = RecurringWindows(
+        rule(frequency="daily", weekdays=[], start_time=time(22), end_time=time(2), ends_on=date(2024, 5, 4))
+    )
+    calendar = AvailabilityCalendar(IntervalIndex([(datetime(2024, 5, 3, 20), datetime(2024, 5, 3, 22, 30))]), [nights])
+    touching = AvailabilityCalendar(IntervalIndex([(datetime(2024, 5, 3, 20), datetime(2024, 5, 3, 22))]), [nights])
+
+    assert calendar.covers(datetime(2024, 5, 4, 23), datetime(2024, 5, 5, 1))
+    assert not calendar.covers(datetime(2024, 5, 5, 23), datetime(2024, 5, 6, 1))
+    # Spans the one-off window and the night it overlaps, but not one it only touches.
+    assert calendar.covers(datetime(2024, 5, 3, 21), datetime(2024, 5, 4, 1))
+    assert not touching.covers(datetime(2024, 5, 3, 21), datetime(2024, 5, 4, 1))
+    assert list(calendar.windows(datetime(2024, 5, 3), datetime(2024, 5, 6))) == [
+        (datetime(2024, 5, 2, 22), datetime(2024, 5, 3, 2)),
+        (datetime(2024, 5, 3, 20), datetime(2024, 5, 4, 2)),
+        (datetime(2024, 5, 4, 22), datetime(2024, 5, 5, 2)),
+    ]
@@ -0,0 +1,87 @@
+import threading
+
+import pytest
+
+from app.models import Invitation, User
+from app.repository import InMemoryRepository
+
+
+def invitation(invitation_id: str) -> Invitation:
+    return Invitation(
+        id=invitation_id,
+        organizer_id="alice",
+        participant_ids=["alice"],
+        candidate_restaurant_ids=[],
+        candidate_slots=[],
+    )
+
+
+def test_reading_pins_one_snapshot() -> None:
+    store = InMemoryRepository()
+    store.add_user(User(id="alice", name="Alice", wishlist={"sushi"}))
+    with store.reading() as snapshot:
+        store.add_user(User(id="bob", name="Bob", wishlist={"sushi"}))
+        assert [user.id for user in store.list_users()] == ["alice"]
+        assert store.get_wishers("sushi") == {"alice"}
+        assert store.read_snapshot() is snapshot
+    assert [user.id for user in store.list_users()] == ["alice", "bob"]
+    assert store.get_wishers("sushi") == {"alice", "bob"}
+    assert snapshot.wishlist_index["sushi"] == {"alice"}
+
+
+def test_batch_publishes_once_and_discards_on_error() -> None:
+    store = InMemoryRepository()
+    version = store.read_snapshot().version
+    with store.batch():
+        store.add_invitation(invitation("inv-1"))
+        store.add_invitation(invitation("inv-2"))
+        assert store.list_invitations() == []
+    assert store.read_snapshot().version == version + 1
+    assert [item.id for item in store.list_invitations()] == ["inv-1", "inv-2"]
+
+    with pytest.raises(RuntimeError):
+        with store.batch():
+            store.add_invitation(invitation("inv-3"))
+            raise RuntimeError("abort")
+    assert len(store.list_invitations()) == 2
+
+
+def test_concurrent_readers_never_see_torn_state() -> None:
+    store = InMemoryRepository()
+    done = threading.Event()
+    errors = []
+
+    def write() -> None:
+        for number in range(300):
+            with store.batch():
+                store.add_invitation(invitation(f"inv-{number}"))
+                store.add_user(User(id=f"u-{number}", name="", wishlist={"sushi"}))
+        done.set()
+
+    def read() -> None:
+        try:
+            while not done.is_set():
+                with store.reading():
+                    invitations = store.list_invitations()
+                    users = store.list_users()
+                    wishers = store.get_wishers("sushi")
+                assert len(invitations) == len(users) == len(wishers)
+        except Exception as exc:  # pragma: no cover - reported below
+            errors.append(exc)
+
+    threads = [threading.Thread(target=read) for _ in range(4)] + [threading.Thread(target=write)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert len(store.list_invitations()) == 300
+
+
+def test_scans_stay_on_the_snapshot_they_started_from() -> None:
+    store = InMemoryRepository()
+    store.add_invitation(invitation("inv-2"))
+    store.add_invitation(invitation("inv-1"))
+    scan = store.scan_invitations()
+    store.add_invitation(invitation("inv-0"))
+    assert [item.id for item in scan] == ["inv-2", "inv-1"]
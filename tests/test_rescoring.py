@@ -0,0 +1,94 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import services
+from app.models import Availability, Invitation, Restaurant, User
+from app.repository import repository
+
+
+def setup_function() -> None:
+    repository.clear()
+
+
+def at(hour: int) -> datetime:
+    return datetime(2024, 5, 3, hour)
+
+
+def seed() -> Invitation:
+    for index, restaurant_id in enumerate(("sushi", "ramen", "tacos")):
+        repository.add_restaurant(
+            Restaurant(id=restaurant_id, name=restaurant_id, tags=[], rating=None, latitude=25.0, longitude=121.5 + index / 100)
+        )
+    repository.add_user(User(id="alice", name="Alice", wishlist={"sushi"}, latitude=25.0, longitude=121.5))
+    repository.add_user(User(id="bob", name="Bob", wishlist={"ramen"}, latitude=25.01, longitude=121.52))
+    repository.set_availabilities("alice", [Availability(user_id="alice", slot_start=at(12), slot_end=at(14))])
+    invitation = Invitation(
+        id="inv-live",
+        organizer_id="alice",
+        participant_ids=["alice", "bob"],
+        candidate_restaurant_ids=["sushi", "ramen", "tacos"],
+        candidate_slots=[(at(12), at(13)), (at(18), at(19))],
+    )
+    return services.build_invitation(invitation, limit=6)
+
+
+def assert_matches_rebuild(invitation_id: str) -> None:
+    stored = repository.get_invitation(invitation_id)
+    rebuilt = services.generate_top_options(stored, limit=6)
+    assert [(option.restaurant_id, option.slot_start) for option in stored.top_options] == [
+        (option.restaurant_id, option.slot_start) for option in rebuilt
+    ]
+    for option, expected in zip(stored.top_options, rebuilt):
+        assert option.participants == expected.participants
+        assert option.total_score == pytest.approx(expected.total_score)
+
+
+def test_availability_and_wishlist_changes_rescore_open_invitations() -> None:
+    seed()
+
+    services.save_availabilities(
+        "bob",
+        [Availability(user_id="bob", slot_start=at(17), slot_end=at(20))],
+    )
+    options = repository.get_invitation("inv-live").top_options
+    assert [option.participants for option in options if option.slot_start == at(18)][0] == ["bob"]
+    assert_matches_rebuild("inv-live")
+
+    services.save_user(User(id="alice", name="Alice", wishlist={"tacos", "ramen"}, latitude=25.02, longitude=121.53))
+    assert repository.get_invitation("inv-live").top_options[0].intersection_ratio == 1.0
+    assert_matches_rebuild("inv-live")
+
+    services.save_restaurant(
+        Restaurant(id="tacos", name="tacos", tags=[], rating=None, latitude=25.3, longitude=121.9)
+    )
+    assert_matches_rebuild("inv-live")
+
+
+def test_confirmed_invitations_are_left_alone() -> None:
+    seed()
+    confirmed = services.confirm_option("inv-live", 0)
+    assert "inv-live" not in services.open_invitations
+
+    services.save_availabilities(
+        "bob",
+        [Availability(user_id="bob", slot_start=at(17) - timedelta(hours=1), slot_end=at(20))],
+    )
+    assert repository.get_invitation("inv-live").top_options == confirmed.top_options
+
+
+def test_update_landing_while_an_invitation_is_scored_is_not_lost(monkeypatch) -> None:
+    prepare = services.prepare_scoring
+
+    def prepare_then_update(invitation, limit=3):
+        payload = prepare(invitation, limit)
+        # Nothing is tracked yet, so this update has no grid to patch.
+        services.save_availabilities("bob", [Availability(user_id="bob", slot_start=at(17), slot_end=at(20))])
+        return payload
+
+    monkeypatch.setattr(services, "prepare_scoring", prepare_then_update)
+    invitation = seed()
+
+    assert [option.participants for option in invitation.top_options if option.slot_start == at(18)][0] == ["bob"]
+    assert repository.get_invitation("inv-live") == invitation
+    assert_matches_rebuild("inv-live")
@@ -0,0 +1,134 @@
+import random
+import sys
+import threading
+from datetime import datetime, timedelta, timezone
+
+from app import services
+from app.models import Availability, Invitation, Restaurant, User
+from app.repository import repository
+from app.scoring import SelectionStats, build_score_grid
+
+
+def setup_function() -> None:
+    repository.clear()
+
+
+def reference_top_options(invitation: Invitation, limit: int) -> list:
+    users = services.get_users(invitation.participant_ids)
+    restaurants = services.get_restaurants(invitation.candidate_restaurant_ids)
+    options = [
+        services.score_option(restaurant, slot, users)
+        for restaurant in restaurants
+        for slot in invitation.candidate_slots
+    ]
+    options.sort(key=lambda option: option.total_score, reverse=True)
+    return options[:limit]
+
+
+def test_vectorized_engine_matches_scalar_scoring() -> None:
+    rng = random.Random(7)
+    base = datetime(2024, 5, 1, 12, tzinfo=timezone.utc)
+    restaurant_ids = [f"r{i}" for i in range(30)]
+    for restaurant_id in restaurant_ids:
+        repository.add_restaurant(
+            Restaurant(
+                id=restaurant_id,
+                name=restaurant_id,
+                tags=[],
+                rating=None,
+                latitude=rng.uniform(24.9, 25.1),
+                longitude=rng.uniform(121.4, 121.6),
+            )
+        )
+    slots = [(base + timedelta(hours=6 * i), base + timedelta(hours=6 * i + 2)) for i in range(8)]
+    user_ids = [f"u{i}" for i in range(25)]
+    for user_id in user_ids:
+        repository.add_user(
+            User(
+                id=user_id,
+                name=user_id,
+                wishlist=set(rng.sample(restaurant_ids, 5)),
+                latitude=rng.uniform(24.9, 25.1),
+                longitude=rng.uniform(121.4, 121.6),
+            )
+        )
+        repository.set_availabilities(
+            user_id,
+            [
+                Availability(user_id=user_id, slot_start=start - timedelta(hours=1), slot_end=end)
+                for start, end in rng.sample(slots, 3)
+            ],
+        )
+
+    invitation = Invitation(
+        id="inv-grid",
+        organizer_id="u0",
+        participant_ids=user_ids,
+        candidate_restaurant_ids=restaurant_ids,
+        candidate_slots=slots,
+    )
+
+    for limit in (1, 3, len(restaurant_ids) * len(slots)):
+        assert services.generate_top_options(invitation, limit=limit) == reference_top_options(invitation, limit)
+
+
+def test_top_options_prunes_pairs_that_cannot_reach_the_top() -> None:
+    base = datetime(2024, 5, 1, 12, tzinfo=timezone.utc)
+    slots = [(base + timedelta(days=day), base + timedelta(days=day, hours=2)) for day in range(4)]
+    for index in range(20):
+        repository.add_restaurant(
+            Restaurant(id=f"r{index}", name=f"r{index}", tags=[], rating=None, latitude=0.0, longitude=float(index + 1))
+        )
+    repository.add_user(User(id="alice", name="alice", wishlist={"r0"}))
+    repository.add_user(User(id="bob", name="bob", wishlist={"r0", "r1"}))
+    for user_id in ("alice", "bob"):
+        repository.set_availabilities(
+            user_id,
+            [Availability(user_id=user_id, slot_start=slots[0][0], slot_end=slots[0][1])],
+        )
+    invitation = Invitation(
+        id="inv-prune",
+        organizer_id="alice",
+        participant_ids=["alice", "bob"],
+        candidate_restaurant_ids=[f"r{index}" for index in range(20)],
+        candidate_slots=slots,
+    )
+
+    stats = SelectionStats()
+    users = services.get_users(invitation.participant_ids)
+    grid = build_score_grid(
+        users,
+        services.get_restaurants(invitation.candidate_restaurant_ids),
+        services.compute_availability_bitmap(users, slots),
+    )
+    options = grid.top_options(3, stats=stats)
+
+    assert options == reference_top_options(invitation, 3)
+    assert stats.evaluated + stats.pruned == 80
+    assert stats.pruned > 60
+
+    reports = []
+    assert grid.top_options(3, progress=lambda partial, evaluated: reports.append((partial, evaluated))) == options
+    assert reports[0][1] > 0
+    assert len(reports[0][0]) <= 3
+
+
+def test_selection_stats_count_every_add_from_many_threads() -> None:
+    stats = SelectionStats()
+
+    def add() -> None:
+        for _ in range(20000):
+            stats.add(SelectionStats(evaluated=1, pruned=2))
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        threads = [threading.Thread(target=add) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+
+    assert stats.totals() == (80000, 160000)
@@ -0,0 +1,119 @@
+import asyncio
+import pickle
+import random
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import scoring_pool, services
+from app.models import Availability, Invitation, Restaurant, User
+from app.repository import repository
+from app.scoring_pool import ScoringPool
+
+
+def setup_function() -> None:
+    repository.clear()
+
+
+def seed_invitation() -> Invitation:
+    rng = random.Random(11)
+    base = datetime(2024, 5, 1, 12)
+    restaurant_ids = [f"r{i}" for i in range(12)]
+    for restaurant_id in restaurant_ids:
+        repository.add_restaurant(
+            Restaurant(
+                id=restaurant_id,
+                name=restaurant_id,
+                tags=[],
+                rating=None,
+                latitude=rng.uniform(24.9, 25.1),
+                longitude=rng.uniform(121.4, 121.6),
+            )
+        )
+    slots = [(base + timedelta(hours=6 * i), base + timedelta(hours=6 * i + 2)) for i in range(5)]
+    user_ids = [f"u{i}" for i in range(9)]
+    for user_id in user_ids:
+        repository.add_user(
+            User(
+                id=user_id,
+                name=user_id,
+                wishlist=set(rng.sample(restaurant_ids, 4)),
+                latitude=rng.uniform(24.9, 25.1),
+                longitude=rng.uniform(121.4, 121.6),
+            )
+        )
+        repository.set_availabilities(
+            user_id,
+            [Availability(user_id=user_id, slot_start=start, slot_end=end) for start, end in rng.sample(slots, 2)],
+        )
+    return Invitation(
+        id="inv-pool",
+        organizer_id="u0",
+        participant_ids=user_ids,
+        candidate_restaurant_ids=restaurant_ids,
+        candidate_slots=slots,
+    )
+
+
+def test_payload_scoring_matches_inline_engine() -> None:
+    invitation = seed_invitation()
+    payload = services.prepare_scoring(invitation, limit=4)
+    expected = services.generate_top_options(invitation, limit=4)
+
+    inline = ScoringPool(workers=0, timeout=5.0, offload_cells=0)
+    assert asyncio.run(inline.score(pickle.loads(pickle.dumps(payload))))[0] == expected
+
+    pool = ScoringPool(workers=1, timeout=30.0, offload_cells=0)
+    try:
+        options, stats = asyncio.run(pool.score(payload))
+    finally:
+        pool.shutdown()
+    assert options == expected
+    assert stats.evaluated + stats.pruned == 12 * 5
+
+
+def test_slow_jobs_time_out() -> None:
+    payload = services.prepare_scoring(seed_invitation())
+    pool = ScoringPool(workers=1, timeout=0.0, offload_cells=0)
+    try:
+        with pytest.raises(TimeoutError):
+            asyncio.run(pool.score(payload))
+    finally:
+        pool.shutdown()
+
+
+def test_score_many_keeps_order_across_chunks() -> None:
+    invitation = seed_invitation()
+    payloads = [services.prepare_scoring(invitation, limit=limit) for limit in (1, 2, 3, 4, 5)]
+    expected = [services.generate_top_options(invitation, limit=limit) for limit in (1, 2, 3, 4, 5)]
+
+    pool = ScoringPool(workers=2, timeout=30.0, offload_cells=0)
+    try:
+        results = asyncio.run(pool.score_many(payloads))
+    finally:
+        pool.shutdown()
+    assert [options for options, _ in results] == expected
+
+
+def test_small_payloads_are_scored_off_the_event_loop(monkeypatch) -> None:
+    invitation = seed_invitation()
+    payload = services.prepare_scoring(invitation, limit=4)
+    threads = []
+    score = scoring_pool.score_payload
+
+    def recording(payload, progress=None):
+        threads.append(threading.get_ident())
+        return score(payload, progress)
+
+    monkeypatch.setattr(scoring_pool, "score_payload", recording)
+    pool = ScoringPool(workers=1, timeout=5.0, offload_cells=10**9)
+
+    async def run() -> int:
+        await pool.score(payload)
+        await pool.score_many([payload, payload])
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(run())
+    assert len(threads) == 3
+    assert loop_thread not in threads
@@ -0,0 +1,63 @@
+import pickle
+import random
+
+from app.pagination import keys_after
+from app.shared import CHUNK_SIZE, SharedDict, SharedSet, SortedKeys
+
+
+def test_shared_dict_matches_a_dict_and_copies_stay_independent() -> None:
+    generator = random.Random(7)
+    shared: SharedDict[str, int] = SharedDict()
+    reference = {}
+    published = []
+    for step in range(5000):
+        key = f"k{generator.randrange(2000)}"
+        if generator.random() < 0.2 and key in reference:
+            del shared[key]
+            del reference[key]
+        else:
+            shared[key] = step
+            reference[key] = step
+        if step % 500 == 0:
+            published.append((shared.copy(), dict(reference)))
+    assert len(shared) == len(reference)
+    assert dict(shared.items()) == reference
+    assert all(shared.get(key) == value for key, value in reference.items())
+    assert "missing" not in shared and shared.get("missing") is None
+    for copy, expected in published:
+        assert dict(copy.items()) == expected
+    assert pickle.loads(pickle.dumps(shared)) == reference
+
+
+def test_shared_set_forks_like_a_set() -> None:
+    wishers = SharedSet(["alice", "bob"])
+    fork = wishers.copy()
+    fork.add("carol")
+    fork.discard("alice")
+    assert wishers == {"alice", "bob"}
+    assert fork == {"bob", "carol"}
+
+
+def test_sorted_keys_match_a_sorted_list_across_chunks() -> None:
+    generator = random.Random(11)
+    keys = SortedKeys(generator.sample(range(10 * CHUNK_SIZE), 3 * CHUNK_SIZE))
+    reference = sorted(keys)
+    before = keys.copy()
+    for _ in range(4 * CHUNK_SIZE):
+        key = generator.randrange(10 * CHUNK_SIZE)
+        if generator.random() < 0.4:
+            keys.discard(key)
+            if key in reference:
+                reference.remove(key)
+        else:
+            keys.add(key)
+            if key not in reference:
+                reference.append(key)
+                reference.sort()
+    assert list(keys) == reference and len(keys) == len(reference)
+    assert before != keys and list(before) == sorted(before)
+    for probe in (-1, 0, 17, 5 * CHUNK_SIZE, 10 * CHUNK_SIZE):
+        assert keys_after(keys, 5, after=probe) == keys_after(reference, 5, after=probe)
+        assert keys_after(keys, 5, lowest=probe) == keys_after(reference, 5, lowest=probe)
+    assert [keys[position] for position in (0, 700, -1)] == [reference[0], reference[700], reference[-1]]
+    assert pickle.loads(pickle.dumps(keys)) == reference
@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta, timezone
+
+from app.slot_discovery import DiscoveredSlot, discover_slots
+
+
+def at(day: int, hour: int, minute: int = 0) -> datetime:
+    return datetime(2024, 5, day, hour, minute)
+
+
+def test_discover_slots_prefers_windows_with_most_people_free() -> None:
+    calendars = [
+        [(at(3, 18), at(3, 22)), (at(4, 11), at(4, 14))],
+        [(at(3, 19), at(3, 21))],
+        [(at(3, 20), at(3, 23)), (at(4, 12), at(4, 13))],
+        [(at(4, 10), at(4, 13))],
+    ]
+
+    slots = discover_slots(calendars, at(3, 0), at(5, 0), timedelta(hours=1), limit=3)
+
+    assert slots == [
+        DiscoveredSlot(slot_start=at(3, 20), slot_end=at(3, 21), free_count=3),
+        DiscoveredSlot(slot_start=at(4, 12), slot_end=at(4, 13), free_count=3),
+        DiscoveredSlot(slot_start=at(3, 19), slot_end=at(3, 20), free_count=2),
+    ]
+
+
+def test_discover_slots_clips_to_search_window_and_duration() -> None:
+    calendars = [[(at(3, 9), at(3, 12))], [(at(3, 11, 30), at(3, 15))]]
+
+    slots = discover_slots(calendars, at(3, 10), at(3, 13), timedelta(minutes=90), limit=5)
+
+    assert slots == [
+        DiscoveredSlot(slot_start=at(3, 10), slot_end=at(3, 11, 30), free_count=1),
+        DiscoveredSlot(slot_start=at(3, 11, 30), slot_end=at(3, 13), free_count=1),
+    ]
+    assert discover_slots(calendars, at(3, 10), at(3, 11), timedelta(hours=2), limit=5) == []
+
+
+def test_discover_slots_fills_a_long_common_window_back_to_back() -> None:
+    calendars = [[(at(3, 12), at(3, 18))], [(at(3, 12), at(3, 18))]]
+
+    slots = discover_slots(calendars, at(3, 0), at(4, 0), timedelta(hours=2), limit=3)
+
+    assert [(slot.slot_start, slot.slot_end, slot.free_count) for slot in slots] == [
+        (at(3, 12), at(3, 14), 2),
+        (at(3, 14), at(3, 16), 2),
+        (at(3, 16), at(3, 18), 2),
+    ]
+
+
+def test_discover_slots_mixes_naive_windows_with_an_aware_search_window() -> None:
+    utc = timezone.utc
+
+    slots = discover_slots(
+        [[(at(3, 18), at(3, 20))]], at(3, 0).replace(tzinfo=utc), at(4, 0).replace(tzinfo=utc), timedelta(hours=2), 1
+    )
+
+    assert slots == [
+        DiscoveredSlot(slot_start=at(3, 18).replace(tzinfo=utc), slot_end=at(3, 20).replace(tzinfo=utc), free_count=1)
+    ]
@@ -0,0 +1,236 @@
+import threading
+from datetime import date, datetime, time
+
+import pytest
+
+from app.models import Availability, AvailabilityRule, Invitation, Restaurant, User, Vote
+from app.pagination import scan_pages
+from app.repository import InMemoryRepository
+from app.sqlite_repository import SqliteRepository
+
+
+def at(hour: int) -> datetime:
+    return datetime(2024, 5, 3, hour)
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        yield InMemoryRepository()
+        return
+    store = SqliteRepository(str(tmp_path / "togetherdine.db"))
+    yield store
+    store.close()
+
+
+def populate(store) -> None:
+    for restaurant_id, longitude in [("sushi", 121.56), ("ramen", 121.57), ("tacos", 125.0)]:
+        store.add_restaurant(
+            Restaurant(id=restaurant_id, name=restaurant_id, tags=["x"], rating=4.0, latitude=25.03, longitude=longitude)
+        )
+    store.add_user(User(id="alice", name="Alice", wishlist={"sushi", "ramen"}, visited={"tacos"}))
+    store.add_user(User(id="bob", name="Bob", wishlist={"sushi"}, visited={"sushi"}))
+    store.set_availabilities(
+        "alice",
+        [
+            Availability(user_id="alice", slot_start=at(18), slot_end=at(20)),
+            Availability(user_id="alice", slot_start=at(19), slot_end=at(22)),
+        ],
+    )
+
+
+def test_repositories_share_the_same_behaviour(store) -> None:
+    populate(store)
+
+    assert store.get_restaurant("sushi").tags == ["x"]
+    assert store.get_restaurant("missing") is None
+    assert [restaurant.id for restaurant in store.list_restaurants()] == ["sushi", "ramen", "tacos"]
+    assert sorted(store.get_user("alice").wishlist) == ["ramen", "sushi"]
+    assert [user.id for user in store.list_users()] == ["alice", "bob"]
+    assert store.get_wishers("sushi") == {"alice", "bob"}
+    assert store.count_wishing(["alice", "bob"], "ramen") == 1
+    assert set(store.visited_by_any(["alice", "bob"])) == {"sushi", "tacos"}
+    assert store.unvisited_restaurants(["alice", "bob"]) == ["ramen"]
+    assert [restaurant.id for restaurant, _ in store.restaurants_within(25.03, 121.56, 5.0)] == ["sushi", "ramen"]
+    assert [(item.slot_start, item.slot_end) for item in store.get_availabilities("alice")] == [(at(18), at(22))]
+    assert store.who_is_free(["alice", "bob"], [(at(19), at(21)), (at(21), at(23))]) == [
+        [True, False],
+        [False, False],
+    ]
+
+    invitation = Invitation(
+        id="inv-1",
+        organizer_id="alice",
+        participant_ids=["alice", "bob"],
+        candidate_restaurant_ids=["sushi"],
+        candidate_slots=[(at(19), at(21))],
+    )
+    store.add_invitation(invitation)
+    store.record_vote(Vote(invitation_id="inv-1", user_id="bob", option_key="0"))
+    store.record_vote(Vote(invitation_id="inv-1", user_id="bob", option_key="1"))
+
+    assert store.get_invitation("inv-1") == invitation
+    assert [item.id for item in store.list_invitations()] == ["inv-1"]
+    assert store.get_votes("inv-1")["bob"].option_key == "1"
+    assert store.get_tally("inv-1") == {"1": 1}
+    store.record_vote(Vote(invitation_id="inv-1", user_id="alice", option_key="1"))
+    store.record_vote(Vote(invitation_id="inv-1", user_id="alice", option_key="1"))
+    assert store.get_tally("inv-1") == {"1": 2}
+
+    store.clear()
+    assert store.list_users() == []
+    assert store.get_user("alice") is None
+
+
+def drain(read, limit: int, **filters) -> list:
+    ids, after = [], None
+    while True:
+        page = read(limit, after=after, **filters)
+        ids.extend(item.id for item in page.items)
+        if page.next_after is None:
+            return ids
+        after = page.next_after
+
+
+def test_pages_follow_cursors_and_filters(store) -> None:
+    for index, (tags, rating) in enumerate([(["x"], 4.5), (["y"], 3.0), (["x", "y"], 4.5), (["x"], None), ([], 5.0)]):
+        store.add_restaurant(
+            Restaurant(id=f"r{index}", name=f"r{index}", tags=tags, rating=rating, latitude=25.0, longitude=121.5)
+        )
+    for user_id, name in [("u3", "bob"), ("u1", "Alice"), ("u2", "alfred"), ("u4", "ALbert"), ("u5", "Carol")]:
+        store.add_user(User(id=user_id, name=name))
+    for invitation_id, organizer_id, participant_ids in [
+        ("i2", "u1", ["u1", "u2"]),
+        ("i1", "u1", ["u1", "u3"]),
+        ("i3", "u2", ["u2", "u3"]),
+    ]:
+        store.add_invitation(
+            Invitation(
+                id=invitation_id,
+                organizer_id=organizer_id,
+                participant_ids=participant_ids,
+                candidate_restaurant_ids=[],
+                candidate_slots=[],
+            )
+        )
+
+    assert drain(store.page_restaurants, 2) == ["r0", "r1", "r2", "r3", "r4"]
+    assert drain(store.page_restaurants, 1, tag="x") == ["r0", "r2", "r3"]
+    assert drain(store.page_restaurants, 1, min_rating=4.5) == ["r4", "r0", "r2"]
+    assert drain(store.page_restaurants, 1, tag="x", min_rating=4.0) == ["r0", "r2"]
+    assert drain(store.page_users, 2) == ["u3", "u1", "u2", "u4", "u5"]
+    assert drain(store.page_users, 1, name_prefix="Al") == ["u4", "u2", "u1"]
+    assert drain(store.page_invitations, 2) == ["i2", "i1", "i3"]
+    assert drain(store.page_invitations, 1, organizer_id="u1") == ["i1", "i2"]
+    assert drain(store.page_invitations, 1, participant_id="u3") == ["i1", "i3"]
+    assert drain(store.page_invitations, 1, organizer_id="u1", participant_id="u2") == ["i2"]
+    assert [user.id for user in scan_pages(store.page_users, chunk=2)] == ["u3", "u1", "u2", "u4", "u5"]
+    assert [invitation.id for invitation in store.scan_invitations()] == ["i2", "i1", "i3"]
+
+    store.add_restaurant(Restaurant(id="r0", name="r0", tags=["y"], rating=1.0, latitude=25.0, longitude=121.5))
+    assert drain(store.page_restaurants, 5, tag="x") == ["r2", "r3"]
+    assert drain(store.page_restaurants, 5, min_rating=4.5) == ["r4", "r2"]
+    assert drain(store.page_restaurants, 2) == ["r0", "r1", "r2", "r3", "r4"]
+    with pytest.raises(ValueError):
+        store.page_users(1, after=("u1",), name_prefix="al")
+    with pytest.raises(ValueError):
+        store.page_users(1, after=("u1",))
+
+
+def test_availability_updates_merge_and_cut_windows(store) -> None:
+    store.set_availabilities("alice", [Availability(user_id="alice", slot_start=at(9), slot_end=at(11))])
+    update = {"add": [(at(11), at(13)), (at(18), at(20))], "remove": [(at(10), at(12))]}
+
+    assert list(store.update_availability("alice", **update)) == [(at(9), at(10)), (at(12), at(13)), (at(18), at(20))]
+    store.update_availability("alice", **update)
+    assert [(item.slot_start, item.slot_end) for item in store.get_availabilities("alice")] == [
+        (at(9), at(10)),
+        (at(12), at(13)),
+        (at(18), at(20)),
+    ]
+    assert store.who_is_free(["alice"], [(at(12), at(13)), (at(10), at(11))]) == [[True, False]]
+
+
+def test_recurring_rules_are_checked_with_one_off_windows(store) -> None:
+    populate(store)
+    fridays = AvailabilityRule(
+        id="fridays",
+        user_id="bob",
+        frequency="weekly",
+        start_time=time(18),
+        end_time=time(22),
+        starts_on=date(2024, 1, 1),
+        weekdays=[4],
+    )
+    store.set_availability_rule(fridays)
+    next_friday = (datetime(2024, 5, 10, 19), datetime(2024, 5, 10, 21))
+
+    assert store.who_is_free(["alice", "bob"], [(at(19), at(21)), next_friday]) == [[True, False], [True, True]]
+    assert store.get_availability_rules("bob") == [fridays]
+    assert store.entity_version("availabilities", "bob") > 0
+    assert store.delete_availability_rule("bob", "fridays")
+    assert not store.delete_availability_rule("bob", "fridays")
+    assert store.who_is_free(["bob"], [next_friday]) == [[False]]
+
+
+def test_writes_bump_collection_and_entity_versions(store) -> None:
+    assert store.collection_version("users") == 0
+    store.add_user(User(id="alice", name="Alice"))
+    store.add_user(User(id="bob", name="Bob"))
+    alice, bob = store.entity_version("users", "alice"), store.entity_version("users", "bob")
+    assert 0 < alice < bob == store.collection_version("users")
+
+    store.add_restaurant(Restaurant(id="sushi", name="Sushi", tags=[], rating=None, latitude=0.0, longitude=0.0))
+    assert store.collection_version("users") == bob
+    assert store.entity_version("users", "alice") == alice
+
+    store.clear()
+    assert store.collection_version("users") > bob
+    assert store.entity_version("users", "alice") == 0
+
+
+def test_sqlite_repository_sees_writes_from_other_connections(tmp_path) -> None:
+    path = str(tmp_path / "shared.db")
+    reader = SqliteRepository(path)
+    writer = SqliteRepository(path)
+    populate(writer)
+
+    assert reader.get_user("alice").name == "Alice"
+    writer.add_user(User(id="alice", name="Alice B"))
+    assert reader.get_user("alice").name == "Alice B"
+    assert reader.get_wishers("ramen") == set()
+
+    names = []
+    thread = threading.Thread(target=lambda: names.append(reader.get_user("bob").name))
+    thread.start()
+    thread.join()
+    assert names == ["Bob"]
+
+    reader.close()
+    writer.close()
+
+
+def test_sqlite_caches_are_per_thread_and_follow_read_transactions(tmp_path) -> None:
+    store = SqliteRepository(str(tmp_path / "threads.db"))
+    populate(store)
+    in_thread = []
+
+    def run(action) -> None:
+        thread = threading.Thread(target=lambda: in_thread.append(action()))
+        thread.start()
+        thread.join()
+
+    # A thread that cached the old row must not serve it to the writer's thread.
+    run(lambda: store.get_user("alice").name)
+    store.add_user(User(id="alice", name="Alice B"))
+    run(lambda: store.get_user("alice").name)
+    assert store.get_user("alice").name == "Alice B"
+    assert in_thread == ["Alice", "Alice B"]
+
+    with store.reading():
+        before = list(store.get_availability_index("alice"))
+        run(lambda: store.set_availabilities("alice", []))
+        assert list(store.get_availability_index("alice")) == before != []
+        assert store.get_user("alice").name == "Alice B"
+    assert list(store.get_availability_index("alice")) == []
+    store.close()
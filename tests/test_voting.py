@@ -0,0 +1,107 @@
+from datetime import datetime
+
+import pytest
+
+from fastapi.testclient import TestClient
+
+from app import services
+from app.main import app
+from app.models import Invitation, Restaurant, User
+from app.repository import repository
+
+client = TestClient(app)
+
+
+def setup_function() -> None:
+    repository.clear()
+
+
+def seed(participant_ids=("alice", "bob", "carol")) -> Invitation:
+    for restaurant_id in ("sushi", "ramen"):
+        repository.add_restaurant(
+            Restaurant(id=restaurant_id, name=restaurant_id, tags=[], rating=None, latitude=0.0, longitude=0.0)
+        )
+    for user_id in participant_ids:
+        repository.add_user(User(id=user_id, name=user_id, wishlist={"sushi", "ramen"}))
+    return services.build_invitation(
+        Invitation(
+            id="inv-vote",
+            organizer_id="alice",
+            participant_ids=list(participant_ids),
+            candidate_restaurant_ids=["sushi", "ramen"],
+            candidate_slots=[(datetime(2024, 5, 3, 18), datetime(2024, 5, 3, 20))],
+        )
+    )
+
+
+def test_majority_confirms_and_changed_votes_move_the_tally() -> None:
+    seed()
+    services.record_vote("inv-vote", "alice", 0)
+    services.record_vote("inv-vote", "bob", 1)
+    services.record_vote("inv-vote", "bob", 0)
+    assert services.vote_tally("inv-vote")[1:] == ([2, 0], 2)
+
+    invitation = repository.get_invitation("inv-vote")
+    assert invitation.confirmed_option == invitation.top_options[0]
+    assert "inv-vote" not in services.open_invitations
+    with pytest.raises(ValueError, match="already confirmed"):
+        services.record_vote("inv-vote", "carol", 1)
+
+
+def test_quorum_picks_a_sole_leader_and_waits_on_ties() -> None:
+    seed(("alice", "bob", "carol", "dave"))
+    for user_id, option_index in [("alice", 0), ("bob", 1), ("carol", 0)]:
+        services.record_vote("inv-vote", user_id, option_index)
+    assert repository.get_invitation("inv-vote").confirmed_option is None
+
+    _, invitation = services.record_vote("inv-vote", "dave", 1)
+    assert invitation.confirmed_option is None
+    _, invitation = services.record_vote("inv-vote", "dave", 0)
+    assert invitation.confirmed_option == invitation.top_options[0]
+
+
+def test_votes_follow_options_when_an_invitation_is_rescored() -> None:
+    invitation = seed()
+    services.record_vote("inv-vote", "bob", 1)
+    voted = invitation.top_options[1]
+    services.save_user(User(id="bob", name="bob", wishlist={voted.restaurant_id}))
+
+    rescored, option_votes, voters = services.vote_tally("inv-vote")
+    keys = [services.option_key(option) for option in rescored.top_options]
+    assert voters == 1
+    assert option_votes[keys.index(services.option_key(voted))] == 1
+
+
+
+def test_slots_sharing_a_start_are_voted_on_separately() -> None:
+    seed()
+    invitation = services.build_invitation(
+        Invitation(
+            id="inv-slots",
+            organizer_id="alice",
+            participant_ids=["alice", "bob", "carol"],
+            candidate_restaurant_ids=["sushi"],
+            candidate_slots=[
+                (datetime(2024, 5, 3, 18), datetime(2024, 5, 3, 20)),
+                (datetime(2024, 5, 3, 18), datetime(2024, 5, 3, 21)),
+            ],
+        )
+    )
+    longer = next(index for index, option in enumerate(invitation.top_options) if option.slot_end.hour == 21)
+
+    services.record_vote("inv-slots", "bob", longer)
+
+    assert len({services.option_key(option) for option in invitation.top_options}) == 2
+    assert services.vote_tally("inv-slots")[1] == [int(index == longer) for index in range(2)]
+
+def test_only_the_organizer_confirms_directly() -> None:
+    seed()
+    response = client.post("/invitations/inv-vote/confirm", json={"user_id": "bob", "option_index": 0})
+    assert response.status_code == 400
+    assert client.post("/invitations/inv-vote/confirm", json={"user_id": "alice", "option_index": 0}).status_code == 200
+
+    tally = client.get("/invitations/inv-vote/tally").json()
+    assert tally["option_votes"] == [0, 0]
+    assert tally["participants"] == 3
+    assert tally["confirmed_option"]["restaurant_id"] in ("sushi", "ramen")
+    assert client.get("/invitations/missing/tally").status_code == 404